@@ -1,12 +1,12 @@
 from dotenv import load_dotenv
 import os
+import uuid
 from datetime import datetime, timedelta
 import jwt
 from typing import Optional
 
-from sqlalchemy import select
-from models.model import SysFunction, SysRoleFunction, SysUserRole
 from sqlalchemy.orm import Session
+from auth.permissions import permission_matrix
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
@@ -19,20 +19,11 @@ if not ALGORITHM:
     raise ValueError("ALGORITHM must be set in enviroment variables")
 
 def get_user_functions(db: Session, user_id: str) -> list[str]:
-    role_ids_select = select(SysUserRole.role_id).filter(SysUserRole.user_id == user_id)
-    function_paths = (
-        db.query(SysFunction.path)
-        .join(SysRoleFunction, SysFunction.id == SysRoleFunction.function_id)
-        .filter(
-            SysRoleFunction.role_id.in_(role_ids_select),
-            SysFunction.parent_id == None,
-            SysFunction.status == 1,
-            SysRoleFunction.status == 1
-        )
-        .distinct()
-        .all()
-    )
-    return [f.path for f in function_paths if f.path]
+    # Lấy từ ma trận phân quyền đã biên dịch (auth/permissions.py), không join mỗi lần cấp token
+    return permission_matrix.get_user_function_paths(db, user_id)
+
+def get_user_active_role_ids(db: Session, user_id: str) -> list[int]:
+    return sorted(permission_matrix.get_user_role_ids(db, user_id))
 
 
 # def create_access_token(user_id: str, user_name: str, expires_delta: Optional[timedelta] = None):
@@ -46,17 +37,24 @@ def get_user_functions(db: Session, user_id: str) -> list[str]:
 
 #     return encoded_jwt
 def create_access_token(user_id: str, user_name: str, user_type: int, db: Session, expires_delta: Optional[timedelta] = None):
+    # Đọc phiên bản trước khi lấy vai trò: nếu ma trận được biên dịch lại giữa hai bước, token chỉ bị coi là cũ
+    permission_matrix.ensure_fresh(db)
+    permission_version = permission_matrix.version
     user_functions = get_user_functions(db, user_id)
 
     to_encode = {
         "uuid": user_id,
         "name": user_name,
         "type": user_type, 
-        "functions": user_functions  # ✅ Thêm vào token
+        "functions": user_functions,  # ✅ Thêm vào token
+        "roles": get_user_active_role_ids(db, user_id),  # Vai trò đang hoạt động, dùng cho chế độ xác thực không trạng thái
+        "pv": permission_version,
+        "jti": uuid.uuid4().hex
     }
 
-    expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + (expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire, "iat": now})
 
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     if isinstance(encoded_jwt, bytes):
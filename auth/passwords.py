@@ -0,0 +1,154 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import List
+import bcrypt
+from fastapi import HTTPException, status
+
+logger = logging.getLogger(__name__)
+
+# Độ khó bcrypt; khi thay đổi, mật khẩu cũ sẽ được băm lại ở lần đăng nhập thành công kế tiếp
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# Pool riêng cho bcrypt để đợt đăng nhập dồn dập không chiếm hết threadpool của các API khác.
+# Thư viện bcrypt nhả GIL khi băm nên thread là đủ.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+# Số tác vụ tối đa (đang chạy + đang chờ); vượt quá thì trả 503 thay vì xếp hàng vô hạn
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 256))
+# Pool tiến trình cho tạo tài khoản hàng loạt, tách khỏi pool đăng nhập để đợt import không làm chậm đăng nhập
+PASSWORD_BULK_HASH_PROCESSES = int(os.getenv("PASSWORD_BULK_HASH_PROCESSES", max(1, (os.cpu_count() or 2) - 1)))
+
+
+class PasswordHasherPool:
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.running = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _run(self, fn, args, enqueued_at: float):
+        started_at = time.monotonic()
+        with self._lock:
+            self.running += 1
+            self.total_wait_seconds += started_at - enqueued_at
+        try:
+            return fn(*args)
+        finally:
+            finished_at = time.monotonic()
+            with self._lock:
+                self.running -= 1
+                self.pending -= 1
+                self.completed += 1
+                self.total_run_seconds += finished_at - started_at
+            self._slots.release()
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            logger.warning("Pool băm mật khẩu đã đầy, từ chối yêu cầu")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Hệ thống đang bận, vui lòng thử lại sau."
+            )
+        with self._lock:
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+        try:
+            return self._executor.submit(self._run, fn, args, time.monotonic())
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self.completed
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "peak_pending": self.peak_pending,
+                "completed": completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait_seconds / completed * 1000, 2) if completed else None,
+                "avg_run_ms": round(self.total_run_seconds / completed * 1000, 2) if completed else None,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+            }
+
+
+password_pool = PasswordHasherPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
+
+
+def _verify(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    except ValueError:
+        # Chuỗi hash hỏng/không phải bcrypt
+        return False
+
+
+def needs_rehash(hashed: str) -> bool:
+    """Hash được tạo với độ khó khác BCRYPT_ROUNDS hiện tại."""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.wrap_future(password_pool.submit(_hash, password))
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await asyncio.wrap_future(password_pool.submit(_verify, password, hashed))
+
+
+def hash_password(password: str) -> str:
+    """Bản đồng bộ cho các service sync: vẫn chạy trên pool bcrypt (có giới hạn) và chờ kết quả."""
+    return password_pool.submit(_hash, password).result()
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    return password_pool.submit(_verify, password, hashed).result()
+
+
+_bulk_executor = None
+_bulk_executor_lock = threading.Lock()
+
+
+def _get_bulk_executor() -> ProcessPoolExecutor:
+    global _bulk_executor
+    with _bulk_executor_lock:
+        if _bulk_executor is None:
+            # spawn thay vì fork: process cha đang chạy nhiều thread (uvicorn, pool bcrypt)
+            _bulk_executor = ProcessPoolExecutor(
+                max_workers=PASSWORD_BULK_HASH_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _bulk_executor
+
+
+def hash_passwords_bulk(passwords: List[str]) -> List[str]:
+    """Băm nhiều mật khẩu song song trên pool tiến trình, giữ nguyên thứ tự."""
+    if not passwords:
+        return []
+    chunksize = max(1, len(passwords) // (PASSWORD_BULK_HASH_PROCESSES * 4))
+    return list(_get_bulk_executor().map(_hash, passwords, chunksize=chunksize))
@@ -0,0 +1,199 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from models.model import SysFunction, SysPermissionVersion, SysRole, SysRoleFunction, SysUserRole, User
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Bao lâu thì đọc lại bộ đếm phiên bản trong DB để phát hiện thay đổi từ các worker khác
+PERMISSION_VERSION_CHECK_SECONDS = float(os.getenv("PERMISSION_VERSION_CHECK_SECONDS", 5))
+USER_ROLE_CACHE_TTL_SECONDS = float(os.getenv("USER_ROLE_CACHE_TTL_SECONDS", 300))
+USER_ROLE_CACHE_MAXSIZE = int(os.getenv("USER_ROLE_CACHE_MAXSIZE", 10000))
+
+_PERMISSION_MODELS = (SysRole, SysFunction, SysRoleFunction, SysUserRole)
+_VERSION_ROW_ID = 1
+
+
+class PermissionMatrix:
+    """
+    Ma trận phân quyền được biên dịch trong bộ nhớ từ SysRole, SysFunction và SysRoleFunction:
+    path -> tập role_id được phép truy cập, và role_id -> các chức năng cấp gốc (menu) của vai trò.
+    Vai trò của từng user được cache riêng.
+    Kiểm tra quyền và dựng danh sách chức năng khi cấp token chỉ còn là phép toán tập hợp, không cần join.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path_roles: Dict[str, FrozenSet[int]] = {}
+        self._active_role_ids: FrozenSet[int] = frozenset()
+        self._role_menu_paths: Dict[int, Tuple[str, ...]] = {}
+        self._menu_order: Dict[str, int] = {}
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._user_roles = TTLCache("user_roles", ttl_seconds=USER_ROLE_CACHE_TTL_SECONDS, maxsize=USER_ROLE_CACHE_MAXSIZE)
+        self.rebuilds = 0
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._version
+
+    def _compile(self, db: Session, version: int) -> None:
+        active_role_ids = frozenset(
+            row.id for row in db.query(SysRole.id).filter(SysRole.status == 1).all()
+        )
+        path_roles: Dict[str, set] = {}
+        menu_order: Dict[str, int] = {}
+        functions = (
+            db.query(SysFunction.id, SysFunction.path, SysFunction.parent_id)
+            .filter(SysFunction.status == 1, SysFunction.path.isnot(None))
+            .order_by(SysFunction.id)
+            .all()
+        )
+        for function in functions:
+            path_roles.setdefault(function.path, set())
+            if function.parent_id is None:
+                menu_order.setdefault(function.path, len(menu_order))
+        links = (
+            db.query(SysFunction.path, SysFunction.parent_id, SysRoleFunction.role_id)
+            .join(SysRoleFunction, SysRoleFunction.function_id == SysFunction.id)
+            .filter(SysFunction.status == 1, SysFunction.path.isnot(None), SysRoleFunction.status == 1)
+            .all()
+        )
+        role_menu_paths: Dict[int, set] = {}
+        for path, parent_id, role_id in links:
+            if role_id in active_role_ids:
+                path_roles[path].add(role_id)
+            # Như get_user_functions trước đây: menu gồm chức năng cấp gốc, không xét trạng thái vai trò
+            if parent_id is None:
+                role_menu_paths.setdefault(role_id, set()).add(path)
+
+        self._path_roles = {path: frozenset(roles) for path, roles in path_roles.items()}
+        self._role_menu_paths = {
+            role_id: tuple(sorted(paths, key=menu_order.__getitem__)) for role_id, paths in role_menu_paths.items()
+        }
+        self._menu_order = menu_order
+        self._active_role_ids = active_role_ids
+        self._version = version
+        self._user_roles.invalidate()
+        self.rebuilds += 1
+        logger.info(f"Đã biên dịch ma trận phân quyền phiên bản {version}: {len(self._path_roles)} đường dẫn")
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Đọc bộ đếm phiên bản (tối đa mỗi PERMISSION_VERSION_CHECK_SECONDS giây) và biên dịch lại nếu đã cũ."""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < PERMISSION_VERSION_CHECK_SECONDS:
+            return
+        with self._lock:
+            if self._version is not None and now - self._checked_at < PERMISSION_VERSION_CHECK_SECONDS:
+                return
+            version = read_permission_version(db)
+            if version != self._version:
+                self._compile(db, version)
+            self._checked_at = time.monotonic()
+
+    def mark_stale(self) -> None:
+        """Buộc lần kiểm tra quyền tiếp theo phải đọc lại phiên bản trong DB."""
+        self._checked_at = 0.0
+
+    def _get_assigned_role_ids(self, db: Session, user_id: UUID) -> FrozenSet[int]:
+        return self._user_roles.get_or_load(
+            str(user_id),
+            lambda: frozenset(r.role_id for r in db.query(SysUserRole.role_id).filter(SysUserRole.user_id == user_id).all())
+        )
+
+    def get_user_role_ids(self, db: Session, user_id: UUID) -> FrozenSet[int]:
+        """Các vai trò đang hoạt động của user."""
+        self.ensure_fresh(db)
+        return self._get_assigned_role_ids(db, user_id) & self._active_role_ids
+
+    def get_user_function_paths(self, db: Session, user_id: UUID) -> List[str]:
+        """Đường dẫn các chức năng cấp gốc của user: hợp các danh sách đã biên dịch sẵn theo vai trò."""
+        self.ensure_fresh(db)
+        paths = set()
+        for role_id in self._get_assigned_role_ids(db, user_id):
+            paths.update(self._role_menu_paths.get(role_id, ()))
+        return sorted(paths, key=self._menu_order.__getitem__)
+
+    def get_allowed_role_ids(self, db: Session, path: str) -> Optional[FrozenSet[int]]:
+        """Tập vai trò được phép truy cập path, hoặc None nếu path không tồn tại/đã bị khóa."""
+        self.ensure_fresh(db)
+        return self._path_roles.get(path)
+
+    def invalidate_user(self, user_id: UUID) -> None:
+        self._user_roles.invalidate(str(user_id))
+
+    def stats(self) -> dict:
+        return {
+            "version": self._version,
+            "paths": len(self._path_roles),
+            "active_roles": len(self._active_role_ids),
+            "role_menus": len(self._role_menu_paths),
+            "rebuilds": self.rebuilds,
+        }
+
+
+permission_matrix = PermissionMatrix()
+
+
+def read_permission_version(db: Session) -> int:
+    version = db.execute(
+        select(SysPermissionVersion.version).where(SysPermissionVersion.id == _VERSION_ROW_ID)
+    ).scalar()
+    return version or 0
+
+
+def bump_permission_version(connection) -> None:
+    """Tăng bộ đếm phiên bản trong cùng transaction với thao tác ghi phân quyền."""
+    statement = pg_insert(SysPermissionVersion).values(id=_VERSION_ROW_ID, version=1)
+    statement = statement.on_conflict_do_update(
+        index_elements=[SysPermissionVersion.id],
+        set_={"version": SysPermissionVersion.version + 1, "update_datetime": func.now()}
+    )
+    connection.execute(statement)
+
+
+def _is_user_revoked(session, obj) -> bool:
+    # Khóa hoặc xóa tài khoản cũng phải làm các token không trạng thái hết hiệu lực
+    if not isinstance(obj, User):
+        return False
+    return obj in session.deleted or inspect(obj).attrs.is_active.history.has_changes()
+
+
+# Tự động tăng phiên bản khi các bảng phân quyền được ghi qua ORM (kể cả UPDATE/DELETE hàng loạt)
+@event.listens_for(Session, "after_flush")
+def _bump_on_flush(session, flush_context):
+    if session.info.get("permission_version_bumped"):
+        return
+    changed = (session.new | session.dirty | session.deleted)
+    if any(isinstance(obj, _PERMISSION_MODELS) or _is_user_revoked(session, obj) for obj in changed):
+        bump_permission_version(session.connection())
+        session.info["permission_version_bumped"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_on_bulk_write(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    session = orm_execute_state.session
+    if mapper is not None and mapper.class_ in _PERMISSION_MODELS and not session.info.get("permission_version_bumped"):
+        bump_permission_version(session.connection())
+        session.info["permission_version_bumped"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _refresh_after_commit(session):
+    if session.info.pop("permission_version_bumped", False):
+        permission_matrix.mark_stale()
+
+
+@event.listens_for(Session, "after_rollback")
+def _reset_after_rollback(session):
+    session.info.pop("permission_version_bumped", None)
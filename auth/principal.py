@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from typing import Dict, FrozenSet, Optional, Set
+from uuid import UUID
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from auth.permissions import permission_matrix
+from models.model import User
+from utils.cache import TTLCache
+
+# Chế độ xác thực không trạng thái: tin vào các claim đã ký trong access token
+# (roles, pv, iat) thay vì truy vấn DB, miễn là token còn đủ mới và phiên bản phân quyền chưa đổi.
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() in ("1", "true", "yes")
+AUTH_STATELESS_MAX_AGE_SECONDS = int(os.getenv("AUTH_STATELESS_MAX_AGE_SECONDS", 300))
+# Ở chế độ không trạng thái, token bị thu hồi (đăng xuất, refresh) chỉ bị chặn ngay ở worker đã thu hồi nó
+# (tập jti thu hồi trong bộ nhớ); worker khác vẫn chấp nhận tới khi token quá AUTH_STATELESS_MAX_AGE_SECONDS
+# hoặc phiên bản phân quyền (pv) đổi. Bật cờ này để tra thêm DB theo jti (tốn một truy vấn mỗi
+# ACCESS_TOKEN_CHECK_CACHE_SECONDS cho mỗi token) khi cần thu hồi có hiệu lực ngay trên mọi worker.
+AUTH_STATELESS_CHECK_REVOCATION = os.getenv("AUTH_STATELESS_CHECK_REVOCATION", "false").lower() in ("1", "true", "yes")
+
+# Cache ngắn hạn cho user đã xác thực (theo jti của token, hoặc user id với token cũ chưa có jti)
+AUTH_PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL_SECONDS", 5))
+AUTH_PRINCIPAL_CACHE_MAXSIZE = int(os.getenv("AUTH_PRINCIPAL_CACHE_MAXSIZE", 20000))
+
+_USER_TYPE_NAMES = {1: "Admin", 2: "Student", 3: "Lecturer"}
+
+
+class TokenPrincipal:
+    """
+    Người dùng đã xác thực, dùng thay cho model User ở các endpoint chỉ cần id / user_name / user_type.
+    Được dựng từ claim của access token (chế độ không trạng thái, có role_ids)
+    hoặc chụp lại từ bản ghi User (role_ids = None, vai trò tra trong ma trận phân quyền).
+    Là bản sao thuần Python nên có thể cache và dùng chung giữa các request/session.
+    """
+
+    def __init__(
+        self,
+        id: UUID,
+        user_name: str,
+        user_type: int,
+        role_ids: Optional[FrozenSet[int]] = None,
+        permission_version: Optional[int] = None,
+        issued_at: Optional[int] = None,
+        is_active: bool = True
+    ):
+        self.id = id
+        self.user_name = user_name
+        self.user_type = user_type
+        self.role_ids = role_ids
+        self.permission_version = permission_version
+        self.issued_at = issued_at
+        self.is_active = is_active
+
+    @classmethod
+    def from_user(cls, user: User) -> "TokenPrincipal":
+        return cls(id=user.id, user_name=user.user_name, user_type=user.user_type, is_active=user.is_active)
+
+    @property
+    def user_type_name(self) -> str:
+        return _USER_TYPE_NAMES.get(self.user_type, "Unknown")
+
+    def __repr__(self) -> str:
+        return f"TokenPrincipal(id={self.id}, user_name={self.user_name!r}, user_type={self.user_type})"
+
+
+def principal_from_claims(payload: dict, db: Session) -> Optional[TokenPrincipal]:
+    """
+    Trả về TokenPrincipal nếu token đủ điều kiện xác thực không trạng thái, ngược lại trả về None
+    để người gọi quay về cách tra cứu user trong DB.
+    """
+    roles = payload.get("roles")
+    permission_version = payload.get("pv")
+    issued_at = payload.get("iat")
+    if roles is None or permission_version is None or issued_at is None or payload.get("type") is None:
+        return None
+    if time.time() - issued_at > AUTH_STATELESS_MAX_AGE_SECONDS:
+        return None
+
+    # So với phiên bản phân quyền trong bộ nhớ (chỉ đọc lại DB định kỳ), để thu hồi quyền vẫn có hiệu lực
+    permission_matrix.ensure_fresh(db)
+    if permission_version != permission_matrix.version:
+        return None
+
+    try:
+        user_id = UUID(payload["uuid"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return TokenPrincipal(
+        id=user_id,
+        user_name=payload.get("name"),
+        user_type=payload["type"],
+        role_ids=frozenset(roles),
+        permission_version=permission_version,
+        issued_at=issued_at
+    )
+
+
+class PrincipalCache:
+    """
+    Cache LRU có TTL vài giây cho user đã xác thực, để các request dồn dập của cùng một token
+    không phải truy vấn bảng sys_user. Có chỉ mục user_id -> các khóa để xóa theo user.
+    """
+
+    def __init__(self, ttl_seconds: float, maxsize: int):
+        self._cache = TTLCache("auth_principals", ttl_seconds=ttl_seconds, maxsize=maxsize)
+        self._keys_by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[TokenPrincipal]:
+        return self._cache.get(key)
+
+    def set(self, key: str, principal: TokenPrincipal, expires_at: Optional[float] = None) -> None:
+        ttl = self._cache.ttl_seconds
+        if expires_at is not None:
+            # Không giữ lâu hơn thời hạn của chính token
+            ttl = min(ttl, max(expires_at - time.time(), 0))
+        self._cache.set(key, principal, ttl_seconds=ttl)
+        with self._lock:
+            keys = self._keys_by_user.setdefault(str(principal.id), set())
+            keys.add(key)
+            # Dọn các khóa đã bị LRU đẩy ra để chỉ mục không phình mãi
+            if len(keys) > 32:
+                self._keys_by_user[str(principal.id)] = {k for k in keys if self._cache.contains(k)}
+
+    def evict_user(self, user_id) -> None:
+        with self._lock:
+            keys = self._keys_by_user.pop(str(user_id), set())
+        for key in keys:
+            self._cache.invalidate(key)
+
+
+principal_cache = PrincipalCache(AUTH_PRINCIPAL_CACHE_TTL_SECONDS, AUTH_PRINCIPAL_CACHE_MAXSIZE)
+
+
+def principal_cache_key(payload: dict) -> Optional[str]:
+    return payload.get("jti") or payload.get("uuid")
+
+
+# Khóa tài khoản, đổi mật khẩu, đổi loại user hoặc xóa user phải xóa ngay bản cache tương ứng
+_PRINCIPAL_ATTRS = ("is_active", "password", "user_type", "user_name")
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    for obj in session.dirty | session.deleted:
+        if not isinstance(obj, User):
+            continue
+        state = inspect(obj)
+        if obj in session.deleted or any(state.attrs[attr].history.has_changes() for attr in _PRINCIPAL_ATTRS):
+            session.info.setdefault("changed_principals", set()).add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_changed_users(session):
+    for user_id in session.info.pop("changed_principals", ()):
+        principal_cache.evict_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _reset_changed_users(session):
+    session.info.pop("changed_principals", None)
@@ -0,0 +1,184 @@
+import importlib
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request, status
+
+logger = logging.getLogger(__name__)
+
+# Giới hạn đăng nhập: mỗi bucket chứa tối đa CAPACITY lượt, hồi lại REFILL_PER_MINUTE lượt mỗi phút
+LOGIN_RATE_LIMIT_ENABLED = os.getenv("LOGIN_RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+LOGIN_USER_BUCKET_CAPACITY = float(os.getenv("LOGIN_USER_BUCKET_CAPACITY", 5))
+LOGIN_USER_REFILL_PER_MINUTE = float(os.getenv("LOGIN_USER_REFILL_PER_MINUTE", 5))
+LOGIN_IP_BUCKET_CAPACITY = float(os.getenv("LOGIN_IP_BUCKET_CAPACITY", 20))
+LOGIN_IP_REFILL_PER_MINUTE = float(os.getenv("LOGIN_IP_REFILL_PER_MINUTE", 30))
+# Chỉ bật khi chạy sau reverse proxy tin cậy, nếu không client có thể tự đặt IP giả
+LOGIN_TRUST_FORWARDED_FOR = os.getenv("LOGIN_TRUST_FORWARDED_FOR", "false").lower() in ("1", "true", "yes")
+# Số proxy tin cậy đứng trước ứng dụng; mỗi proxy nối địa chỉ nó nhận được vào cuối X-Forwarded-For,
+# nên IP client là phần tử thứ LOGIN_TRUSTED_PROXY_HOPS tính từ bên phải (các phần tử bên trái do client tự ghi)
+LOGIN_TRUSTED_PROXY_HOPS = max(int(os.getenv("LOGIN_TRUSTED_PROXY_HOPS", 1)), 1)
+# Backend lưu bucket: "memory" hoặc "module:Class" (vd. backend dùng Redis khi chạy nhiều worker)
+LOGIN_RATE_LIMIT_BACKEND = os.getenv("LOGIN_RATE_LIMIT_BACKEND", "memory")
+LOGIN_RATE_LIMIT_SHARDS = int(os.getenv("LOGIN_RATE_LIMIT_SHARDS", 16))
+LOGIN_RATE_LIMIT_MAX_KEYS = int(os.getenv("LOGIN_RATE_LIMIT_MAX_KEYS", 100000))
+
+
+class RateLimitBackend:
+    """
+    Giao diện backend của token bucket. Backend dùng chung giữa nhiều worker (Redis, memcached...)
+    chỉ cần cài đặt consume/reset với cùng ngữ nghĩa.
+    """
+
+    def consume(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> Tuple[bool, float]:
+        """Trừ `cost` lượt khỏi bucket `key`. Trả về (được phép, số giây cần chờ nếu bị chặn)."""
+        raise NotImplementedError
+
+    def reset(self, key: str) -> None:
+        raise NotImplementedError
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class _Shard:
+    def __init__(self, max_keys: int):
+        self.lock = threading.Lock()
+        self.buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.max_keys = max_keys
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Bucket lưu trong bộ nhớ của process, chia thành nhiều shard (mỗi shard một lock)
+    để các request đăng nhập đồng thời không tranh chấp cùng một lock.
+    Mỗi shard giữ tối đa max_keys / shards khóa, bỏ khóa ít dùng nhất khi đầy.
+    """
+
+    def __init__(self, shards: int = LOGIN_RATE_LIMIT_SHARDS, max_keys: int = LOGIN_RATE_LIMIT_MAX_KEYS):
+        per_shard = max(1, max_keys // max(1, shards))
+        self._shards = [_Shard(per_shard) for _ in range(max(1, shards))]
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[zlib.crc32(key.encode("utf-8")) % len(self._shards)]
+
+    def consume(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> Tuple[bool, float]:
+        shard = self._shard(key)
+        now = time.monotonic()
+        with shard.lock:
+            tokens, updated_at = shard.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+            if tokens >= cost:
+                shard.buckets[key] = (tokens - cost, now)
+                allowed, retry_after = True, 0.0
+            else:
+                shard.buckets[key] = (tokens, now)
+                allowed = False
+                retry_after = (cost - tokens) / refill_per_second if refill_per_second > 0 else float("inf")
+            shard.buckets.move_to_end(key)
+            while len(shard.buckets) > shard.max_keys:
+                shard.buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def reset(self, key: str) -> None:
+        shard = self._shard(key)
+        with shard.lock:
+            shard.buckets.pop(key, None)
+
+    def size(self) -> Optional[int]:
+        return sum(len(shard.buckets) for shard in self._shards)
+
+
+def _load_backend(spec: str) -> RateLimitBackend:
+    if spec == "memory":
+        return InMemoryRateLimitBackend()
+    module_name, _, class_name = spec.partition(":")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class()
+
+
+class LoginRateLimiter:
+    """Hai lớp token bucket trước endpoint đăng nhập: theo user_name và theo IP."""
+
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.throttled_user = 0
+        self.throttled_ip = 0
+        self.backend_errors = 0
+
+    def set_backend(self, backend: RateLimitBackend) -> None:
+        self.backend = backend
+
+    def _consume(self, key: str, capacity: float, per_minute: float) -> Tuple[bool, float]:
+        try:
+            return self.backend.consume(key, capacity, per_minute / 60)
+        except Exception:
+            # Backend lỗi thì cho qua: chặn nhầm toàn bộ đăng nhập còn tệ hơn
+            with self._lock:
+                self.backend_errors += 1
+            logger.exception("Lỗi backend giới hạn đăng nhập")
+            return True, 0.0
+
+    def check(self, user_name: str, client_ip: Optional[str]) -> None:
+        """Trừ một lượt ở cả hai bucket; raise 429 kèm Retry-After nếu một trong hai đã cạn."""
+        if not LOGIN_RATE_LIMIT_ENABLED:
+            return
+        if client_ip:
+            allowed, retry_after = self._consume(f"login:ip:{client_ip}", LOGIN_IP_BUCKET_CAPACITY, LOGIN_IP_REFILL_PER_MINUTE)
+            if not allowed:
+                self._reject("throttled_ip", retry_after)
+        allowed, retry_after = self._consume(f"login:user:{user_name.strip().lower()}", LOGIN_USER_BUCKET_CAPACITY, LOGIN_USER_REFILL_PER_MINUTE)
+        if not allowed:
+            self._reject("throttled_user", retry_after)
+        with self._lock:
+            self.allowed += 1
+
+    def _reject(self, counter: str, retry_after: float) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Đăng nhập quá nhiều lần, vui lòng thử lại sau.",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+        )
+
+    def reset_user(self, user_name: str) -> None:
+        """Đăng nhập thành công thì trả lại đủ lượt cho user đó."""
+        if not LOGIN_RATE_LIMIT_ENABLED:
+            return
+        try:
+            self.backend.reset(f"login:user:{user_name.strip().lower()}")
+        except Exception:
+            with self._lock:
+                self.backend_errors += 1
+            logger.exception("Lỗi backend giới hạn đăng nhập")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": LOGIN_RATE_LIMIT_ENABLED,
+                "backend": type(self.backend).__name__,
+                "tracked_keys": self.backend.size(),
+                "allowed": self.allowed,
+                "throttled_user": self.throttled_user,
+                "throttled_ip": self.throttled_ip,
+                "backend_errors": self.backend_errors,
+            }
+
+
+login_rate_limiter = LoginRateLimiter(_load_backend(LOGIN_RATE_LIMIT_BACKEND))
+
+
+def get_client_ip(request: Request) -> Optional[str]:
+    if LOGIN_TRUST_FORWARDED_FOR:
+        forwarded_for = request.headers.get("X-Forwarded-For")
+        if forwarded_for:
+            hops = [hop.strip() for hop in forwarded_for.split(",")]
+            if len(hops) >= LOGIN_TRUSTED_PROXY_HOPS and hops[-LOGIN_TRUSTED_PROXY_HOPS]:
+                return hops[-LOGIN_TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else None
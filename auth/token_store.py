@@ -0,0 +1,190 @@
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Optional, Union
+from uuid import UUID
+from sqlalchemy import delete, or_, select, text, update
+from sqlalchemy.orm import Session
+from db.database import engine
+from models.model import RefreshToken
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Chu kỳ chạy job dọn token hết hạn/đã thu hồi, và thời gian giữ lại token đã thu hồi để tra soát
+REFRESH_TOKEN_PURGE_INTERVAL_SECONDS = float(os.getenv("REFRESH_TOKEN_PURGE_INTERVAL_SECONDS", 3600))
+REFRESH_TOKEN_REVOKED_RETENTION_HOURS = float(os.getenv("REFRESH_TOKEN_REVOKED_RETENTION_HOURS", 24))
+REFRESH_TOKEN_PURGE_BATCH_SIZE = int(os.getenv("REFRESH_TOKEN_PURGE_BATCH_SIZE", 5000))
+# Khóa advisory để khi chạy nhiều worker chỉ một worker dọn dẹp tại một thời điểm.
+# Dùng khóa theo transaction (pg_try_advisory_xact_lock) cho từng lô: khi đi qua PgBouncer ở chế độ
+# transaction, mỗi transaction có thể nằm trên một kết nối server khác nên khóa theo session sẽ bị rò.
+_PURGE_ADVISORY_LOCK_ID = 815_001
+
+# Access token chỉ còn hiệu lực khi jti của nó là access_jti của một refresh token chưa thu hồi
+# (đăng xuất, đăng nhập lại và refresh đều làm jti cũ mất khỏi các dòng đó), nên mọi worker cho cùng kết quả.
+# Kết quả tra DB được cache: jti đã thu hồi giữ tới khi access token hết hạn,
+# jti còn hiệu lực chỉ giữ ACCESS_TOKEN_CHECK_CACHE_SECONDS giây - đây là độ trễ tối đa để thu hồi
+# ở một worker có hiệu lực ở các worker khác (0 = tra DB mỗi request).
+ACCESS_TOKEN_CHECK_CACHE_SECONDS = float(os.getenv("ACCESS_TOKEN_CHECK_CACHE_SECONDS", 5))
+
+_revoked_access_jtis = TTLCache("revoked_access_tokens", ttl_seconds=3600, maxsize=100000)
+_active_access_jtis = TTLCache("active_access_tokens", ttl_seconds=ACCESS_TOKEN_CHECK_CACHE_SECONDS, maxsize=100000)
+
+
+def hash_token(token: Union[str, bytes]) -> str:
+    if isinstance(token, str):
+        token = token.encode("utf-8")
+    return hashlib.sha256(token).hexdigest()
+
+
+def _remember_revoked(access_jti: Optional[str], access_expires_at: Optional[datetime]) -> None:
+    if not access_jti:
+        return
+    _active_access_jtis.invalidate(access_jti)
+    ttl = (access_expires_at - datetime.utcnow()).total_seconds() if access_expires_at else None
+    if ttl is None or ttl > 0:
+        _revoked_access_jtis.set(access_jti, True, ttl_seconds=ttl)
+
+
+def is_access_revoked_locally(access_jti: Optional[str]) -> bool:
+    """Chỉ tra tập jti đã thu hồi trong bộ nhớ của process, không truy vấn DB."""
+    return bool(access_jti) and _revoked_access_jtis.contains(access_jti)
+
+
+def is_access_revoked(db: Session, access_jti: Optional[str], access_expires_at: Optional[datetime] = None) -> bool:
+    """
+    Tra trong bộ nhớ trước; khi chưa có thì kiểm tra jti còn gắn với refresh token chưa thu hồi
+    (dùng index một phần ix_refresh_token_active_access_jti).
+    """
+    if not access_jti:
+        return False
+    if _revoked_access_jtis.contains(access_jti):
+        return True
+    if _active_access_jtis.contains(access_jti):
+        return False
+    active = db.query(RefreshToken.id).filter(
+        RefreshToken.access_jti == access_jti,
+        RefreshToken.revoked_at.is_(None)
+    ).first() is not None
+    if active:
+        if ACCESS_TOKEN_CHECK_CACHE_SECONDS > 0:
+            _active_access_jtis.set(access_jti, True)
+    else:
+        _remember_revoked(access_jti, access_expires_at)
+    return not active
+
+
+def store_refresh_token(
+    db: Session,
+    user_id: UUID,
+    refresh_token: Union[str, bytes],
+    access_jti: Optional[str],
+    expires_at: datetime,
+    access_expires_at: Optional[datetime]
+) -> RefreshToken:
+    db_token = RefreshToken(
+        user_id=user_id,
+        token_hash=hash_token(refresh_token),
+        access_jti=access_jti,
+        expires_at=expires_at,
+        access_expires_at=access_expires_at
+    )
+    db.add(db_token)
+    return db_token
+
+
+def find_active_refresh_token(db: Session, refresh_token: Union[str, bytes]) -> Optional[RefreshToken]:
+    # Dùng index một phần ix_refresh_token_active_hash
+    return db.query(RefreshToken).filter(
+        RefreshToken.token_hash == hash_token(refresh_token),
+        RefreshToken.revoked_at.is_(None),
+        RefreshToken.expires_at > datetime.utcnow()
+    ).first()
+
+
+def revoke_user_tokens(db: Session, user_id: UUID) -> int:
+    """Thu hồi mọi refresh token còn hiệu lực của user (chỉ chạm các dòng active nhờ index một phần)."""
+    rows = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+        .returning(RefreshToken.access_jti, RefreshToken.access_expires_at)
+        .execution_options(synchronize_session=False)
+    ).all()
+    for access_jti, access_expires_at in rows:
+        _remember_revoked(access_jti, access_expires_at)
+    return len(rows)
+
+
+def revoke_refresh_token(db: Session, refresh_token: Union[str, bytes]) -> bool:
+    row = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == hash_token(refresh_token), RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+        .returning(RefreshToken.access_jti, RefreshToken.access_expires_at)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row:
+        _remember_revoked(row.access_jti, row.access_expires_at)
+    return row is not None
+
+
+def revoke_access_token(access_jti: Optional[str], access_expires_at: Optional[datetime]) -> None:
+    _remember_revoked(access_jti, access_expires_at)
+
+
+def purge_refresh_tokens(connection) -> int:
+    """
+    Xóa token đã hết hạn hoặc đã thu hồi quá thời gian lưu giữ, theo từng lô nhỏ
+    để không giữ khóa lâu trên bảng. Mỗi lô là một transaction giữ khóa advisory riêng;
+    worker khác đang dọn thì dừng.
+    """
+    now = datetime.utcnow()
+    revoked_before = now - timedelta(hours=REFRESH_TOKEN_REVOKED_RETENTION_HOURS)
+    total = 0
+    while True:
+        acquired = connection.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": _PURGE_ADVISORY_LOCK_ID}).scalar()
+        if not acquired:
+            connection.rollback()
+            return total
+        ids = select(RefreshToken.id).where(
+            or_(RefreshToken.expires_at < now, RefreshToken.revoked_at < revoked_before)
+        ).limit(REFRESH_TOKEN_PURGE_BATCH_SIZE)
+        deleted = connection.execute(delete(RefreshToken).where(RefreshToken.id.in_(ids.scalar_subquery()))).rowcount
+        connection.commit()
+        total += deleted
+        if deleted < REFRESH_TOKEN_PURGE_BATCH_SIZE:
+            return total
+
+
+def _purge_once() -> None:
+    try:
+        with engine.connect() as connection:
+            deleted = purge_refresh_tokens(connection)
+            if deleted:
+                logger.info(f"Đã dọn {deleted} refresh token hết hạn/đã thu hồi")
+    except Exception:
+        logger.exception("Lỗi khi dọn refresh token")
+
+
+_purger_started = False
+_purger_lock = threading.Lock()
+
+
+def start_refresh_token_purger() -> None:
+    """Chạy job dọn dẹp định kỳ trên một daemon thread (gọi một lần khi ứng dụng khởi động)."""
+    global _purger_started
+    with _purger_lock:
+        if _purger_started or REFRESH_TOKEN_PURGE_INTERVAL_SECONDS <= 0:
+            return
+        _purger_started = True
+
+    def _loop():
+        while True:
+            _purge_once()
+            time.sleep(REFRESH_TOKEN_PURGE_INTERVAL_SECONDS)
+
+    threading.Thread(target=_loop, name="refresh-token-purger", daemon=True).start()
@@ -0,0 +1,176 @@
+"""
+So sánh nhánh đọc đồng bộ (Session + threadpool) với nhánh async (AsyncSession + asyncpg)
+trên cùng các truy vấn nóng: danh sách đề tài, nhóm của sinh viên, lời mời, công việc của đề tài.
+
+Hai nhánh chạy cùng một hàm trong repositories/ (cùng câu lệnh SQL, cùng số truy vấn) để chênh lệch
+chỉ đến từ sync/async: nhánh đồng bộ chạy hàm đó trên Session + psycopg2 qua _BlockingSession,
+được giới hạn bởi một ThreadPoolExecutor cỡ bằng threadpool mặc định của Starlette (40);
+nhánh async chạy toàn bộ request trên event loop. Mỗi mức concurrency in ra throughput và độ trễ p50/p99.
+
+Chạy (cần cùng biến môi trường DATABASE_* như ứng dụng):
+    python -m benchmarks.async_vs_sync --requests 2000 --concurrency 10 50 200 \
+        --user-id <uuid sinh viên> --thesis-id <uuid đề tài>
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional
+from uuid import UUID
+
+import repositories.group as group_repository
+import repositories.invite as invite_repository
+import repositories.progress as progress_repository
+import repositories.thesis as thesis_repository
+from db.async_database import AsyncSessionLocal, dispose_async_engine
+from db.database import SessionLocal
+
+STARLETTE_THREADPOOL_SIZE = 40
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _summary(name: str, concurrency: int, latencies: List[float], elapsed: float, errors: int) -> Dict:
+    return {
+        "path": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+class _BlockingSession:
+    """
+    Bọc Session đồng bộ theo phần giao diện AsyncSession mà repositories/ dùng (execute, run_sync).
+    Các coroutine trả về kết quả ngay, không thực sự nhường event loop.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def execute(self, statement, *args, **kwargs):
+        return self.session.execute(statement, *args, **kwargs)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.session, *args, **kwargs)
+
+
+def _run_blocking(coroutine):
+    """Chạy coroutine của repository tới hết trên thread hiện tại (chỉ await _BlockingSession)."""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError("Repository chờ một awaitable khác ngoài _BlockingSession, không chạy đồng bộ được")
+
+
+def _sync_workloads(user_id: Optional[UUID], thesis_id: Optional[UUID]) -> Dict[str, Callable]:
+    return {
+        name: (lambda workload: lambda db: _run_blocking(workload(_BlockingSession(db))))(workload)
+        for name, workload in _async_workloads(user_id, thesis_id).items()
+    }
+
+
+def _async_workloads(user_id: Optional[UUID], thesis_id: Optional[UUID]) -> Dict[str, Callable[..., Awaitable]]:
+    workloads = {"theses": lambda db: thesis_repository.list_theses(db, limit=50)}
+    if user_id:
+        workloads["my_groups"] = lambda db: group_repository.get_all_groups_for_user(db, user_id)
+        workloads["my_invites"] = lambda db: invite_repository.get_all_invites_for_user(db, user_id)
+        if thesis_id:
+            workloads["thesis_tasks"] = lambda db: progress_repository.get_tasks_for_thesis(db, thesis_id, user_id)
+    return workloads
+
+
+async def run_sync_path(workload: Callable, requests: int, concurrency: int) -> Dict:
+    """Mô phỏng route `def`: mỗi request một Session, chạy trên threadpool giới hạn."""
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=STARLETTE_THREADPOOL_SIZE)
+    gate = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    def handle():
+        db = SessionLocal()
+        try:
+            workload(db)
+        finally:
+            db.close()
+
+    async def one():
+        nonlocal errors
+        async with gate:
+            started = time.perf_counter()
+            try:
+                await loop.run_in_executor(executor, handle)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    executor.shutdown()
+    return _summary("sync", concurrency, latencies, elapsed, errors)
+
+
+async def run_async_path(workload: Callable[..., Awaitable], requests: int, concurrency: int) -> Dict:
+    """Mô phỏng route `async def`: mỗi request một AsyncSession trên event loop."""
+    gate = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with gate:
+            started = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await workload(db)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return _summary("async", concurrency, latencies, elapsed, errors)
+
+
+async def main(args) -> None:
+    user_id = UUID(args.user_id) if args.user_id else None
+    thesis_id = UUID(args.thesis_id) if args.thesis_id else None
+    sync_workloads = _sync_workloads(user_id, thesis_id)
+    async_workloads = _async_workloads(user_id, thesis_id)
+
+    print(f"{'workload':<14}{'path':<7}{'conc':>6}{'req':>7}{'err':>5}{'rps':>9}{'p50 ms':>10}{'p99 ms':>10}")
+    try:
+        for name in sync_workloads:
+            for concurrency in args.concurrency:
+                for result in (
+                    await run_sync_path(sync_workloads[name], args.requests, concurrency),
+                    await run_async_path(async_workloads[name], args.requests, concurrency),
+                ):
+                    print(
+                        f"{name:<14}{result['path']:<7}{result['concurrency']:>6}{result['requests']:>7}{result['errors']:>5}"
+                        f"{result['throughput_rps']:>9}{result['p50_ms']:>10}{result['p99_ms']:>10}"
+                    )
+    finally:
+        await dispose_async_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="So sánh độ trễ nhánh đọc sync và async")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--user-id", help="UUID sinh viên cho các workload nhóm/lời mời/công việc")
+    parser.add_argument("--thesis-id", help="UUID đề tài cho workload công việc")
+    asyncio.run(main(parser.parse_args()))
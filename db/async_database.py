@@ -0,0 +1,85 @@
+from typing import AsyncIterator, List, Optional
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from db.database import (
+    DATABASE_HOST, DATABASE_NAME, DATABASE_PASSWORD, DATABASE_PORT, DATABASE_USER, engine, read_engine,
+    READ_DATABASE_HOST, READ_DATABASE_NAME, READ_DATABASE_PASSWORD, READ_DATABASE_PORT, READ_DATABASE_USER
+)
+from db.pool import pool_engine_kwargs, pool_stats
+from db.routing import has_replica, read_routing_stats, should_read_from_primary
+
+# Engine bất đồng bộ (asyncpg) chạy song song với engine đồng bộ trong db/database.py,
+# dùng cho các API đọc nhiều, chủ yếu chờ Postgres (danh sách đề tài, nhóm, lời mời, công việc).
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}"
+
+ASYNC_READ_DATABASE_URL = f"postgresql+asyncpg://{READ_DATABASE_USER}:{READ_DATABASE_PASSWORD}@{READ_DATABASE_HOST}:{READ_DATABASE_PORT}/{READ_DATABASE_NAME}"
+
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+_async_read_engine: Optional[AsyncEngine] = None
+_async_read_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """Tạo engine khi cần lần đầu, để ứng dụng vẫn khởi động được khi chưa dùng tới nhánh async."""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_engine_kwargs("async", is_async=True))
+        # expire_on_commit=False: đối tượng trả về vẫn đọc được sau commit mà không phải await lazy load
+        _async_session_factory = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    get_async_engine()
+    return _async_session_factory()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def AsyncReadSessionLocal() -> AsyncSession:
+    """Session async trên replica (READ_DATABASE_HOST); chưa cấu hình replica thì dùng engine chính."""
+    global _async_read_engine, _async_read_session_factory
+    if not READ_DATABASE_HOST:
+        return AsyncSessionLocal()
+    if _async_read_engine is None:
+        _async_read_engine = create_async_engine(ASYNC_READ_DATABASE_URL, **pool_engine_kwargs("async_read", is_async=True))
+        _async_read_session_factory = async_sessionmaker(_async_read_engine, autoflush=False, expire_on_commit=False, info={"replica": True})
+    return _async_read_session_factory()
+
+
+async def get_async_read_db(request: Request) -> AsyncIterator[AsyncSession]:
+    on_primary = should_read_from_primary(request)
+    read_routing_stats.record_read(on_primary)
+    async with (AsyncSessionLocal() if on_primary else AsyncReadSessionLocal()) as session:
+        yield session
+
+
+def get_async_engine_if_created() -> Optional[AsyncEngine]:
+    return _async_engine
+
+
+def get_async_read_engine_if_created() -> Optional[AsyncEngine]:
+    return _async_read_engine
+
+
+def collect_pool_stats() -> List[dict]:
+    """Số liệu pool của mọi engine trong process (engine async chỉ có khi đã được dùng)."""
+    pools = [pool_stats("sync", engine)]
+    if has_replica():
+        pools.append(pool_stats("read", read_engine))
+    if _async_engine is not None:
+        pools.append(pool_stats("async", _async_engine))
+    if _async_read_engine is not None:
+        pools.append(pool_stats("async_read", _async_read_engine))
+    return pools
+
+
+async def dispose_async_engine() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _async_read_engine is not None:
+        await _async_read_engine.dispose()
@@ -3,6 +3,7 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
+from db.pool import pool_engine_kwargs
 
 load_dotenv()
 
@@ -16,9 +17,25 @@ DATABASE_PASSWORD = os.getenv("DATABASE_PASSWORD")
 DATABASE_URL = f"postgresql://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}"
 
 # Tạo engine và session
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **pool_engine_kwargs("sync"))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine đọc (replica). Chưa cấu hình READ_DATABASE_HOST thì dùng luôn engine chính;
+# các biến còn lại mặc định giống primary.
+READ_DATABASE_HOST = os.getenv("READ_DATABASE_HOST")
+READ_DATABASE_PORT = os.getenv("READ_DATABASE_PORT", DATABASE_PORT)
+READ_DATABASE_NAME = os.getenv("READ_DATABASE_NAME", DATABASE_NAME)
+READ_DATABASE_USER = os.getenv("READ_DATABASE_USER", DATABASE_USER)
+READ_DATABASE_PASSWORD = os.getenv("READ_DATABASE_PASSWORD", DATABASE_PASSWORD)
+
+if READ_DATABASE_HOST:
+    READ_DATABASE_URL = f"postgresql://{READ_DATABASE_USER}:{READ_DATABASE_PASSWORD}@{READ_DATABASE_HOST}:{READ_DATABASE_PORT}/{READ_DATABASE_NAME}"
+    read_engine = create_engine(READ_DATABASE_URL, **pool_engine_kwargs("read"))
+else:
+    READ_DATABASE_URL = DATABASE_URL
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, info={"replica": True})
+
 # Base class cho các model
 Base = declarative_base()
 
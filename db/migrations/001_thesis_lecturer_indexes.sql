@@ -0,0 +1,9 @@
+-- Index ix_thesis_lecturer_thesis_id / ix_thesis_lecturer_lecturer_id (index=True trên ThesisLecturer),
+-- phục vụ các truy vấn thesis_id IN (...) / lecturer_id IN (...) khi dựng danh sách đề tài.
+-- Base.metadata.create_all không thêm index vào bảng đã có, CSDL đang chạy cần chạy script này một lần.
+-- CREATE INDEX CONCURRENTLY không chạy được trong transaction: chạy bằng psql, không bọc BEGIN/COMMIT.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_thesis_lecturer_thesis_id
+    ON thesis_lecturer (thesis_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_thesis_lecturer_lecturer_id
+    ON thesis_lecturer (lecturer_id);
@@ -0,0 +1,5 @@
+-- Index ix_thesis_create_datetime_id cho thesis(create_datetime, id), phục vụ phân trang keyset.
+-- Base.metadata.create_all không thêm index vào bảng đã có, CSDL đang chạy cần chạy script này một lần.
+-- CREATE INDEX CONCURRENTLY không chạy được trong transaction: chạy bằng psql, không bọc BEGIN/COMMIT.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_thesis_create_datetime_id
+    ON thesis (create_datetime, id);
@@ -0,0 +1,6 @@
+-- Index một phần ix_refresh_token_active_access_jti cho refresh_token_store(access_jti).
+-- Base.metadata.create_all không thêm index vào bảng đã có, CSDL đang chạy cần chạy script này một lần.
+-- CREATE INDEX CONCURRENTLY không chạy được trong transaction: chạy bằng psql, không bọc BEGIN/COMMIT.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_refresh_token_active_access_jti
+    ON refresh_token_store (access_jti)
+    WHERE revoked_at IS NULL;
@@ -0,0 +1,14 @@
+-- Unique index ux_role_function_role_function cho sys_role_function(role_id, function_id).
+-- Base.metadata.create_all chỉ tạo index cho bảng mới, CSDL đang chạy cần chạy script này một lần.
+-- CREATE INDEX CONCURRENTLY không chạy được trong transaction: chạy bằng psql, không bọc BEGIN/COMMIT.
+
+-- 1. Xóa các dòng trùng (role_id, function_id), giữ dòng có id nhỏ nhất
+DELETE FROM sys_role_function a
+USING sys_role_function b
+WHERE a.role_id = b.role_id
+  AND a.function_id = b.function_id
+  AND a.id > b.id;
+
+-- 2. Tạo unique index mà không khóa ghi bảng
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_role_function_role_function
+    ON sys_role_function (role_id, function_id);
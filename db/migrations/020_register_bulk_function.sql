@@ -0,0 +1,23 @@
+-- Chức năng /auth/register/bulk trong ma trận phân quyền (PathChecker), cấp sẵn cho vai trò admin
+-- như quyền "chỉ Admin" trước đây. Chạy một lần; có thể chạy lại mà không sinh dòng trùng.
+BEGIN;
+
+INSERT INTO sys_function (name, path, type, description, status, create_datetime, update_datetime)
+VALUES ('Tạo tài khoản hàng loạt', '/auth/register/bulk', 'API', 'Tạo tài khoản hàng loạt từ JSON/CSV', 1, now(), now())
+ON CONFLICT (name) DO NOTHING;
+
+INSERT INTO sys_role_function (role_id, function_id, status, create_datetime)
+SELECT r.id, f.id, 1, now()
+FROM sys_role r
+JOIN sys_function f ON f.path = '/auth/register/bulk'
+WHERE r.role_code = 'admin'
+  AND NOT EXISTS (
+      SELECT 1 FROM sys_role_function rf WHERE rf.role_id = r.id AND rf.function_id = f.id
+  );
+
+-- Tăng phiên bản phân quyền để các worker biên dịch lại ma trận (xem auth/permissions.py)
+INSERT INTO sys_permission_version (id, version, update_datetime)
+VALUES (1, 1, now())
+ON CONFLICT (id) DO UPDATE SET version = sys_permission_version.version + 1, update_datetime = now();
+
+COMMIT;
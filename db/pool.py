@@ -0,0 +1,129 @@
+from dotenv import load_dotenv
+import os
+import threading
+import time
+from typing import Optional
+from uuid import uuid4
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+load_dotenv()
+
+# Cấu hình pool kết nối qua biến môi trường.
+# DB_POOL_MODE=queue: pool trong process (mặc định);
+# DB_POOL_MODE=external: không giữ kết nối trong process (NullPool), dùng khi đã có PgBouncer phía trước Postgres.
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "queue").lower()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+class PoolMetrics:
+    """Số liệu lấy kết nối từ pool: số lần checkout, thời gian chờ và số lần hết thời gian chờ."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_seconds / attempts * 1000, 3) if attempts else None,
+                "total_wait_seconds": round(self.total_wait_seconds, 6),
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            }
+
+
+class _InstrumentedPoolMixin:
+    # Gắn ở mức lớp để pool được tạo lại (engine.dispose, recreate) vẫn ghi vào cùng bộ đếm
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        # Đo thời gian chờ lấy kết nối, kể cả khi phải chờ kết nối khác được trả về pool
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics:
+                self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.metrics:
+            self.metrics.record(time.perf_counter() - started, timed_out=False)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_engine_kwargs(name: str, is_async: bool = False) -> dict:
+    """Tham số pool cho create_engine / create_async_engine theo các biến DB_POOL_*."""
+    if DB_POOL_MODE == "external":
+        kwargs = {"poolclass": NullPool, "pool_pre_ping": DB_POOL_PRE_PING}
+        if is_async:
+            # PgBouncer ở chế độ transaction không giữ prepared statement giữa các transaction;
+            # asyncpg vẫn tạo prepared statement cho từng câu lệnh nên phải đặt tên duy nhất,
+            # nếu không sẽ gặp lỗi "prepared statement ... already exists" trên kết nối server dùng chung
+            kwargs["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+        return kwargs
+
+    base_class = InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool
+    pool_class = type(base_class.__name__, (base_class,), {"metrics": PoolMetrics(name)})
+    return {
+        "poolclass": pool_class,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def pool_stats(name: str, engine) -> dict:
+    pool = engine.pool
+    stats = {
+        "name": name,
+        "mode": DB_POOL_MODE,
+        "pool_class": type(pool).__name__,
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "timeout_seconds": DB_POOL_TIMEOUT,
+            "recycle_seconds": DB_POOL_RECYCLE,
+            "pre_ping": DB_POOL_PRE_PING,
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics:
+        stats.update(metrics.stats())
+    return stats
@@ -0,0 +1,165 @@
+from contextlib import contextmanager
+import math
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from db.database import ReadSessionLocal, SessionLocal, engine, read_engine
+
+# Sau khi một request ghi thành công, các request đọc tiếp theo của cùng client được ghim vào primary
+# trong DB_PRIMARY_PIN_SECONDS giây (qua cookie) để không đọc phải dữ liệu cũ khi replica còn trễ.
+DB_PRIMARY_PIN_SECONDS = float(os.getenv("DB_PRIMARY_PIN_SECONDS", 5))
+PRIMARY_PIN_COOKIE = "db_primary_until"
+
+# Trạng thái của request hiện tại; là dict dùng chung nên thay đổi từ threadpool (endpoint sync) vẫn thấy được
+_request_state: ContextVar[Optional[dict]] = ContextVar("db_routing_state", default=None)
+
+
+class ReadRoutingStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.pinned_responses = 0
+
+    def record_read(self, on_primary: bool) -> None:
+        with self._lock:
+            if on_primary:
+                self.primary_reads += 1
+            else:
+                self.replica_reads += 1
+
+    def record_pin(self) -> None:
+        with self._lock:
+            self.pinned_responses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "replica_configured": has_replica(),
+                "pin_seconds": DB_PRIMARY_PIN_SECONDS,
+                "replica_reads": self.replica_reads,
+                "primary_reads": self.primary_reads,
+                "pinned_responses": self.pinned_responses,
+            }
+
+
+read_routing_stats = ReadRoutingStats()
+
+
+def has_replica() -> bool:
+    return read_engine is not engine
+
+
+def _mark_request_wrote() -> None:
+    state = _request_state.get()
+    if state is not None:
+        state["wrote"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _remember_flush(session, flush_context):
+    session.info["primary_write_pending"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _remember_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["primary_write_pending"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _pin_after_commit(session):
+    if session.info.pop("primary_write_pending", False):
+        _mark_request_wrote()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop("primary_write_pending", None)
+
+
+def should_read_from_primary(request: Request) -> bool:
+    """Đọc từ primary khi chưa có replica, khi chính request này đã ghi, hoặc khi client còn trong thời gian ghim."""
+    if not has_replica():
+        return True
+    state = _request_state.get()
+    if state is not None and state["wrote"]:
+        return True
+    pinned_until = request.cookies.get(PRIMARY_PIN_COOKIE)
+    if not pinned_until:
+        return False
+    try:
+        return float(pinned_until) > time.time()
+    except ValueError:
+        return False
+
+
+@contextmanager
+def primary_session(db: Session) -> Iterator[Session]:
+    """
+    Session primary cho loader của cache trong process: nạp từ replica đang trễ
+    thì dữ liệu cũ sẽ bị giữ lại tới hết TTL. Chỉ mở session mới khi db là session replica.
+    """
+    if not db.info.get("replica"):
+        yield db
+        return
+    primary = SessionLocal()
+    try:
+        yield primary
+    finally:
+        primary.close()
+
+
+def open_read_session(request: Request) -> Session:
+    """Mở session đọc theo cùng quy tắc với get_read_db, cho endpoint chỉ cần session ở một nhánh; người gọi tự đóng."""
+    on_primary = should_read_from_primary(request)
+    read_routing_stats.record_read(on_primary)
+    return SessionLocal() if on_primary else ReadSessionLocal()
+
+
+def get_read_db(request: Request) -> Iterator[Session]:
+    """Dependency cho các API chỉ đọc: dùng replica nếu có, ngược lại (hoặc khi bị ghim) dùng primary."""
+    db = open_read_session(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class PrimaryPinMiddleware:
+    """
+    Middleware ASGI: theo dõi request có commit thao tác ghi hay không,
+    nếu có thì gắn cookie ghim primary vào response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not has_replica() or DB_PRIMARY_PIN_SECONDS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"wrote": False}
+        token = _request_state.set(state)
+
+        async def send_with_pin(message):
+            if message["type"] == "http.response.start" and state["wrote"]:
+                pinned_until = time.time() + DB_PRIMARY_PIN_SECONDS
+                cookie = (
+                    f"{PRIMARY_PIN_COOKIE}={pinned_until:.3f}; Max-Age={math.ceil(DB_PRIMARY_PIN_SECONDS)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]}
+                read_routing_stats.record_pin()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_pin)
+        finally:
+            _request_state.reset(token)
@@ -1,10 +1,14 @@
 from fastapi import FastAPI
 from db.database import Base, engine
-from routers import academy, auth, council, group, information, invite, lecturer_profile, progress, score, student_profile, sys_role, sys_role_function, sys_user_role, sysuser, thesis, function
+from routers import academy, auth, council, group, information, internal, invite, lecturer_profile, metrics, progress, score, student_profile, sys_role, sys_role_function, sys_user_role, sysuser, thesis, function
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 from fastapi_jwt_auth import AuthJWT
 from auth.authentication import SECRET_KEY
+from auth.token_store import start_refresh_token_purger
+from db.async_database import dispose_async_engine
+from db.routing import PrimaryPinMiddleware
+from utils.instrumentation import RequestInstrumentationMiddleware
 
 Base.metadata.create_all(bind=engine)
 
@@ -35,7 +39,10 @@ app.add_middleware(
     allow_credentials=True, 
     allow_methods=["*"], 
     allow_headers=["*"], 
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "Server-Timing", "X-DB-Query-Count"],
 )
+app.add_middleware(PrimaryPinMiddleware)
+app.add_middleware(RequestInstrumentationMiddleware)
 # Cấu hình AuthJWT
 @app.on_event("startup")
 async def startup():
@@ -47,6 +54,12 @@ async def startup():
         ("authjwt_refresh_token_expires", 604800), # Thời gian hết hạn của refresh token (7 ngày)
     ])
     logger.info("AuthJWT configured successfully")
+    start_refresh_token_purger()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await dispose_async_engine()
 
 
 # List các router. Thêm router nào ghi vô
@@ -66,7 +79,9 @@ list_router = [
     lecturer_profile.router,
     progress.router,
     council.router,
-    score.router
+    score.router,
+    internal.router,
+    metrics.router
 ]
 for router in list_router:
     app.include_router(router)
\ No newline at end of file
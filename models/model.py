@@ -1,6 +1,7 @@
 from datetime import datetime
 import uuid
-from sqlalchemy import UUID, Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text, func
+from sqlalchemy import UUID, BigInteger, Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB
 from db.database import Base
 
 class AcademyYear(Base):
@@ -85,16 +86,27 @@ class Department(Base):
     update_datetime = Column(DateTime, default=func.now(), onupdate=func.now())
 
 class RefreshToken(Base):
-    __tablename__ = "refresh_tokens"
-    id = Column(Integer, primary_key=True, index=True)
+    # Chỉ lưu giá trị băm (SHA-256) của refresh token và jti của access token, không lưu JWT gốc
+    __tablename__ = "refresh_token_store"
+    id = Column(Integer, primary_key=True)
     user_id = Column(UUID, nullable=False)
-    token = Column(String, nullable=False, index=True)  # Lưu refresh token
-    access_token = Column(String, nullable=True, index=True)  # Lưu access token
+    token_hash = Column(String(64), nullable=False)
+    access_jti = Column(String(32), nullable=True)
     expires_at = Column(DateTime, nullable=False)  # Thời gian hết hạn của refresh token
     access_expires_at = Column(DateTime, nullable=True)  # Thời gian hết hạn của access token
-    is_revoked = Column(Boolean, default=False)
+    revoked_at = Column(DateTime, nullable=True)  # NULL = còn hiệu lực
     created_at = Column(DateTime, default=func.now())
 
+    __table_args__ = (
+        # Chỉ đánh index các dòng còn hiệu lực: tra cứu khi refresh và thu hồi khi đăng nhập
+        Index("ix_refresh_token_active_hash", "token_hash", unique=True, postgresql_where=text("revoked_at IS NULL")),
+        Index("ix_refresh_token_active_user", "user_id", postgresql_where=text("revoked_at IS NULL")),
+        # Kiểm tra access token còn hiệu lực (xem auth/token_store.is_access_revoked)
+        Index("ix_refresh_token_active_access_jti", "access_jti", postgresql_where=text("revoked_at IS NULL")),
+        # Phục vụ job dọn dẹp định kỳ
+        Index("ix_refresh_token_expires_at", "expires_at"),
+    )
+
 class Major(Base):
     __tablename__ ="major"
     id = Column(UUID, primary_key=True, index =True)
@@ -141,6 +153,18 @@ class SysRoleFunction(Base):
     status = Column(Integer, nullable=True)
     created_by = Column(UUID, nullable=True) # Hoặc UUID
     create_datetime = Column(DateTime, default=func.now())
+    __table_args__ = (
+        # Mỗi cặp vai trò - chức năng chỉ một dòng. create_all không thêm index vào bảng đã có,
+        # CSDL đang chạy cần áp dụng db/migrations/019_role_function_unique.sql
+        Index("ux_role_function_role_function", "role_id", "function_id", unique=True),
+    )
+
+class SysPermissionVersion(Base):
+    # Bộ đếm phiên bản phân quyền (chỉ 1 dòng id=1), tăng mỗi khi bảng vai trò/chức năng/phân quyền thay đổi
+    __tablename__ = "sys_permission_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    update_datetime = Column(DateTime, default=func.now(), onupdate=func.now())
 
 class Thesis(Base):
     __tablename__ = "thesis"
@@ -162,12 +186,19 @@ class Thesis(Base):
     notes = Column(String, nullable=True)
     committee_id = Column(UUID, nullable=True)
 
+    __table_args__ = (
+        # Phục vụ phân trang keyset theo (create_datetime, id). create_all không thêm index vào bảng đã có,
+        # CSDL đang chạy cần áp dụng db/migrations/002_thesis_keyset_index.sql
+        Index("ix_thesis_create_datetime_id", "create_datetime", "id"),
+    )
+
 
 class ThesisLecturer(Base):
     __tablename__ = 'thesis_lecturer'
     id = Column(UUID, primary_key=True, default=uuid.uuid4)
-    lecturer_id = Column(UUID, nullable=False)
-    thesis_id = Column(UUID, nullable=False)
+    # create_all không thêm index vào bảng đã có, CSDL đang chạy cần áp dụng db/migrations/001_thesis_lecturer_indexes.sql
+    lecturer_id = Column(UUID, nullable=False, index=True)
+    thesis_id = Column(UUID, nullable=False, index=True)
     role = Column(Integer)
     create_datetime = Column(DateTime, default=func.now())
 
@@ -279,8 +310,18 @@ class TaskComment(Base):
     create_datetime = Column(DateTime, default=func.now())
 
 
-
-
-
-
-
+class ThesisImportJob(Base):
+    # Trạng thái job import Excel chạy nền; lưu trong DB để mọi worker đều tra cứu được tiến độ
+    __tablename__ = 'thesis_import_job'
+    id = Column(UUID, primary_key=True, default=uuid.uuid4)
+    status = Column(String(16), nullable=False)  # pending | running | completed | failed
+    file_name = Column(String, nullable=True)
+    created_by = Column(UUID, nullable=False)
+    rows_total = Column(Integer, nullable=True)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    rows_failed = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    result = Column(JSONB, nullable=True)  # ImportResponse khi job hoàn tất
+    created_at = Column(DateTime, default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True, index=True)
@@ -0,0 +1,29 @@
+from typing import List
+from uuid import UUID
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.model import Group, GroupMember
+from schemas.group import GroupWithMembersResponse
+from services.group import build_groups_with_members
+
+
+async def get_all_groups_for_user(db: AsyncSession, user_id: UUID) -> List[GroupWithMembersResponse]:
+    """Bản async của services.group.get_all_groups_for_user."""
+    statement = (
+        select(Group)
+        .join(GroupMember, GroupMember.group_id == Group.id)
+        .where(GroupMember.student_id == user_id)
+        .order_by(GroupMember.join_date)
+    )
+    groups = list((await db.execute(statement)).scalars().unique().all())
+    # Phần ghép thành viên dùng chung với bản đồng bộ (3 truy vấn IN), chạy qua run_sync
+    return await db.run_sync(build_groups_with_members, groups)
+
+
+async def get_group_with_detailed_members(db: AsyncSession, group_id: UUID) -> GroupWithMembersResponse:
+    """Bản async của services.group.get_group_with_detailed_members."""
+    group = (await db.execute(select(Group).where(Group.id == group_id))).scalars().first()
+    if not group:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Không tìm thấy nhóm.")
+    return (await db.run_sync(build_groups_with_members, [group]))[0]
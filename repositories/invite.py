@@ -0,0 +1,56 @@
+from typing import Dict
+from uuid import UUID
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.model import Group, Information, Invite, StudentInfo
+from schemas.invite import GroupInInviteResponse, InviteDetailResponse, UserInInviteResponse
+
+
+async def get_all_invites_for_user(db: AsyncSession, user_id: UUID) -> dict:
+    """
+    Bản async của services.invite.get_all_invites_for_user: lời mời đã nhận và đã gửi
+    được lấy trong một truy vấn, nhóm và thông tin người dùng được nạp theo IN.
+    """
+    invites = (await db.execute(
+        select(Invite)
+        .where(or_(Invite.receiver_id == user_id, Invite.sender_id == user_id))
+        .order_by(Invite.create_datetime.desc())
+    )).scalars().all()
+
+    group_ids = {invite.group_id for invite in invites if invite.group_id}
+    user_ids = {invite.sender_id for invite in invites} | {invite.receiver_id for invite in invites}
+
+    group_map: Dict[UUID, Group] = {}
+    info_map: Dict[UUID, Information] = {}
+    student_info_map: Dict[UUID, StudentInfo] = {}
+    if group_ids:
+        group_map = {group.id: group for group in (await db.execute(select(Group).where(Group.id.in_(group_ids)))).scalars()}
+    if user_ids:
+        for info in (await db.execute(select(Information).where(Information.user_id.in_(user_ids)))).scalars():
+            info_map.setdefault(info.user_id, info)
+        for student_info in (await db.execute(select(StudentInfo).where(StudentInfo.user_id.in_(user_ids)))).scalars():
+            student_info_map.setdefault(student_info.user_id, student_info)
+
+    def user_details(id: UUID) -> UserInInviteResponse:
+        info = info_map.get(id)
+        student_info = student_info_map.get(id)
+        return UserInInviteResponse(
+            id=id,
+            full_name=f"{info.last_name} {info.first_name}" if info else "Không rõ",
+            student_code=student_info.student_code if student_info else None
+        )
+
+    def to_response(invite: Invite) -> InviteDetailResponse:
+        group = group_map.get(invite.group_id)
+        return InviteDetailResponse(
+            id=invite.id,
+            status=invite.status,
+            sender=user_details(invite.sender_id),
+            receiver=user_details(invite.receiver_id),
+            group=GroupInInviteResponse.from_orm(group) if group else None
+        )
+
+    return {
+        "received_invites": [to_response(invite) for invite in invites if invite.receiver_id == user_id],
+        "sent_invites": [to_response(invite) for invite in invites if invite.sender_id == user_id]
+    }
@@ -0,0 +1,73 @@
+from typing import List, Optional
+from uuid import UUID
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.model import Group, GroupMember, Mission, Task, Thesis, ThesisLecturer, User
+
+
+async def get_user_thesis_role(db: AsyncSession, thesis_id: UUID, user_id: UUID) -> Optional[str]:
+    """
+    Bản async của services.progress._get_user_thesis_role (admin / lecturer / student / None),
+    gộp các lần kiểm tra thành một truy vấn.
+    """
+    is_admin = select(User.id).where(User.id == user_id, User.user_type == 1).exists()
+    thesis_exists = select(Thesis.id).where(Thesis.id == thesis_id).exists()
+    is_lecturer = select(ThesisLecturer.id).where(
+        ThesisLecturer.thesis_id == thesis_id,
+        ThesisLecturer.lecturer_id == user_id
+    ).exists()
+    # Như bản đồng bộ: chỉ xét nhóm đầu tiên được gán cho đề tài
+    assigned_group_id = select(Group.id).where(Group.thesis_id == thesis_id).limit(1).scalar_subquery()
+    is_student = select(GroupMember.id).where(
+        GroupMember.group_id == assigned_group_id,
+        GroupMember.student_id == user_id
+    ).exists()
+
+    row = (await db.execute(select(is_admin, thesis_exists, is_lecturer, is_student))).one()
+    if row[0]:
+        return "admin"
+    if not row[1]:
+        raise HTTPException(status_code=404, detail="Không tìm thấy đề tài.")
+    if row[2]:
+        return "lecturer"
+    if row[3]:
+        return "student"
+    return None
+
+
+async def get_tasks_for_thesis(db: AsyncSession, thesis_id: UUID, user_id: UUID) -> List[Task]:
+    """Bản async của services.progress.get_tasks_for_thesis."""
+    if not await get_user_thesis_role(db, thesis_id, user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Bạn không có quyền xem các công việc của đề tài này.")
+
+    mission_id = (await db.execute(select(Mission.id).where(Mission.thesis_id == thesis_id).limit(1))).scalar()
+    if mission_id is None:
+        return []
+    tasks = await db.execute(
+        select(Task).where(Task.mission_id == mission_id).order_by(Task.priority.desc(), Task.create_datetime.asc())
+    )
+    return list(tasks.scalars().all())
+
+
+async def get_missions_for_thesis(db: AsyncSession, thesis_id: UUID, user_id: UUID) -> List[Mission]:
+    """Bản async của services.progress.get_missions_for_thesis."""
+    if not await get_user_thesis_role(db, thesis_id, user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Bạn không có quyền xem tiến độ của đề tài này.")
+    return list((await db.execute(select(Mission).where(Mission.thesis_id == thesis_id))).scalars().all())
+
+
+async def get_task_by_id(db: AsyncSession, task_id: UUID, user_id: UUID) -> Task:
+    """Bản async của services.progress.get_task_by_id."""
+    row = (await db.execute(
+        select(Task, Mission.thesis_id).outerjoin(Mission, Mission.id == Task.mission_id).where(Task.id == task_id)
+    )).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Không tìm thấy công việc.")
+    task, thesis_id = row
+    if thesis_id is None:
+        raise HTTPException(status_code=500, detail="Lỗi nội bộ: Không tìm thấy nhiệm vụ của công việc này.")
+
+    if not await get_user_thesis_role(db, thesis_id, user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Bạn không có quyền xem công việc này.")
+    return task
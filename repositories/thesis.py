@@ -0,0 +1,46 @@
+from typing import Optional, Tuple
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.model import Thesis
+from schemas.thesis import ThesisResponse
+from services.reference_data import warm_reference_data
+from services.thesis import build_thesis_responses, decode_thesis_cursor, encode_thesis_cursor, filter_theses_query
+
+
+async def list_theses(
+    db: AsyncSession,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    **filters
+) -> Tuple[list[ThesisResponse], Optional[str], Optional[int]]:
+    """
+    Bản async của services.thesis.list_theses (cùng bộ lọc, cùng cursor keyset).
+    Phần ghép giảng viên/danh mục dùng lại build_thesis_responses qua run_sync:
+    các truy vấn trong đó vẫn chạy trên kết nối asyncpg, không chiếm thread.
+    """
+    statement = filter_theses_query(select(Thesis), **filters)
+
+    total = None
+    if include_total:
+        total = (await db.execute(select(func.count()).select_from(statement.order_by(None).subquery()))).scalar_one()
+
+    if cursor:
+        cursor_datetime, cursor_id = decode_thesis_cursor(cursor)
+        statement = statement.where(tuple_(Thesis.create_datetime, Thesis.id) < tuple_(cursor_datetime, cursor_id))
+
+    statement = statement.order_by(Thesis.create_datetime.desc(), Thesis.id.desc())
+    if limit is not None:
+        # Lấy dư một bản ghi để biết còn trang sau hay không
+        statement = statement.limit(limit + 1)
+    theses = list((await db.execute(statement)).scalars().all())
+
+    next_cursor = None
+    if limit is not None and len(theses) > limit:
+        theses = theses[:limit]
+        next_cursor = encode_thesis_cursor(theses[-1])
+
+    if theses:
+        await warm_reference_data(db)
+    responses = await db.run_sync(build_thesis_responses, theses)
+    return responses, next_cursor, total
@@ -1,15 +1,20 @@
 from fastapi import APIRouter, Body, Cookie, Depends, HTTPException, status, Response
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from models.model import SysFunction,SysRole, SysRoleFunction, SysUserRole, User, RefreshToken
-from schemas.sysuser import AdminChangePasswordRequest, ChangePasswordRequest, UserBase, UserCreate, UserLogin, UserResponse
+from models.model import SysFunction,SysRole, SysRoleFunction, SysUserRole, User
+from schemas.sysuser import AdminChangePasswordRequest, BulkRegisterResponse, ChangePasswordRequest, UserBase, UserCreate, UserLogin, UserResponse
+from auth.passwords import hash_password_async, needs_rehash, verify_password_async
+from auth.permissions import permission_matrix
+from auth.rate_limit import get_client_ip, login_rate_limiter
+from auth.principal import AUTH_STATELESS, AUTH_STATELESS_CHECK_REVOCATION, TokenPrincipal, principal_cache, principal_cache_key, principal_from_claims
+from auth.token_store import find_active_refresh_token, hash_token, is_access_revoked, is_access_revoked_locally, revoke_access_token, revoke_refresh_token, revoke_user_tokens, store_refresh_token
 from auth.authentication import create_access_token, create_refresh_token,SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES,REFRESH_TOKEN_EXPIRE_DAYS, ACCESS_TOKEN_EXPIRE_MINUTES
-import bcrypt
 import jwt 
 from datetime import datetime, timedelta
 from db.database import get_db
-from services.sysuser import create_user
+from services.sysuser import BULK_REGISTER_MAX_ROWS, create_user_async, create_users_bulk, parse_bulk_register_csv
 from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
 import jwt
 from jwt import decode as jwt_decode
 from jwt.exceptions import ExpiredSignatureError,InvalidTokenError
@@ -17,7 +22,6 @@ router = APIRouter(
     prefix="/auth",
     tags=["auth"]
 )
-import hashlib
 from datetime import datetime, timedelta
 import logging
 logger = logging.getLogger(__name__)
@@ -29,11 +33,11 @@ def get_current_user(request: Request, db: Session = Depends(get_db)):
     auth_header = request.headers.get("Authorization")
     if auth_header and auth_header.startswith("Bearer "):
         token = auth_header.split(" ")[1]
-        print("🔐 Token from header:", token)
+        logger.debug("Token lấy từ header Authorization")
     else:
         token = request.cookies.get("access_token")
         token = token.decode("utf-8") if isinstance(token, bytes) else token
-        print("🍪 Token from cookie:", token)
+        logger.debug("Token lấy từ cookie")
 
     if not token:
         raise HTTPException(status_code=401, detail="Token not found")
@@ -45,60 +49,80 @@ def get_current_user(request: Request, db: Session = Depends(get_db)):
             algorithms=[ALGORITHM],
             options={"verify_exp": True}
         )
-        print("✅ Token hợp lệ:", payload)
+        logger.debug("Token hợp lệ cho user %s", payload.get("uuid"))
 
     except ExpiredSignatureError:
-        print("🔥 Token expired — sẽ trả 410")
+        logger.debug("Token đã hết hạn, trả về 410")
         raise HTTPException(status_code=410, detail="Token has expired")
 
     except InvalidTokenError as e:
-        print(f"❌ InvalidTokenError: {type(e).__name__} - {e}")
+        logger.debug("Token không hợp lệ: %s - %s", type(e).__name__, e)
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    # Lấy user từ DB
+    access_jti = payload.get("jti")
+    access_expires_at = datetime.utcfromtimestamp(payload["exp"]) if "exp" in payload else None
+
+    # Chế độ không trạng thái: dựng user từ claim đã ký, không truy vấn DB.
+    # Thu hồi dựa vào pv / tuổi tối đa của token và tập jti thu hồi trong bộ nhớ (xem AUTH_STATELESS_CHECK_REVOCATION)
+    if AUTH_STATELESS:
+        if AUTH_STATELESS_CHECK_REVOCATION:
+            revoked = is_access_revoked(db, access_jti, access_expires_at)
+        else:
+            revoked = is_access_revoked_locally(access_jti)
+        if revoked:
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+        principal = principal_from_claims(payload, db)
+        if principal:
+            return principal
+
     user_id = payload.get("uuid")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
+    # Cache ngắn hạn theo token: request lặp lại chỉ tốn một lần tra dict. Token bị thu hồi ở worker khác
+    # bị chặn khi bản cache hết hạn (AUTH_PRINCIPAL_CACHE_TTL_SECONDS); ở worker này thì chặn ngay
+    cache_key = principal_cache_key(payload)
+    principal = principal_cache.get(cache_key)
+    if principal is not None:
+        if is_access_revoked_locally(access_jti):
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+        return principal
+
+    # Token đã bị thu hồi (đăng xuất / đăng nhập lại / đã refresh): chỉ tra DB khi phải nạp lại user
+    if is_access_revoked(db, access_jti, access_expires_at):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+
+    # Lấy user từ DB
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
-    return user
+    principal = TokenPrincipal.from_user(user)
+    principal_cache.set(cache_key, principal, expires_at=payload.get("exp"))
+    return principal
 
 class PathChecker:
     def __init__(self, allowed_path: str):
         self.allowed_path = allowed_path
 
     def __call__(self, user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> User:
-        user_roles = db.query(SysUserRole.role_id)\
-            .join(SysRole, SysUserRole.role_id == SysRole.id)\
-            .filter(SysUserRole.user_id == user.id, SysRole.status == 1)\
-            .all()
-
-        role_ids = [r.role_id for r in user_roles]
+        # Quyền được kiểm tra trên ma trận phân quyền trong bộ nhớ (xem auth/permissions.py)
+        if getattr(user, "role_ids", None) is not None:
+            role_ids = user.role_ids
+        else:
+            role_ids = permission_matrix.get_user_role_ids(db, user.id)
         if not role_ids:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Bạn chưa được gán quyền hoặc tất cả quyền đã bị vô hiệu hóa."
             )
-        function = db.query(SysFunction).filter(
-            SysFunction.path == self.allowed_path,
-            SysFunction.status == 1  
-        ).first()
-
-        if not function:
+        allowed_role_ids = permission_matrix.get_allowed_role_ids(db, self.allowed_path)
+        if allowed_role_ids is None:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Đường dẫn [{self.allowed_path}] không tồn tại hoặc đã bị khóa."
             )
-        allowed = db.query(SysRoleFunction).filter(
-            SysRoleFunction.function_id == function.id,
-            SysRoleFunction.role_id.in_(role_ids),
-            SysRoleFunction.status == 1 
-        ).first()
-
-        if not allowed:
+        if not role_ids & allowed_role_ids:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Bạn không có quyền truy cập chức năng tại: {self.allowed_path}"
@@ -137,13 +161,25 @@ class PathChecker:
 
 #         return user  # Trả về user để sử dụng trong endpoint
 
+def _assign_default_role(db: Session, db_user: User, role_code: str) -> None:
+    # Tìm role trong bảng
+    default_role = db.query(SysRole).filter(SysRole.role_code == role_code).first()
+    if not default_role:
+        default_role = db.query(SysRole).filter(SysRole.id == 1).first()
+
+    if default_role:
+        user_role = SysUserRole(user_id=db_user.id, role_id=default_role.id)
+        db.add(user_role)
+        db.commit()
+        db.refresh(db_user)
+
 @router.post("/register", response_model=UserResponse)
-def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.user_name == user.user_name).first()
+async def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
+    existing_user = await run_in_threadpool(lambda: db.query(User).filter(User.user_name == user.user_name).first())
     if existing_user:
         raise HTTPException(status_code=400, detail="User with this username already exists")
     try:
-        db_user = create_user(db, user)
+        db_user = await create_user_async(db, user)
 
         # Xác định role_code và user_type_name
         role_map = {
@@ -156,17 +192,7 @@ def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
             raise HTTPException(status_code=400, detail="Invalid user type")
 
         role_code, user_type_name = role_map[user.user_type]
-
-        # Tìm role trong bảng
-        default_role = db.query(SysRole).filter(SysRole.role_code == role_code).first()
-        if not default_role:
-            default_role = db.query(SysRole).filter(SysRole.id == 1).first()
-
-        if default_role:
-            user_role = SysUserRole(user_id=db_user.id, role_id=default_role.id)
-            db.add(user_role)
-            db.commit()
-            db.refresh(db_user)
+        await run_in_threadpool(_assign_default_role, db, db_user, role_code)
 
         # Tạo dict từ db_user và thêm user_type_name
         user_dict = db_user.__dict__.copy()
@@ -177,37 +203,65 @@ def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/login")
-def login(user: UserLogin, response: Response, db: Session = Depends(get_db)):
-    """Xử lý đăng nhập và cấp token"""
-    db_user = db.query(User).filter(User.user_name == user.user_name).first()
+@router.post("/register/bulk", response_model=BulkRegisterResponse)
+async def create_users_bulk_endpoint(
+    request: Request,
+    db: Session = Depends(get_db),
+    _: User = Depends(PathChecker("/auth/register/bulk"))
+):
+    """
+    Tạo tài khoản hàng loạt (quyền theo ma trận phân quyền, xem db/migrations/020_register_bulk_function.sql).
+    Nhận JSON (mảng hoặc {"users": [...]}), CSV thô (Content-Type: text/csv) hoặc file CSV qua multipart (trường "file").
+    Trả về kết quả theo từng dòng.
+    """
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Thiếu file CSV (trường 'file')")
+            rows = parse_bulk_register_csv(await upload.read())
+        elif content_type.startswith("text/csv"):
+            rows = parse_bulk_register_csv(await request.body())
+        else:
+            payload = await request.json()
+            rows = payload.get("users") if isinstance(payload, dict) else payload
+            if not isinstance(rows, list):
+                raise HTTPException(status_code=400, detail="Dữ liệu phải là một mảng tài khoản")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Không đọc được dữ liệu: {str(e)}")
+
+    if len(rows) > BULK_REGISTER_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Tối đa {BULK_REGISTER_MAX_ROWS} tài khoản mỗi lần")
+    return await run_in_threadpool(create_users_bulk, db, rows)
+
+def _get_jti(token: str):
+    try:
+        return jwt_decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False}).get("jti")
+    except InvalidTokenError:
+        return None
 
-    if not db_user or not bcrypt.checkpw(user.password.encode('utf-8'), db_user.password.encode('utf-8')):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid username or password"
-        )
-    db.query(RefreshToken).filter(
-        RefreshToken.user_id == db_user.id,
-        RefreshToken.is_revoked == False
-    ).update({"is_revoked": True})
-    db.commit()
+def _issue_login_tokens(db: Session, db_user: User, response: Response, new_password_hash: str = None):
+    """Phần đồng bộ của đăng nhập (chạy trong threadpool): lưu hash mới nếu cần, thu hồi token cũ và cấp token mới."""
+    if new_password_hash:
+        db_user.password = new_password_hash
+    revoke_user_tokens(db, db_user.id)
     access_token = create_access_token(user_id=str(db_user.id),user_type = db_user.user_type, user_name=db_user.user_name,db=db)
     refresh_token = create_refresh_token(user_id=str(db_user.id), user_name=db_user.user_name)
-    
-    hashed_refresh_token = hashlib.sha256(refresh_token).hexdigest()
-    access_expires_at = datetime.utcnow() + timedelta(seconds=ACCESS_TOKEN_EXPIRE_MINUTES)
+
+    access_expires_at = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     refresh_expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    
-    db_refresh_token = RefreshToken(
+
+    # Chỉ lưu hash của refresh token và jti của access token, không lưu token gốc
+    store_refresh_token(
+        db,
         user_id=db_user.id,
-        token=hashed_refresh_token,
-        access_token=access_token,
+        refresh_token=refresh_token,
+        access_jti=_get_jti(access_token),
         expires_at=refresh_expires_at,
-        access_expires_at=access_expires_at,
-        is_revoked=False
+        access_expires_at=access_expires_at
     )
-    db.add(db_refresh_token)
     db.commit()
     response.set_cookie(
         key="access_token",
@@ -232,6 +286,26 @@ def login(user: UserLogin, response: Response, db: Session = Depends(get_db)):
         "refresh_token": refresh_token
     }
 
+@router.post("/login")
+async def login(user: UserLogin, request: Request, response: Response, db: Session = Depends(get_db)):
+    """
+    Xử lý đăng nhập và cấp token.
+    Lượt đăng nhập bị giới hạn theo user_name và IP (auth/rate_limit.py) trước mọi truy vấn DB/bcrypt.
+    bcrypt chạy trên pool riêng (auth/passwords.py), truy vấn DB chạy trong threadpool để không chặn event loop.
+    Nếu hash được tạo với độ khó cũ, mật khẩu được băm lại theo BCRYPT_ROUNDS hiện tại.
+    """
+    login_rate_limiter.check(user.user_name, get_client_ip(request))
+    db_user = await run_in_threadpool(lambda: db.query(User).filter(User.user_name == user.user_name).first())
+
+    if not db_user or not await verify_password_async(user.password, db_user.password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid username or password"
+        )
+    login_rate_limiter.reset_user(user.user_name)
+    new_password_hash = await hash_password_async(user.password) if needs_rehash(db_user.password) else None
+    return await run_in_threadpool(_issue_login_tokens, db, db_user, response, new_password_hash)
+
 @router.post("/refresh")
 def refresh_token(
     response: Response,
@@ -261,12 +335,7 @@ def refresh_token(
     except InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
-    hashed_input_token = hashlib.sha256(refresh_token_from_request.encode()).hexdigest()
-    db_refresh_token = db.query(RefreshToken).filter(
-        RefreshToken.token == hashed_input_token,
-        RefreshToken.is_revoked == False,
-        RefreshToken.expires_at > datetime.utcnow()
-    ).first()
+    db_refresh_token = find_active_refresh_token(db, refresh_token_from_request)
 
     if not db_refresh_token:
         raise HTTPException(
@@ -285,13 +354,16 @@ def refresh_token(
     )
     access_expires_at = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    db_refresh_token.access_token = access_token
+    # Access token cũ của phiên này không còn dùng được
+    revoke_access_token(db_refresh_token.access_jti, db_refresh_token.access_expires_at)
+    db_refresh_token.access_jti = _get_jti(access_token)
     db_refresh_token.access_expires_at = access_expires_at
 
     extend_refresh = False
     if db_refresh_token.expires_at - datetime.utcnow() < timedelta(days=1):
         new_refresh_token = create_refresh_token(user_id=str(user.id), user_name=user.user_name)
-        db_refresh_token.token = hashlib.sha256(new_refresh_token.encode()).hexdigest()
+        new_refresh_token = new_refresh_token.decode("utf-8") if isinstance(new_refresh_token, bytes) else new_refresh_token
+        db_refresh_token.token_hash = hash_token(new_refresh_token)
         db_refresh_token.expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
         extend_refresh = True
 
@@ -322,12 +394,23 @@ def refresh_token(
     }
 
 @router.post("/logout" )
-def logout(response: Response, refresh_token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Xử lý đăng xuất"""
-    db_refresh_token = db.query(RefreshToken).filter(RefreshToken.token == refresh_token).first()
-    if db_refresh_token:
-        db_refresh_token.is_revoked = True
+def logout(
+    response: Response,
+    refresh_token: str = Depends(oauth2_scheme),
+    refresh_token_cookie: str = Cookie(None, alias="refresh_token"),
+    access_token_cookie: str = Cookie(None, alias="access_token"),
+    db: Session = Depends(get_db)
+):
+    """Xử lý đăng xuất: thu hồi refresh token (theo hash) cùng access token đang dùng của phiên"""
+    token = refresh_token or refresh_token_cookie
+    if token and revoke_refresh_token(db, token):
         db.commit()
+    if access_token_cookie:
+        try:
+            payload = jwt_decode(access_token_cookie, SECRET_KEY, algorithms=[ALGORITHM])
+            revoke_access_token(payload.get("jti"), datetime.utcfromtimestamp(payload["exp"]))
+        except (InvalidTokenError, KeyError):
+            pass
     response.delete_cookie("access_token")
     response.delete_cookie("refresh_token")
     
@@ -344,32 +427,30 @@ def protected_route(user: User = Depends(PathChecker("/auth/protected"))):
     return {"message": f"Hello, {user.user_name}"}
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     data: ChangePasswordRequest,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
-    db_user = db.query(User).filter(User.id == user.id).first()
-    if not db_user or not bcrypt.checkpw(data.old_password.encode('utf-8'), db_user.password.encode('utf-8')):
+    db_user = await run_in_threadpool(lambda: db.query(User).filter(User.id == user.id).first())
+    if not db_user or not await verify_password_async(data.old_password, db_user.password):
         raise HTTPException(status_code=401, detail="Old password is incorrect")
 
-    hashed_new_password = bcrypt.hashpw(data.new_password.encode('utf-8'), bcrypt.gensalt()).decode("utf-8")
-    db_user.password = hashed_new_password
-    db.commit()
+    db_user.password = await hash_password_async(data.new_password)
+    await run_in_threadpool(db.commit)
     return {"message": "Password updated successfully"}
 
 #   dependencies=[Depends(PathChecker(""))]
 @router.post("/admin-change-password",dependencies=[Depends(PathChecker("/auth/admin-change-password"))])
-def admin_change_password(
+async def admin_change_password(
     data: AdminChangePasswordRequest,
     db: Session = Depends(get_db),
     _: User = Depends(get_current_user),
 ):
-    db_user = db.query(User).filter(User.id == data.user_id).first()
+    db_user = await run_in_threadpool(lambda: db.query(User).filter(User.id == data.user_id).first())
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    hashed_password = bcrypt.hashpw(data.new_password.encode('utf-8'), bcrypt.gensalt()).decode("utf-8")
-    db_user.password = hashed_password
-    db.commit()
+    db_user.password = await hash_password_async(data.new_password)
+    await run_in_threadpool(db.commit)
     return {"message": f"Password updated for user {db_user.user_name}"}
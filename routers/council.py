@@ -1,12 +1,15 @@
-from typing import List
-from fastapi import APIRouter, Depends, status, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, status, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from uuid import UUID
 from db.database import get_db
+from db.routing import get_read_db
 from models.model import User
 from routers.auth import get_current_user # Hoặc PathChecker nếu cần
 from schemas.council import CouncilCreateWithTheses, CouncilDetailResponse, CouncilResponse, CouncilUpdate
 import services.council as council_service
+from utils.streaming import STREAM_MEDIA_TYPES, stream_models
 
 router = APIRouter(
     prefix="/councils",
@@ -14,12 +17,14 @@ router = APIRouter(
 )
 @router.get("/", response_model=List[CouncilDetailResponse])
 def get_all_councils_endpoint(
-    db: Session = Depends(get_db),
+    stream: Optional[str] = Query(None, regex="^(ndjson|json)$"),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Lấy danh sách tất cả hội đồng và các đồ án tương ứng.
     Yêu cầu quyền Admin hoặc Giảng viên.
+    Khi truyền stream=ndjson|json, kết quả được stream dần về client.
     """
     # Thêm kiểm tra quyền
     if current_user.user_type not in [1, 3]:
@@ -27,6 +32,11 @@ def get_all_councils_endpoint(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Chỉ Admin hoặc Giảng viên mới có quyền xem danh sách hội đồng."
         )
+    if stream:
+        return StreamingResponse(
+            stream_models(council_service.iter_council_responses(db), stream),
+            media_type=STREAM_MEDIA_TYPES[stream]
+        )
     return council_service.get_all_councils_with_theses(db)
 
 # =================================
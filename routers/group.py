@@ -1,9 +1,12 @@
 from typing import List
 from fastapi import APIRouter, Body, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from db.async_database import get_async_db
 from db.database import get_db
+import repositories.group as group_repository
 from services.group import (
-    create_group, add_member, delete_group, get_all_groups_for_admin, get_all_groups_for_user, get_group_by_thesis_id, get_group_with_detailed_members, get_supervised_groups_by_lecturer, register_thesis_for_group, remove_member, transfer_leader, update_group_name
+    create_group, add_member, delete_group, get_all_groups_for_admin, get_group_by_thesis_id, get_supervised_groups_by_lecturer, register_thesis_for_group, remove_member, transfer_leader, update_group_name
 )
 from schemas.group import GroupCreate, GroupMemberCreate, GroupMemberResponse, GroupResponse, GroupWithMembersResponse, MemberDetailResponse
 from routers.auth import PathChecker, get_current_user
@@ -59,10 +62,9 @@ def remove_group_member(group_id: UUID, member_id: UUID, db: Session = Depends(g
     return remove_member(db, group_id, member_id, user.id)
 
 @router.get("/{group_id}/members", response_model=GroupWithMembersResponse)
-def list_group_members(group_id: UUID, db: Session = Depends(get_db)):
+async def list_group_members(group_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Lấy thông tin chi tiết của một nhóm bao gồm danh sách thành viên."""
-    # Gọi hàm service mới
-    return get_group_with_detailed_members(db, group_id)
+    return await group_repository.get_group_with_detailed_members(db, group_id)
 
 @router.put("/{group_id}/transfer-leader/{new_leader_id}")
 def change_group_leader(group_id: UUID, new_leader_id: UUID, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
@@ -70,13 +72,12 @@ def change_group_leader(group_id: UUID, new_leader_id: UUID, db: Session = Depen
     return transfer_leader(db, group_id, new_leader_id, user.id)
 
 @router.get("/my-groups", response_model=List[GroupWithMembersResponse]) # Sửa thành /my-groups và List[...]
-def get_my_groups_details(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_my_groups_details(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     """
     Lấy thông tin chi tiết TẤT CẢ các nhóm của người dùng đang đăng nhập,
     bao gồm cả danh sách thành viên cho mỗi nhóm.
     """
-    # Hàm service mới đã trả về một danh sách, nên chỉ cần return trực tiếp
-    return get_all_groups_for_user(db, user_id=current_user.id)
+    return await group_repository.get_all_groups_for_user(db, user_id=current_user.id)
 
 @router.get("/by-thesis/{thesis_id}", response_model=GroupWithMembersResponse)
 def get_group_by_thesis_id_endpoint(
@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from models.model import User
+from routers.auth import get_current_user
+from auth.passwords import password_pool
+from auth.permissions import permission_matrix
+from auth.rate_limit import login_rate_limiter
+from db.async_database import collect_pool_stats
+from db.routing import read_routing_stats
+from utils.cache import get_cache_stats
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"]
+)
+
+
+def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.user_type != 1:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Chỉ Admin mới có quyền xem thông tin nội bộ."
+        )
+    return current_user
+
+
+@router.get("/cache-stats")
+def read_cache_stats(current_user: User = Depends(require_admin)):
+    """
+    Thống kê hit/miss của các cache trong process hiện tại.
+    """
+    return get_cache_stats()
+
+
+@router.get("/permissions")
+def read_permission_matrix_stats(current_user: User = Depends(require_admin)):
+    """
+    Phiên bản và kích thước của ma trận phân quyền đang nạp trong process hiện tại.
+    """
+    return permission_matrix.stats()
+
+
+@router.get("/password-pool")
+def read_password_pool_stats(current_user: User = Depends(require_admin)):
+    """
+    Tình trạng pool băm mật khẩu: số tác vụ đang chạy/đang chờ, số lần bị từ chối và thời gian chờ trung bình.
+    """
+    return password_pool.stats()
+
+
+@router.get("/login-throttle")
+def read_login_throttle_stats(current_user: User = Depends(require_admin)):
+    """
+    Bộ đếm của bộ giới hạn đăng nhập: số lượt cho qua, số lượt bị chặn theo user_name/IP.
+    """
+    return login_rate_limiter.stats()
+
+
+@router.get("/db-pool")
+def read_db_pool_stats(current_user: User = Depends(require_admin)):
+    """
+    Tình trạng pool kết nối DB của process hiện tại: số kết nối đang dùng, overflow,
+    thời gian chờ lấy kết nối và số lần hết thời gian chờ (engine async chỉ có khi đã được dùng).
+    """
+    return collect_pool_stats()
+
+
+@router.get("/db-routing")
+def read_db_routing_stats(current_user: User = Depends(require_admin)):
+    """
+    Số lượt đọc được chuyển sang replica / giữ lại ở primary và số response đã gắn cookie ghim primary.
+    """
+    return read_routing_stats.stats()
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from db.async_database import get_async_db
 from db.database import get_db
-from services.invite import get_all_invites_for_user, reject_invite, send_invite, accept_invite, revoke_invite
+import repositories.invite as invite_repository
+from services.invite import reject_invite, send_invite, accept_invite, revoke_invite
 from schemas.invite import AllInvitesResponse, InviteCreate
 from routers.auth import PathChecker, get_current_user
 from models.model import User
@@ -34,6 +37,6 @@ def reject_group_invite(invite_id: UUID, db: Session = Depends(get_db), user: Us
     return reject_invite(db, invite_id, user.id)
 
 @router.get("/all-my-invites", response_model=AllInvitesResponse)
-def list_my_all_invites(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+async def list_my_all_invites(db: AsyncSession = Depends(get_async_db), user: User = Depends(get_current_user)):
     """Lấy danh sách tất cả lời mời đã gửi và đã nhận của người dùng hiện tại"""
-    return get_all_invites_for_user(db, user.id)
+    return await invite_repository.get_all_invites_for_user(db, user.id)
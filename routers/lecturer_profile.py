@@ -12,6 +12,7 @@ from services.lecturer_profile import (
 )
 from models.model import User
 from db.database import get_db
+from db.routing import get_read_db
 from routers.auth import get_current_user
 
 router = APIRouter(prefix="/lecturer-profile", tags=["Lecturer Profile"])
@@ -37,7 +38,7 @@ def update_lecturer_endpoint(
 
 @router.get("/", response_model=LecturerFullProfile)
 def get_lecturer_profile_endpoint(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: User = Depends(get_current_user)
 ):
     profile = get_lecturer_profile_by_user_id(db, user.id)
@@ -0,0 +1,112 @@
+import hmac
+import os
+from typing import List
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from auth.passwords import password_pool
+from auth.rate_limit import login_rate_limiter
+from db.async_database import collect_pool_stats
+from db.database import get_db
+from db.routing import read_routing_stats
+from routers.auth import get_current_user
+from routers.internal import require_admin
+from utils.cache import get_cache_stats
+from utils.metrics import render_family, render_registered
+
+# Prometheus scrape bằng "Authorization: Bearer <METRICS_TOKEN>"; không có token hợp lệ
+# (hoặc chưa cấu hình METRICS_TOKEN) thì chỉ Admin đã đăng nhập mới xem được
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter(tags=["metrics"])
+
+
+def _pool_lines() -> List[str]:
+    pools = collect_pool_stats()
+    lines: List[str] = []
+    for name, metric_type, key, help_text in (
+        ("db_pool_size", "gauge", "size", "Số kết nối cố định của pool."),
+        ("db_pool_checked_out", "gauge", "checked_out", "Số kết nối đang được sử dụng."),
+        ("db_pool_checked_in", "gauge", "checked_in", "Số kết nối rảnh trong pool."),
+        ("db_pool_overflow", "gauge", "overflow", "Số kết nối overflow đang mở."),
+        ("db_pool_checkouts_total", "counter", "checkouts", "Số lần lấy kết nối từ pool."),
+        ("db_pool_checkout_timeouts_total", "counter", "checkout_timeouts", "Số lần hết thời gian chờ lấy kết nối."),
+        ("db_pool_checkout_wait_seconds_total", "counter", "total_wait_seconds", "Tổng thời gian chờ lấy kết nối."),
+    ):
+        lines.extend(render_family(name, metric_type, help_text, [
+            ({"pool": pool["name"]}, pool[key]) for pool in pools if pool.get(key) is not None
+        ]))
+    return lines
+
+
+def _cache_lines() -> List[str]:
+    caches = get_cache_stats()
+    lines: List[str] = []
+    for name, metric_type, key, help_text in (
+        ("app_cache_hits_total", "counter", "hits", "Số lần đọc cache trúng."),
+        ("app_cache_misses_total", "counter", "misses", "Số lần đọc cache trượt."),
+        ("app_cache_evictions_total", "counter", "evictions", "Số phần tử bị loại khi cache đầy."),
+        ("app_cache_invalidations_total", "counter", "invalidations", "Số lần xóa cache chủ động."),
+        ("app_cache_size", "gauge", "size", "Số phần tử đang có trong cache."),
+        ("app_cache_hit_ratio", "gauge", "hit_ratio", "Tỉ lệ trúng cache từ khi process khởi động."),
+    ):
+        lines.extend(render_family(name, metric_type, help_text, [
+            ({"cache": cache["name"]}, cache[key]) for cache in caches if cache.get(key) is not None
+        ]))
+    return lines
+
+
+def _password_pool_lines() -> List[str]:
+    stats = password_pool.stats()
+    lines: List[str] = []
+    for name, metric_type, key, help_text in (
+        ("bcrypt_pool_workers", "gauge", "workers", "Số thread băm mật khẩu."),
+        ("bcrypt_pool_running", "gauge", "running", "Số tác vụ bcrypt đang chạy."),
+        ("bcrypt_pool_queued", "gauge", "queued", "Số tác vụ bcrypt đang chờ trong hàng đợi."),
+        ("bcrypt_pool_max_pending", "gauge", "max_pending", "Số tác vụ tối đa (đang chạy + đang chờ)."),
+        ("bcrypt_pool_completed_total", "counter", "completed", "Số tác vụ bcrypt đã xong."),
+        ("bcrypt_pool_rejected_total", "counter", "rejected", "Số tác vụ bị từ chối vì hàng đợi đầy."),
+    ):
+        lines.extend(render_family(name, metric_type, help_text, [({}, stats[key])]))
+    return lines
+
+
+def _login_throttle_lines() -> List[str]:
+    stats = login_rate_limiter.stats()
+    return render_family("login_attempts_total", "counter", "Số lượt đăng nhập qua bộ giới hạn theo kết quả.", [
+        ({"result": "allowed"}, stats["allowed"]),
+        ({"result": "throttled_user"}, stats["throttled_user"]),
+        ({"result": "throttled_ip"}, stats["throttled_ip"]),
+    ])
+
+
+def _read_routing_lines() -> List[str]:
+    stats = read_routing_stats.stats()
+    return render_family("db_read_sessions_total", "counter", "Số session đọc theo nơi được định tuyến tới.", [
+        ({"target": "replica"}, stats["replica_reads"]),
+        ({"target": "primary"}, stats["primary_reads"]),
+    ])
+
+
+def _authorize(request: Request, db: Session) -> None:
+    if METRICS_TOKEN and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        return
+    require_admin(get_current_user(request, db))
+
+
+@router.get("/metrics", include_in_schema=False)
+def read_metrics(request: Request, db: Session = Depends(get_db)):
+    """
+    Metric của process hiện tại theo định dạng text của Prometheus: độ trễ theo route,
+    số request đang xử lý, số truy vấn SQL, pool kết nối DB, pool bcrypt, cache và giới hạn đăng nhập.
+    """
+    _authorize(request, db)
+    lines = render_registered()
+    lines.extend(_pool_lines())
+    lines.extend(_cache_lines())
+    lines.extend(_password_pool_lines())
+    lines.extend(_login_throttle_lines())
+    lines.extend(_read_routing_lines())
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=PROMETHEUS_CONTENT_TYPE)
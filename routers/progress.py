@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from uuid import UUID
 from typing import List
+from db.async_database import get_async_db
 from db.database import get_db
+import repositories.progress as progress_repository
 from models.model import User
 from routers.auth import get_current_user
 from schemas.progress import (
@@ -27,21 +30,21 @@ def create_task_for_thesis_endpoint(
     return progress_service.create_task_for_thesis(db, task, thesis_id, current_user.id)
 
 @router.get("/theses/{thesis_id}/missions", response_model=List[MissionResponse])
-def get_missions_endpoint(
+async def get_missions_endpoint(
     thesis_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    return progress_service.get_missions_for_thesis(db, thesis_id, current_user.id)
+    return await progress_repository.get_missions_for_thesis(db, thesis_id, current_user.id)
 
 @router.get("/theses/{thesis_id}/tasks", response_model=List[TaskResponse])
-def get_tasks_for_thesis_endpoint(
+async def get_tasks_for_thesis_endpoint(
     thesis_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Lấy danh sách tất cả công việc (Task) của một đề tài (Thesis)."""
-    return progress_service.get_tasks_for_thesis(db, thesis_id, current_user.id)
+    return await progress_repository.get_tasks_for_thesis(db, thesis_id, current_user.id)
 
 @router.patch("/tasks/{task_id}/status", response_model=TaskResponse)
 def update_task_status_endpoint(
@@ -72,16 +75,16 @@ def update_task_endpoint(
     return progress_service.update_task(db, task_id, task_update_data, current_user.id)
 
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
-def get_task_by_id_endpoint(
+async def get_task_by_id_endpoint(
     task_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Lấy thông tin chi tiết của một công việc (Task) theo ID.
     Cả giảng viên và sinh viên trong đề tài đều có thể xem.
     """
-    return progress_service.get_task_by_id(db, task_id, current_user.id)
+    return await progress_repository.get_task_by_id(db, task_id, current_user.id)
 
 @router.delete("/tasks/{task_id}", status_code=status.HTTP_200_OK)
 def delete_task_endpoint(
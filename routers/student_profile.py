@@ -15,6 +15,7 @@ from services.student_profile import (
 )
 from models.model import StudentInfo, User
 from db.database import get_db
+from db.routing import get_read_db
 
 
 router = APIRouter(prefix="/student-profile", tags=["Student Profile"])
@@ -40,7 +41,7 @@ def update_student_endpoint(
 
 @router.get("/", response_model=StudentFullProfile)
 def get_student_profile_endpoint(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: User = Depends(get_current_user)
 ):
     profile = get_student_profile_by_user_id(db, user.id)
@@ -49,7 +50,7 @@ def get_student_profile_endpoint(
     return profile
 
 @router.get("/gett-all", response_model=List[StudentFullProfile])
-def get_all_students_endpoint(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_all_students_endpoint(db: Session = Depends(get_read_db), current_user: User = Depends(get_current_user)):
     """
     API để lấy danh sách sinh viên cùng chuyên ngành với người dùng đang đăng nhập.
     """
@@ -4,8 +4,9 @@ from typing import List
 from db.database import get_db
 from models.model import User
 from schemas.sys_role import RoleResponseTree
-from schemas.sys_role_function import SysRoleFunctionCreate, SysRoleFunctionUpdate, SysRoleFunctionResponse
+from schemas.sys_role_function import BulkRoleFunctionAssignRequest, BulkRoleFunctionAssignResponse, SysRoleFunctionCreate, SysRoleFunctionUpdate, SysRoleFunctionResponse
 from services.sys_role_function import (
+    assign_role_functions_bulk,
     create_role_functions,
     update_role_function,
     get_role_function_by_id,
@@ -28,6 +29,18 @@ def assign_functions_to_role_and_return_tree(
     return create_role_functions(db, role_function_data, current_user.id)
 
 
+@router.post("/bulk", response_model=BulkRoleFunctionAssignResponse)
+def assign_functions_bulk_endpoint(
+    data: BulkRoleFunctionAssignRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    API gán (grant), thu hồi (revoke) hoặc đặt lại (replace) chức năng cho nhiều vai trò cùng lúc.
+    """
+    return assign_role_functions_bulk(db, data, current_user.id)
+
+
 @router.put("/update-role/{role_id}", response_model=RoleResponseTree)
 def update_role_function_endpoint(
     role_id: int,
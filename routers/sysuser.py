@@ -1,5 +1,6 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from uuid import UUID
 from sqlalchemy.orm import Session
 from models.model import User
@@ -7,7 +8,7 @@ from routers.auth import PathChecker, get_current_user
 from schemas.student_profile import StudentFullProfile
 from schemas.sysuser import LecturerAccountResponse, UserBase, UserCreate, UserFullProfile, UserResponse
 from services.student_profile import get_student_profile_by_user_id
-from services.sysuser import create_user, get_all_lecturers, get_all_users, get_user_full_profile_by_id
+from services.sysuser import create_user_async, get_all_lecturers, get_all_users, get_user_full_profile_by_id
 from db.database import get_db
 
 router = APIRouter(
@@ -16,11 +17,11 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=UserBase)
-def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.user_name == user.user_name).first()
+async def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
+    existing_user = await run_in_threadpool(lambda: db.query(User).filter(User.user_name == user.user_name).first())
     if existing_user:
         raise HTTPException(status_code=400, detail="User with this username already exists")
-    db_user = create_user(db, user)
+    db_user = await create_user_async(db, user)
     return "Registed successfully"
 
 #   dependencies=[Depends(PathChecker(""))]
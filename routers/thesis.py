@@ -1,15 +1,16 @@
 from datetime import datetime
-from io import BytesIO
 import logging
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
-from pydantic import BaseModel
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, Response, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Dict, List
+from typing import Dict, List, Optional
+from db.async_database import get_async_read_db
 from db.database import get_db
+from db.routing import get_read_db, open_read_session
+import repositories.thesis as thesis_repository
 import pandas as pd
 from models.model import AcademyYear, Batch, Department, Information, LecturerInfo, Major, Semester, StudentInfo, Thesis, ThesisLecturer, User
-from schemas.thesis import BatchResponse, BatchSimpleResponse, DepartmentResponse, InstructorResponse, MajorResponse, ThesisBatchUpdateRequest, ThesisBatchUpdateResponse, ThesisCreate, ThesisUpdate, ThesisResponse
+from schemas.thesis import BatchResponse, BatchSimpleResponse, DepartmentResponse, ImportJobResponse, ImportResponse, InstructorResponse, MajorResponse, ThesisBatchUpdateRequest, ThesisBatchUpdateResponse, ThesisCreate, ThesisStatsResponse, ThesisStatusTransitionRequest, ThesisStatusTransitionResponse, ThesisUpdate, ThesisResponse
 from services.thesis import (
     batch_update_theses,
     create,
@@ -22,12 +23,20 @@ from services.thesis import (
     update_thesis,
     get_thesis_by_id,
     get_all_theses,
-    delete_thesis
+    delete_thesis,
+    iter_thesis_responses,
+    get_thesis_stats,
+    transition_thesis_statuses
 )
 from pathlib import Path
+from services.import_jobs import get_import_job, submit_import_job
+from services.thesis_export import EXPORT_MEDIA_TYPES, iter_theses_csv, iter_theses_xlsx
+from services.thesis_import import import_theses_from_dataframe, read_thesis_import_file
 from routers.auth import get_current_user
 from uuid import UUID
-from fastapi.responses import FileResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from utils.streaming import STREAM_MEDIA_TYPES, iter_closing, stream_models
 router = APIRouter(
     prefix="/theses",
     tags=["theses"]
@@ -35,15 +44,61 @@ router = APIRouter(
 #================================== API GET #=====================================================
 
 @router.get("/", response_model=List[ThesisResponse])
-def get_all_theses_endpoint(db: Session = Depends(get_db)):
+async def get_all_theses_endpoint(
+    request: Request,
+    response: Response,
+    status: Optional[int] = None,
+    thesis_type: Optional[int] = None,
+    batch_id: Optional[UUID] = None,
+    major_id: Optional[UUID] = None,
+    department_id: Optional[int] = None,
+    lecturer_id: Optional[UUID] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    stream: Optional[str] = Query(None, regex="^(ndjson|json)$"),
+    async_db: AsyncSession = Depends(get_async_read_db)
+):
     """
-    API để lấy danh sách tất cả các luận văn (theses) với thông tin của tất cả giảng viên hướng dẫn.
+    API để lấy danh sách các luận văn (theses) với thông tin của tất cả giảng viên hướng dẫn.
+    Hỗ trợ lọc theo status, thesis_type, batch_id, major_id, department_id, lecturer_id.
+    Khi truyền limit, kết quả được phân trang keyset: cursor trang kế tiếp nằm ở header
+    X-Next-Cursor, tổng số bản ghi (khi include_total=true) nằm ở header X-Total-Count.
+    Khi truyền stream=ndjson|json, toàn bộ kết quả (bỏ qua limit/cursor) được stream dần về client.
+    Danh sách thường đọc qua engine async (repositories/thesis.py); chỉ nhánh stream mở session đồng bộ,
+    session này được đóng sau khi stream xong.
     """
-    return get_all_theses(db)
+    filters = dict(
+        status=status,
+        thesis_type=thesis_type,
+        batch_id=batch_id,
+        major_id=major_id,
+        department_id=department_id,
+        lecturer_id=lecturer_id
+    )
+    if stream:
+        db = open_read_session(request)
+        return StreamingResponse(
+            iter_closing(stream_models(iter_thesis_responses(db, **filters), stream), db),
+            media_type=STREAM_MEDIA_TYPES[stream]
+        )
+
+    theses, next_cursor, total = await thesis_repository.list_theses(
+        async_db,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total,
+        **filters
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    return theses
 
 @router.get("/get-all/by-my-major", response_model=List[ThesisResponse])
 def get_theses_by_student_major_endpoint(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: User = Depends(get_current_user)
 ):
     """
@@ -105,28 +160,28 @@ def download_template():
 
 
 @router.get("/getall/major", response_model=List[MajorResponse])
-def get_all_majors_endpoint(db: Session = Depends(get_db)):
+def get_all_majors_endpoint(db: Session = Depends(get_read_db)):
     """
     API để lấy danh sách tất cả chuyên ngành (major).
     """
     return get_all_majors(db)
 
 @router.get("/getall/department/g", response_model=List[DepartmentResponse])
-def get_all_departments_endpoint(db: Session = Depends(get_db)):
+def get_all_departments_endpoint(db: Session = Depends(get_read_db)):
     """
     API để lấy danh sách tất cả khoa (department).
     """
     return get_all_departments(db)
 
 @router.get("/getall/batches", response_model=List[BatchResponse])
-def get_all_batches_endpoint(db: Session = Depends(get_db)):
+def get_all_batches_endpoint(db: Session = Depends(get_read_db)):
     """
     API lấy danh sách các đợt (batch) kèm học kỳ và năm học, sắp xếp từ mới đến cũ.
     """
     return get_all_batches_with_details(db)
 
 @router.get("/by-batch/{batch_id}", response_model=List[ThesisResponse])
-def get_theses_by_batch_endpoint(batch_id: UUID, db: Session = Depends(get_db)):
+def get_theses_by_batch_endpoint(batch_id: UUID, db: Session = Depends(get_read_db)):
     """
     API lấy danh sách luận văn theo đợt (batch_id).
     """
@@ -135,7 +190,7 @@ def get_theses_by_batch_endpoint(batch_id: UUID, db: Session = Depends(get_db)):
 @router.get("/batch/{batch_id}/my-major", response_model=List[ThesisResponse])
 def get_theses_by_batch_and_my_major_endpoint(
     batch_id: UUID,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: User = Depends(get_current_user)
 ):
     """
@@ -156,8 +211,50 @@ def get_theses_by_batch_and_my_major_endpoint(
     # 3. Gọi service với cả hai điều kiện
     return get_theses_by_batch_and_major(db, batch_id=batch_id, major_id=user_major_id)
 
+@router.get("/stats", response_model=ThesisStatsResponse)
+def get_thesis_stats_endpoint(
+    batch_id: Optional[UUID] = None,
+    db: Session = Depends(get_read_db),
+    user: User = Depends(get_current_user)
+):
+    """
+    Thống kê số lượng đề tài theo trạng thái, loại, chuyên ngành và đợt (dùng cho dashboard).
+    Kết quả được cache theo đợt và tự làm mới khi có thay đổi đề tài.
+    """
+    if user.user_type not in [1, 3]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Chỉ Admin hoặc Giảng viên mới có quyền xem thống kê đề tài."
+        )
+    return get_thesis_stats(db, batch_id)
+
+@router.get("/export", summary="Xuất danh sách đề tài ra Excel/CSV")
+def export_theses_endpoint(
+    batch_id: Optional[UUID] = None,
+    major_id: Optional[UUID] = None,
+    format: str = Query("xlsx", regex="^(xlsx|csv)$"),
+    db: Session = Depends(get_read_db),
+    user: User = Depends(get_current_user)
+):
+    """
+    Xuất đề tài theo đợt/chuyên ngành. Dữ liệu được đọc theo lô và stream về client,
+    cột giống file mẫu import nên file xuất ra có thể import lại.
+    """
+    if user.user_type not in [1, 3]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Chỉ Admin hoặc Giảng viên mới có quyền xuất danh sách đề tài."
+        )
+    content = iter_theses_xlsx(db, batch_id, major_id) if format == "xlsx" else iter_theses_csv(db, batch_id, major_id)
+    file_name = f"theses_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'}
+    )
+
 @router.get("/{thesis_id}", response_model=ThesisResponse)
-def get_thesis_by_id_endpoint(thesis_id: UUID, db: Session = Depends(get_db)):
+def get_thesis_by_id_endpoint(thesis_id: UUID, db: Session = Depends(get_read_db)):
     """
     API để lấy thông tin một luận văn (thesis) theo ID.
     """
@@ -171,258 +268,54 @@ def get_thesis_by_id_endpoint(thesis_id: UUID, db: Session = Depends(get_db)):
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Định nghĩa mô hình Pydantic cho phản hồi
-class ErrorItem(BaseModel):
-    row: int
-    title: str
-    error: str
-
-class ImportResponse(BaseModel):
-    success: int
-    errors: List[ErrorItem]
-    imported_theses: List[ThesisResponse] = []  # Thêm trường cho danh sách đề tài vừa import
-
-@router.post("/import-excel", response_model=ImportResponse)
+@router.post(
+    "/import-excel",
+    response_model=ImportResponse,
+    responses={202: {"model": ImportJobResponse, "description": "Job import đã được đưa vào hàng đợi (async=true)"}}
+)
 def import_thesis_from_simple_excel(
     file: UploadFile = File(...),
     status: int = 1,
+    async_mode: bool = Query(False, alias="async"),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
     """
     Import danh sách đề tài từ file Excel và trả về danh sách đề tài vừa import.
+    Toàn bộ file được kiểm tra và ghi trong một transaction; lỗi được báo theo từng dòng.
+    Khi truyền async=true, file được lưu lại và xử lý nền; API trả về ngay mã job (HTTP 202)
+    để theo dõi qua GET /theses/import-jobs/{job_id}.
     """
-    try:
-        # 1. Tìm đợt mới nhất
-        latest_batch = db.query(Batch).order_by(Batch.create_datetime.desc()).first()
-        if not latest_batch:
-            raise HTTPException(status_code=404, detail="Không tìm thấy đợt học nào trong hệ thống.")
-
-        # 2. Đọc file Excel
-        content = file.file.read()
-        df = pd.read_excel(BytesIO(content), header=4)  # Header ở dòng 5 (0-based index)
-
-        # Chuẩn hóa tên cột để khớp với file có dấu *
-        df.columns = [col.strip() for col in df.columns]  # Loại bỏ khoảng trắng thừa
-        column_mapping = {
-            "STT": "STT",
-            "TÊN ĐỀ TÀI *": "TÊN ĐỀ TÀI",
-            "NỘI DUNG YÊU CẦU *": "NỘI DUNG YÊU CẦU",
-            "MÃ GV HƯỚNG DẪN *": "MÃ GV HƯỚNG DẪN",
-            "LOẠI ĐỀ TÀI *\n1: Khóa luận kỹ sư\n2: Đồ án tốt nghiệp": "LOẠI ĐỀ TÀI",
-            "MÃ GV PHẢN BIỆN\n(Nếu loại đề tài là 2 thì có thể nhập MÃ GV PHẢN BIỆN hoặc không)": "MÃ GV PHẢN BIỆN",
-            "BỘ MÔN *\n1: KTPM\n2: HTTT\n3: KHDL&TTNT\n4: MMT-ATTT": "BỘ MÔN",
-            "CHUYÊN NGÀNH *\n(Chọn chuyên ngành bằng dropdown)": "CHUYÊN NGÀNH",
-            "GHI CHÚ": "GHI CHÚ"
-        }
-        df = df.rename(columns=column_mapping)
+    if async_mode:
+        job = submit_import_job(db, file.file, file.filename, user.id, thesis_status=status)
+        return JSONResponse(status_code=202, content=jsonable_encoder(job))
 
-        # Log DataFrame để kiểm tra
+    try:
+        df = read_thesis_import_file(file.file.read())
         logger.info(f"Đọc được {len(df)} dòng từ file Excel")
-        logger.info(f"Các cột trong DataFrame: {df.columns.tolist()}")
-        logger.info(f"Dữ liệu DataFrame:\n{df.to_dict(orient='records')}")
-        logger.info(f"Giá trị NaN:\n{df.isna()}")
-
-        created_count = 0
-        errors = []
-        newly_created_thesis_ids = []  # Lưu ID của các đề tài vừa tạo
-
-        for i, row in df.iterrows():
-            logger.info(f"Xử lý dòng {i + 6}: {row.to_dict()}")
-            try:
-                # 3. Bỏ qua dòng trống
-                if pd.isna(row.get("STT")) or pd.isna(row.get("TÊN ĐỀ TÀI")):
-                    logger.warning(f"Bỏ qua dòng {i + 6}: Thiếu STT hoặc TÊN ĐỀ TÀI. Giá trị: STT={row.get('STT')}, TÊN ĐỀ TÀI={row.get('TÊN ĐỀ TÀI')}")
-                    errors.append({
-                        "row": i + 6,
-                        "title": row.get("TÊN ĐỀ TÀI", "<trống>"),
-                        "error": "Thiếu STT hoặc TÊN ĐỀ TÀI"
-                    })
-                    continue
-
-                # 4. Xử lý Chuyên ngành
-                major_name_from_excel = row.get("CHUYÊN NGÀNH")
-                if pd.isna(major_name_from_excel):
-                    raise Exception("Cột 'CHUYÊN NGÀNH' không được để trống.")
-                major_name_to_find = str(major_name_from_excel).strip().lower()
-                major = db.query(Major).filter(func.lower(Major.name) == major_name_to_find).first()
-                if not major:
-                    raise Exception(f"Chuyên ngành '{major_name_from_excel}' không tồn tại trong cơ sở dữ liệu.")
-                major_id_val = major.id
-
-                # 5. Xử lý Giảng viên Hướng dẫn
-                instructor_codes = [code.strip() for code in str(row.get("MÃ GV HƯỚNG DẪN", "")).split(',') if code.strip()]
-                instructors = []
-                if instructor_codes:
-                    instructors = db.query(LecturerInfo).filter(LecturerInfo.lecturer_code.in_(instructor_codes)).all()
-                    if len(instructors) != len(instructor_codes):
-                        raise Exception(f"Một hoặc nhiều Mã GV Hướng Dẫn không tồn tại: {instructor_codes}")
-
-                # 6. Xử lý Giảng viên Phản biện (chỉ kiểm tra nếu LOẠI ĐỀ TÀI là 2)
-                reviewers = []  # Khởi tạo trước để tránh lỗi
-                reviewer_codes = []
-                if pd.notna(row.get("MÃ GV PHẢN BIỆN")):
-                    reviewer_codes = [code.strip() for code in str(row.get("MÃ GV PHẢN BIỆN", "")).split(',') if code.strip()]
-                if row.get("LOẠI ĐỀ TÀI") == 2 and reviewer_codes:
-                    reviewers = db.query(LecturerInfo).filter(LecturerInfo.lecturer_code.in_(reviewer_codes)).all()
-                    if len(reviewers) != len(reviewer_codes):
-                        raise Exception(f"Một hoặc nhiều Mã GV Phản Biện không tồn tại: {reviewer_codes}")
-
-                # 7. Xử lý Bộ môn
-                department_id = None
-                dept_input = row.get("BỘ MÔN")
-                if pd.notna(dept_input):
-                    dept_input_str = str(dept_input).strip()
-                    try:
-                        # Thử xử lý như ID
-                        dept_id = int(dept_input)
-                        department = db.query(Department).filter(Department.id == dept_id).first()
-                    except (ValueError, TypeError):
-                        # Xử lý như tên
-                        department = db.query(Department).filter(func.lower(Department.name) == dept_input_str.lower()).first()
-                    if not department:
-                        raise Exception(f"Bộ môn '{dept_input}' không tồn tại.")
-                    department_id = department.id
-
-                # 8. Xử lý Loại đề tài
-                thesis_type_from_excel = row.get("LOẠI ĐỀ TÀI")
-                if pd.isna(thesis_type_from_excel):
-                    raise Exception("Cột 'LOẠI ĐỀ TÀI' không được để trống.")
-                try:
-                    thesis_type_val = int(thesis_type_from_excel)
-                    if thesis_type_val not in [1, 2]:
-                        raise Exception(f"Giá trị '{thesis_type_val}' không hợp lệ cho Loại đề tài (chỉ 1 hoặc 2).")
-                except (ValueError, TypeError):
-                    raise Exception(f"Giá trị '{thesis_type_from_excel}' không phải là số hợp lệ cho Loại đề tài.")
-
-                # 9. Xử lý Ghi chú
-                notes_text = row.get("GHI CHÚ")
-                notes_text = str(notes_text).strip() if pd.notna(notes_text) else None
-
-                # 10. Tạo đối tượng ThesisCreate
-                thesis_data = ThesisCreate(
-                    title=str(row["TÊN ĐỀ TÀI"]).strip(),
-                    description=str(row.get("NỘI DUNG YÊU CẦU", "")).strip(),
-                    notes=notes_text,
-                    thesis_type=thesis_type_val,
-                    status=status,
-                    major_id=major_id_val,
-                    department_id=department_id,
-                    batch_id=latest_batch.id,
-                    start_date=latest_batch.start_date,
-                    end_date=latest_batch.end_date,
-                    instructor_ids=[lec.user_id for lec in instructors],
-                    reviewer_ids=[rev.user_id for rev in reviewers] if reviewers else []
-                )
-
-                # 11. Gọi hàm create và lưu ID
-                try:
-                    created_thesis = create(db, thesis_data, user.id)
-                    created_count += 1
-                    newly_created_thesis_ids.append(created_thesis.id)  # Lưu ID của đề tài vừa tạo
-                    logger.info(f"Đã tạo thành công đề tài: {row['TÊN ĐỀ TÀI']}")
-                except Exception as create_error:
-                    raise Exception(f"Lỗi khi tạo đề tài: {str(create_error)}")
-
-            except Exception as e:
-                logger.error(f"Lỗi ở dòng {i + 6}: {str(e)}")
-                errors.append({
-                    "row": i + 6,
-                    "title": row.get("TÊN ĐỀ TÀI", "<trống>"),
-                    "error": str(e)
-                })
-
-        # 12. Chuẩn bị danh sách đề tài vừa import
-        imported_theses = []
-        for thesis_id in newly_created_thesis_ids:
-            thesis = db.query(Thesis).filter(Thesis.id == thesis_id).first()
-            if thesis:
-                thesis_lecturers = db.query(ThesisLecturer).filter(ThesisLecturer.thesis_id == thesis.id).all()
-                instructors_list = []
-                reviewers_list = []
-
-                for tl in thesis_lecturers:
-                    lecturer_info = db.query(LecturerInfo).filter(LecturerInfo.user_id == tl.lecturer_id).first()
-                    if lecturer_info:
-                        user_info = db.query(Information).filter(Information.user_id == lecturer_info.user_id).first()
-                        department = db.query(Department).filter(Department.id == lecturer_info.department).first()
-
-                        if user_info:
-                            lecturer_details = InstructorResponse(
-                                id=tl.lecturer_id,  
-                                name=f"{user_info.last_name} {user_info.first_name}",
-                                email=lecturer_info.email,
-                                lecturer_code=lecturer_info.lecturer_code,
-                                department=lecturer_info.department,
-                                department_name=department.name if department else None
-                            )
-                            if tl.role == 1:  # Giảng viên hướng dẫn
-                                instructors_list.append(lecturer_details)
-                            elif tl.role == 2:  # Giảng viên phản biện
-                                reviewers_list.append(lecturer_details)
-
-                batch = db.query(Batch).filter(Batch.id == thesis.batch_id).first()
-                semester = db.query(Semester).filter(Semester.id == batch.semester_id).first() if batch else None
-                academy_year = db.query(AcademyYear).filter(AcademyYear.id == semester.academy_year_id).first() if semester else None
-                major = db.query(Major).filter(Major.id == thesis.major_id).first()
-                major_name = major.name if major else "Chuyên ngành không xác định"
-                department_response = None
-                if thesis.department_id:
-                    department = db.query(Department).filter(Department.id == thesis.department_id).first()
-                    if department:
-                        department_response = DepartmentResponse.from_orm(department)
-
-                imported_theses.append(ThesisResponse(
-                    id=thesis.id,
-                    thesis_type=thesis.thesis_type,
-                    status=(
-                        "Từ chối" if thesis.status == 0 else
-                        "Chờ duyệt" if thesis.status == 1 else
-                        "Đã duyệt cấp bộ môn" if thesis.status == 2 else
-                        "Đã duyệt cấp khoa" if thesis.status == 3 else
-                        "Chưa được đăng ký" if thesis.status == 4 else
-                        "Đã được đăng ký" if thesis.status == 5 else
-                        "Không xác định"
-                    ),
-                    reason=thesis.reason,
-                    name=thesis.title,
-                    major_id=thesis.major_id,
-                    description=thesis.description,
-                    start_date=thesis.start_date,
-                    end_date=thesis.end_date,
-                    instructors=instructors_list,
-                    reviewers=reviewers_list,
-                    department=department_response,
-                    committee_id=thesis.committee_id,
-                    name_thesis_type="Khóa luận" if thesis.thesis_type == 1 else "Đồ án",
-                    batch={
-                        "id": batch.id,
-                        "name": batch.name,
-                        "start_date": batch.start_date,
-                        "end_date": batch.end_date,
-                        "semester": {
-                            "id": semester.id,
-                            "name": semester.name,
-                            "start_date": semester.start_date,
-                            "end_date": semester.end_date,
-                            "academy_year": {
-                                "id": academy_year.id,
-                                "name": academy_year.name,
-                                "start_date": academy_year.start_date,
-                                "end_date": academy_year.end_date
-                            } if academy_year else None
-                        } if semester else None
-                    } if batch else None,
-                    major=major_name
-                ))
-
-        # 13. Trả về kết quả
-        return {"success": created_count, "errors": errors, "imported_theses": imported_theses}
-
+        return import_theses_from_dataframe(db, df, user.id, thesis_status=status)
+    except HTTPException:
+        raise
     except Exception as e:
+        db.rollback()
         logger.error(f"Lỗi chung khi xử lý file: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Lỗi xử lý file Excel: {str(e)}")
 
+@router.get("/import-jobs/{job_id}", response_model=ImportJobResponse)
+def get_import_job_endpoint(
+    job_id: UUID,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """
+    Theo dõi tiến độ của một job import: số dòng đã xử lý, số dòng lỗi và kết quả cuối cùng.
+    Chỉ người tạo job hoặc Admin được xem.
+    """
+    job = get_import_job(db, job_id)
+    if not job or (job.created_by != user.id and user.user_type != 1):
+        raise HTTPException(status_code=404, detail="Không tìm thấy job import.")
+    return job
+
 @router.post("/", response_model=ThesisResponse)
 def create_thesis_endpoint(
     thesis: ThesisCreate,
@@ -446,6 +339,22 @@ def batch_update_theses_endpoint(
     """
     return batch_update_theses(db, update_request, user.id)
 
+@router.post("/status-transitions", response_model=ThesisStatusTransitionResponse)
+def transition_thesis_statuses_endpoint(
+    transition_request: ThesisStatusTransitionRequest,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """
+    API chuyển trạng thái hàng loạt (duyệt, từ chối, mở đăng ký...) và trả về kết quả theo từng đề tài.
+    """
+    if user.user_type not in [1, 3]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Chỉ Admin hoặc Giảng viên mới có quyền chuyển trạng thái đề tài."
+        )
+    return transition_thesis_statuses(db, transition_request)
+
 @router.put("/{thesis_id}", response_model=ThesisResponse)
 def update_thesis_endpoint(
     thesis_id: UUID,
@@ -18,6 +18,20 @@ class AssignFunctionsResponse(BaseModel):
     role_id: int
     assigned_function_ids: List[int]
 
+class BulkRoleFunctionAssignRequest(BaseModel):
+    role_ids: List[int]
+    function_ids: List[int]
+    # "grant": chỉ thêm, "revoke": chỉ thu hồi, "replace": đặt đúng bằng function_ids
+    mode: str = "grant"
+    status: Optional[int] = None
+
+class BulkRoleFunctionAssignResponse(BaseModel):
+    message: str
+    role_ids: List[int]
+    added: int
+    removed: int
+    updated: int
+
 class SysRoleFunctionUpdate(BaseModel):
     role_name: Optional[str] = None
     description: Optional[str] = None
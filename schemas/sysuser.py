@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 from uuid import UUID
 from schemas.information import InformationResponse
@@ -23,6 +23,18 @@ class UserUpdate(BaseModel):
     is_active: Optional[bool] = None
     user_type: Optional[int] = None
 
+class BulkRegisterRowResult(BaseModel):
+    row: int
+    user_name: Optional[str] = None
+    status: str  # created | error
+    id: Optional[UUID] = None
+    error: Optional[str] = None
+
+class BulkRegisterResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkRegisterRowResult]
+
 class LecturerAccountResponse(BaseModel):
     id: UUID
     user_name: str
@@ -140,6 +140,75 @@ class ThesisBatchUpdateResponse(BaseModel):
     success_count: int
     errors: List[BatchUpdateError]
 
+class ErrorItem(BaseModel):
+    row: int
+    title: str
+    error: str
+
+class ImportResponse(BaseModel):
+    success: int
+    errors: List[ErrorItem]
+    imported_theses: List[ThesisResponse] = []  # Danh sách đề tài vừa import
+
+class ImportJobResponse(BaseModel):
+    id: UUID
+    status: str  # pending | running | completed | failed
+    file_name: Optional[str] = None
+    created_by: UUID
+    rows_total: Optional[int] = None
+    rows_processed: int = 0
+    rows_failed: int = 0
+    error: Optional[str] = None
+    result: Optional[ImportResponse] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+
+
+
+class ThesisStatusTransitionRequest(BaseModel):
+    thesis_ids: List[UUID]
+    status: int
+    reason: Optional[str] = None
 
+class ThesisStatusTransitionResult(BaseModel):
+    id: UUID
+    success: bool
+    from_status: Optional[int] = None
+    status: Optional[int] = None
+    error: Optional[str] = None
+
+class ThesisStatusTransitionResponse(BaseModel):
+    success_count: int
+    results: List[ThesisStatusTransitionResult]
 
+class ThesisStatusCount(BaseModel):
+    status: Optional[int] = None  # None: đề tài chưa có trạng thái ("Không xác định")
+    label: str
+    count: int
+
+class ThesisTypeCount(BaseModel):
+    thesis_type: int
+    name: str
+    count: int
 
+class ThesisMajorCount(BaseModel):
+    major_id: UUID
+    major_name: Optional[str] = None
+    count: int
+
+class ThesisBatchCount(BaseModel):
+    batch_id: UUID
+    batch_name: Optional[str] = None
+    count: int
+
+class ThesisStatsResponse(BaseModel):
+    batch_id: Optional[UUID] = None
+    total: int
+    by_status: List[ThesisStatusCount]
+    by_type: List[ThesisTypeCount]
+    by_major: List[ThesisMajorCount]
+    by_batch: List[ThesisBatchCount]
+    generated_at: datetime
@@ -1,10 +1,11 @@
-from typing import List
+from typing import Iterator, List
 from sqlalchemy.orm import Session
 from uuid import UUID
 from fastapi import HTTPException, status
 from models.model import Committee, Department, Information, LecturerInfo, Major, Thesis, ThesisCommittee, ThesisLecturer, User
 from schemas.council import CouncilCreateWithTheses, CouncilDetailResponse, CouncilMemberResponse, CouncilUpdate, ThesisSimpleResponse
 from schemas.thesis import InstructorResponse, MajorResponse
+from services.reference_data import get_departments, get_majors
 
 def create_council_and_assign(db: Session, council_data: CouncilCreateWithTheses, user_id: UUID):
     """
@@ -13,7 +14,7 @@ def create_council_and_assign(db: Session, council_data: CouncilCreateWithTheses
     """
     
     # 1. Kiểm tra chuyên ngành (major) có tồn tại không
-    major = db.query(Major).filter(Major.id == council_data.major_id).first()
+    major = get_majors(db).get(council_data.major_id)
     if not major:
         raise HTTPException(status_code=404, detail=f"Không tìm thấy chuyên ngành với ID: {council_data.major_id}")
 
@@ -75,61 +76,64 @@ def create_council_and_assign(db: Session, council_data: CouncilCreateWithTheses
     
     return new_council
 
-def get_all_councils_with_theses(db: Session) -> List[CouncilDetailResponse]:
+def build_council_responses(db: Session, councils: List[Committee]) -> List[CouncilDetailResponse]:
     """
-    Lấy danh sách tất cả các hội đồng, kèm theo các đồ án (với thông tin chi tiết) 
+    Dựng CouncilDetailResponse cho một tập hội đồng, kèm các đồ án (với thông tin chi tiết)
     và thành viên (với thông tin chi tiết) tương ứng.
     PHIÊN BẢN KHÔNG SỬ DỤNG JOIN, TỐI ƯU HÓA TRUY VẤN.
     """
-    # 1. Lấy tất cả các hội đồng
-    councils = db.query(Committee).order_by(Committee.create_datetime.desc()).all()
     if not councils:
         return []
 
-    # 2. Thu thập tất cả các ID cần thiết trong một lần duyệt
+    # 1. Thu thập tất cả các ID cần thiết trong một lần duyệt
     council_ids = {c.id for c in councils}
     
     theses_in_councils = db.query(Thesis).filter(Thesis.committee_id.in_(council_ids)).all()
     thesis_ids = {t.id for t in theses_in_councils}
     
-    council_major_ids = {c.major_id for c in councils if c.major_id}
-    thesis_major_ids = {t.major_id for t in theses_in_councils}
-    all_major_ids = council_major_ids.union(thesis_major_ids)
-
     assignments = db.query(ThesisCommittee).filter(ThesisCommittee.committee_id.in_(council_ids)).all()
     member_user_ids = {a.member_id for a in assignments}
 
-    instructor_assignments = db.query(ThesisLecturer).filter(ThesisLecturer.thesis_id.in_(thesis_ids), ThesisLecturer.role == 1).all()
+    instructor_assignments = []
+    if thesis_ids:
+        instructor_assignments = db.query(ThesisLecturer).filter(ThesisLecturer.thesis_id.in_(thesis_ids), ThesisLecturer.role == 1).all()
     instructor_user_ids = {i.lecturer_id for i in instructor_assignments}
     
     all_user_ids = member_user_ids.union(instructor_user_ids)
 
-    # 3. Truy vấn tất cả dữ liệu chi tiết trong vài câu query lớn
-    all_user_infos = db.query(Information).filter(Information.user_id.in_(all_user_ids)).all()
-    all_lecturer_details = db.query(LecturerInfo).filter(LecturerInfo.user_id.in_(all_user_ids)).all()
-    all_department_ids = {lec.department for lec in all_lecturer_details if lec.department}
-    all_departments = db.query(Department).filter(Department.id.in_(all_department_ids)).all()
-    all_majors = db.query(Major).filter(Major.id.in_(all_major_ids)).all()
+    # 2. Truy vấn tất cả dữ liệu chi tiết trong vài câu query lớn
+    all_user_infos = db.query(Information).filter(Information.user_id.in_(all_user_ids)).all() if all_user_ids else []
+    all_lecturer_details = db.query(LecturerInfo).filter(LecturerInfo.user_id.in_(all_user_ids)).all() if all_user_ids else []
+    all_departments = get_departments(db).values()
+    major_map = get_majors(db)
 
-    # 4. Tạo các "map" để tra cứu dữ liệu nhanh trong Python
+    # 3. Tạo các "map" để tra cứu dữ liệu nhanh trong Python
     info_map = {info.user_id: f"{info.last_name} {info.first_name}" for info in all_user_infos}
     lecturer_map = {lec.user_id: lec for lec in all_lecturer_details}
     department_map = {dept.id: dept.name for dept in all_departments}
-    major_map = {m.id: m for m in all_majors}
     council_role_map = {1: 'Chủ tịch Hội đồng', 2: 'Uỷ viên - Thư ký', 3: 'Uỷ viên'}
     status_map = {0: "Từ chối", 1: "Chờ duyệt", 2: "Đã duyệt cấp bộ môn", 3: "Đã duyệt cấp khoa", 4: "Chưa được đăng ký", 5: "Đã được đăng ký"}
 
-    # 5. Xây dựng cấu trúc response hoàn chỉnh
+    theses_by_council = {}
+    for thesis in theses_in_councils:
+        theses_by_council.setdefault(thesis.committee_id, []).append(thesis)
+    instructors_by_thesis = {}
+    for inst_assign in instructor_assignments:
+        instructors_by_thesis.setdefault(inst_assign.thesis_id, []).append(inst_assign)
+    members_by_council = {}
+    for assign in assignments:
+        # Mỗi thành viên được gán cho mọi đồ án của hội đồng, chỉ giữ một bản ghi cho mỗi người
+        members_by_council.setdefault(assign.committee_id, {})[assign.member_id] = assign
+
+    # 4. Xây dựng cấu trúc response hoàn chỉnh
     final_results = []
     for council in councils:
-        # Lọc và tạo danh sách đồ án cho hội đồng hiện tại
+        # Tạo danh sách đồ án cho hội đồng hiện tại
         theses_list = []
-        current_theses = [t for t in theses_in_councils if t.committee_id == council.id]
-        for thesis in current_theses:
-            # Lọc và tạo danh sách GVHD cho đồ án hiện tại
+        for thesis in theses_by_council.get(council.id, []):
+            # Tạo danh sách GVHD cho đồ án hiện tại
             instructor_list = []
-            current_instructors_assign = [i for i in instructor_assignments if i.thesis_id == thesis.id]
-            for inst_assign in current_instructors_assign:
+            for inst_assign in instructors_by_thesis.get(thesis.id, []):
                 lecturer_info = lecturer_map.get(inst_assign.lecturer_id)
                 if lecturer_info:
                     dept_name = department_map.get(lecturer_info.department, "Không xác định")
@@ -157,10 +161,9 @@ def get_all_councils_with_theses(db: Session) -> List[CouncilDetailResponse]:
                 instructors=instructor_list
             ))
 
-        # Lọc và tạo danh sách thành viên cho hội đồng hiện tại
+        # Tạo danh sách thành viên cho hội đồng hiện tại
         members_list = []
-        unique_members = {assign.member_id: assign for assign in assignments if assign.committee_id == council.id}.values()
-        for member_assign in unique_members:
+        for member_assign in members_by_council.get(council.id, {}).values():
             lecturer_details = lecturer_map.get(member_assign.member_id)
             department_name = department_map.get(lecturer_details.department, "Không xác định") if lecturer_details else "Không xác định"
             
@@ -193,6 +196,29 @@ def get_all_councils_with_theses(db: Session) -> List[CouncilDetailResponse]:
         
     return final_results
 
+def get_all_councils_with_theses(db: Session) -> List[CouncilDetailResponse]:
+    """
+    Lấy danh sách tất cả các hội đồng, kèm theo các đồ án và thành viên tương ứng.
+    """
+    councils = db.query(Committee).order_by(Committee.create_datetime.desc()).all()
+    return build_council_responses(db, councils)
+
+def iter_council_responses(db: Session, chunk_size: int = 50) -> Iterator[CouncilDetailResponse]:
+    """
+    Duyệt tất cả hội đồng bằng con trỏ phía server (yield_per) và trả về từng CouncilDetailResponse,
+    dựng theo từng lô chunk_size hội đồng để bộ nhớ không tăng theo tổng số hội đồng.
+    """
+    query = db.query(Committee).order_by(Committee.create_datetime.desc()).yield_per(chunk_size)
+
+    chunk = []
+    for council in query:
+        chunk.append(council)
+        if len(chunk) >= chunk_size:
+            yield from build_council_responses(db, chunk)
+            chunk = []
+    if chunk:
+        yield from build_council_responses(db, chunk)
+
 def update_council(db: Session, council_id: UUID, council_data: CouncilUpdate):
     """
     Cập nhật thông tin của một hội đồng.
@@ -0,0 +1,102 @@
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+from sqlalchemy.orm import Session
+from auth.permissions import permission_matrix
+from models.model import SysFunction, SysRoleFunction
+from schemas.sys_role import FunctionResponseTree
+from utils.cache import TTLCache
+
+# Cây chức năng + danh sách chức năng theo vai trò, cache theo phiên bản phân quyền
+# (mọi thao tác ghi SysRole/SysFunction/SysRoleFunction đều tăng phiên bản, xem auth/permissions.py)
+_tree_cache = TTLCache("function_tree", ttl_seconds=3600, maxsize=2)
+
+
+def status_label_vi(value: Optional[int]) -> str:
+    return "Hoạt động" if value == 1 else "Ngừng hoạt động"
+
+
+def status_label_en(value: Optional[int]) -> str:
+    return "enabled" if value == 1 else "disabled"
+
+
+class FunctionTree:
+    """
+    Ảnh chụp toàn bộ SysFunction (đã dựng quan hệ cha - con) và các function_id đã cấp cho từng vai trò.
+    Chỉ chứa dữ liệu thuần, được dùng chung giữa các request; mỗi lần trả về sẽ dựng FunctionResponseTree mới.
+    """
+
+    def __init__(self, functions: List[dict], role_function_ids: Dict[int, FrozenSet[int]]):
+        self.functions: Dict[int, dict] = {f["id"]: f for f in functions}
+        self.children: Dict[Optional[int], List[int]] = {}
+        for f in functions:
+            self.children.setdefault(f["parent_id"], []).append(f["id"])
+        self.role_function_ids = role_function_ids
+
+    def assigned_ids(self, role_id: int) -> FrozenSet[int]:
+        return self.role_function_ids.get(role_id, frozenset())
+
+    def _node(self, function_id: int, status_label: Callable, is_assigned: bool) -> FunctionResponseTree:
+        data = dict(self.functions[function_id])
+        data["status"] = status_label(data["status"])
+        return FunctionResponseTree(**data, is_assigned=is_assigned, children=[])
+
+    def assigned_tree(self, assigned_ids: Iterable[int], status_label: Callable = status_label_vi, mark_assigned: bool = False) -> List[FunctionResponseTree]:
+        """
+        Cây chỉ gồm các chức năng đã cấp: gốc là chức năng không có cha,
+        chức năng có cha nhưng cha chưa được cấp sẽ bị bỏ qua.
+        """
+        assigned = set(assigned_ids)
+
+        def build(parent_id: Optional[int]) -> List[FunctionResponseTree]:
+            nodes = []
+            for function_id in self.children.get(parent_id, ()):
+                if function_id in assigned:
+                    node = self._node(function_id, status_label, mark_assigned)
+                    node.children = build(function_id)
+                    nodes.append(node)
+            return nodes
+
+        return build(None)
+
+    def full_tree(self, assigned_ids: Iterable[int], status_label: Callable = status_label_vi) -> List[FunctionResponseTree]:
+        """
+        Cây đầy đủ kèm cờ is_assigned; chỉ giữ các nhánh gốc có ít nhất một chức năng đã cấp.
+        """
+        assigned = set(assigned_ids)
+
+        def build(function_id: int) -> FunctionResponseTree:
+            node = self._node(function_id, status_label, function_id in assigned)
+            node.children = [build(child_id) for child_id in self.children.get(function_id, ())]
+            return node
+
+        def has_assigned(function_id: int) -> bool:
+            return function_id in assigned or any(has_assigned(child_id) for child_id in self.children.get(function_id, ()))
+
+        return [build(root_id) for root_id in self.children.get(None, ()) if has_assigned(root_id)]
+
+
+def _load_function_tree(db: Session) -> FunctionTree:
+    functions = [
+        {
+            "id": f.id,
+            "name": f.name,
+            "path": f.path,
+            "type": f.type,
+            "parent_id": f.parent_id,
+            "description": f.description,
+            "status": f.status,
+        }
+        for f in db.query(
+            SysFunction.id, SysFunction.name, SysFunction.path, SysFunction.type,
+            SysFunction.parent_id, SysFunction.description, SysFunction.status
+        ).order_by(SysFunction.id).all()
+    ]
+    role_function_ids: Dict[int, set] = {}
+    for role_id, function_id in db.query(SysRoleFunction.role_id, SysRoleFunction.function_id).all():
+        role_function_ids.setdefault(role_id, set()).add(function_id)
+    return FunctionTree(functions, {role_id: frozenset(ids) for role_id, ids in role_function_ids.items()})
+
+
+def get_function_tree(db: Session) -> FunctionTree:
+    """Hai truy vấn khi cache trống hoặc phân quyền vừa thay đổi, còn lại không truy vấn."""
+    permission_matrix.ensure_fresh(db)
+    return _tree_cache.get_or_load(permission_matrix.version, lambda: _load_function_tree(db))
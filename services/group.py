@@ -6,7 +6,8 @@ from schemas.group import (
 )
 from uuid import UUID
 from fastapi import HTTPException, status
-from typing import List
+from services.thesis import invalidate_thesis_stats
+from typing import Dict, List
 
 def is_member_of_any_group(db: Session, user_id: UUID):
     """Kiểm tra người dùng đã thuộc nhóm nào chưa"""
@@ -124,48 +125,14 @@ def get_all_groups_for_user(db: Session, user_id: UUID) -> List[GroupWithMembers
     """
     Lấy thông tin TẤT CẢ các nhóm và danh sách thành viên của một user cụ thể.
     """
-    user_memberships = db.query(GroupMember).filter(GroupMember.student_id == user_id).all()
-
-    if not user_memberships:
-        return []
-
-    all_groups_list: List[GroupWithMembersResponse] = []
-    
-    for membership in user_memberships:
-        group_id = membership.group_id
-        # Đối tượng group ở đây đã chứa thông tin thesis_id
-        group = db.query(Group).filter(Group.id == group_id).first()
-        if not group:
-            continue
-
-        all_members_in_group = db.query(GroupMember).filter(GroupMember.group_id == group_id).all()
-
-        member_details_list: List[MemberDetailResponse] = []
-        for member in all_members_in_group:
-            student_user_id = member.student_id
-            info = db.query(Information).filter(Information.user_id == student_user_id).first()
-            student_info = db.query(StudentInfo).filter(StudentInfo.user_id == student_user_id).first()
-
-            if info and student_info:
-                member_obj = MemberDetailResponse(
-                    user_id=student_user_id,
-                    full_name=f"{info.last_name} {info.first_name}",
-                    student_code=student_info.student_code,
-                    is_leader=member.is_leader or False
-                )
-                member_details_list.append(member_obj)
-
-        group_obj = GroupWithMembersResponse(
-            id=group.id,
-            name=group.name,
-            leader_id=group.leader_id,
-            members=member_details_list,
-            # THÊM DỮ LIỆU VÀO ĐÂY
-            thesis_id=group.thesis_id
-        )
-        all_groups_list.append(group_obj)
-
-    return all_groups_list
+    groups = (
+        db.query(Group)
+        .join(GroupMember, GroupMember.group_id == Group.id)
+        .filter(GroupMember.student_id == user_id)
+        .order_by(GroupMember.join_date)
+        .all()
+    )
+    return build_groups_with_members(db, groups)
 
 def get_supervised_groups_by_lecturer(db: Session, lecturer_id: UUID) -> List[GroupWithMembersResponse]:
     """Lấy tất cả các nhóm mà một giảng viên đang hướng dẫn."""
@@ -184,27 +151,54 @@ def get_supervised_groups_by_lecturer(db: Session, lecturer_id: UUID) -> List[Gr
     # 2. Từ danh sách đề tài, tìm các nhóm tương ứng
     groups = db.query(Group).filter(Group.thesis_id.in_(supervised_thesis_ids)).all()
     
-    # 3. Lấy thông tin chi tiết cho từng nhóm
-    results = []
-    for group in groups:
-        # Tái sử dụng hàm đã có để lấy chi tiết nhóm
-        group_details = get_group_with_detailed_members(db, group.id)
-        if group_details:
-            results.append(group_details)
-            
-    return results
+    # 3. Lấy thông tin chi tiết cho các nhóm
+    return build_groups_with_members(db, groups)
 
 def get_all_groups_for_admin(db: Session) -> List[GroupWithMembersResponse]:
     """Lấy tất cả các nhóm trong hệ thống."""
     all_groups = db.query(Group).order_by(Group.create_datetime.desc()).all()
-    
-    results = []
-    for group in all_groups:
-        group_details = get_group_with_detailed_members(db, group.id)
-        if group_details:
-            results.append(group_details)
-            
-    return results
+    return build_groups_with_members(db, all_groups)
+
+def build_groups_with_members(db: Session, groups: List[Group]) -> List[GroupWithMembersResponse]:
+    """
+    Ghép thành viên cho nhiều nhóm bằng 3 truy vấn IN (thành viên, Information, StudentInfo)
+    thay vì 2 truy vấn cho mỗi thành viên của mỗi nhóm.
+    """
+    if not groups:
+        return []
+    members = db.query(GroupMember).filter(GroupMember.group_id.in_([group.id for group in groups])).all()
+
+    student_ids = {member.student_id for member in members}
+    info_map: Dict[UUID, Information] = {}
+    student_info_map: Dict[UUID, StudentInfo] = {}
+    if student_ids:
+        for info in db.query(Information).filter(Information.user_id.in_(student_ids)).all():
+            info_map.setdefault(info.user_id, info)
+        for student_info in db.query(StudentInfo).filter(StudentInfo.user_id.in_(student_ids)).all():
+            student_info_map.setdefault(student_info.user_id, student_info)
+
+    members_by_group: Dict[UUID, List[MemberDetailResponse]] = {}
+    for member in members:
+        info = info_map.get(member.student_id)
+        student_info = student_info_map.get(member.student_id)
+        if info and student_info:
+            members_by_group.setdefault(member.group_id, []).append(MemberDetailResponse(
+                user_id=member.student_id,
+                full_name=f"{info.last_name} {info.first_name}",
+                student_code=student_info.student_code,
+                is_leader=member.is_leader or False
+            ))
+
+    return [
+        GroupWithMembersResponse(
+            id=group.id,
+            name=group.name,
+            leader_id=group.leader_id,
+            thesis_id=group.thesis_id,
+            members=members_by_group.get(group.id, [])
+        )
+        for group in groups
+    ]
 
 def update_group_name(db: Session, group_id: UUID, new_name: str, user_id: UUID):
     """Cập nhật tên của một nhóm (chỉ nhóm trưởng)"""
@@ -226,28 +220,7 @@ def update_group_name(db: Session, group_id: UUID, new_name: str, user_id: UUID)
 
 def get_detailed_members_of_group(db: Session, group_id: UUID) -> List[MemberDetailResponse]:
     """Lấy danh sách thành viên chi tiết của một nhóm."""
-    group = db.query(Group).filter(Group.id == group_id).first()
-    if not group:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Không tìm thấy nhóm.")
-
-    all_members_in_group = db.query(GroupMember).filter(GroupMember.group_id == group_id).all()
-    
-    member_details_list: List[MemberDetailResponse] = []
-    for member in all_members_in_group:
-        student_user_id = member.student_id
-        info = db.query(Information).filter(Information.user_id == student_user_id).first()
-        student_info = db.query(StudentInfo).filter(StudentInfo.user_id == student_user_id).first()
-
-        if info and student_info:
-            member_obj = MemberDetailResponse(
-                user_id=student_user_id,
-                full_name=f"{info.last_name} {info.first_name}",
-                student_code=student_info.student_code,
-                is_leader=member.is_leader or False
-            )
-            member_details_list.append(member_obj)
-            
-    return member_details_list
+    return get_group_with_detailed_members(db, group_id).members
 
 # HÀM MỚI ĐỂ GỘP THÔNG TIN NHÓM VÀ THÀNH VIÊN
 def get_group_with_detailed_members(db: Session, group_id: UUID) -> GroupWithMembersResponse:
@@ -256,20 +229,9 @@ def get_group_with_detailed_members(db: Session, group_id: UUID) -> GroupWithMem
     group = db.query(Group).filter(Group.id == group_id).first()
     if not group:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Không tìm thấy nhóm.")
-        
-    # 2. Lấy danh sách thành viên chi tiết
-    members_list = get_detailed_members_of_group(db, group_id)
-    
-    # 3. Tạo đối tượng trả về hoàn chỉnh
-    response = GroupWithMembersResponse(
-        id=group.id,
-        name=group.name,
-        leader_id=group.leader_id,
-        thesis_id=group.thesis_id,
-        members=members_list
-    )
-    
-    return response
+
+    # 2. Ghép thành viên bằng cùng bộ truy vấn IN với danh sách nhóm
+    return build_groups_with_members(db, [group])[0]
 
 
 def delete_group(db: Session, group_id: UUID, user_id: UUID):
@@ -306,8 +268,8 @@ def get_group_by_thesis_id(db: Session, thesis_id: UUID):
             detail="Không tìm thấy nhóm nào đã đăng ký cho đề tài này."
         )
         
-    # 3. Nếu tìm thấy, tái sử dụng hàm đã có để lấy thông tin chi tiết của nhóm
-    return get_group_with_detailed_members(db, group.id)
+    # 3. Nếu tìm thấy, ghép thành viên cho nhóm
+    return build_groups_with_members(db, [group])[0]
 
 def register_thesis_for_group(db: Session, group_id: UUID, thesis_id: UUID, user_id: UUID):
     """Đăng ký một đề tài cho nhóm (chỉ nhóm trưởng)"""
@@ -398,5 +360,6 @@ def register_thesis_for_group(db: Session, group_id: UUID, thesis_id: UUID, user
     thesis_to_register.status = 5 # Chuyển trạng thái thành "Đã đăng ký"
     
     db.commit()
+    invalidate_thesis_stats(thesis_to_register.batch_id)
     db.refresh(group)
     return group
\ No newline at end of file
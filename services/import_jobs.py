@@ -0,0 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import logging
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, Optional
+import uuid
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+from db.database import SessionLocal
+from models.model import ThesisImportJob
+from schemas.thesis import ImportJobResponse, ImportResponse
+from services.thesis_import import import_theses_from_dataframe, read_thesis_import_file
+
+logger = logging.getLogger(__name__)
+
+# Import chạy nền trên một pool thread cục bộ của process, file upload được lưu tạm ra đĩa.
+# Trạng thái job nằm trong bảng thesis_import_job nên request theo dõi tới worker nào cũng đọc được.
+IMPORT_JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", 2))
+IMPORT_JOB_DIR = os.getenv("IMPORT_JOB_DIR") or tempfile.gettempdir()
+# Thời gian giữ thông tin job đã kết thúc trước khi bị xóa khỏi bảng
+IMPORT_JOB_RETENTION_SECONDS = float(os.getenv("IMPORT_JOB_RETENTION_SECONDS", 3600))
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+_executor = ThreadPoolExecutor(max_workers=IMPORT_JOB_WORKERS, thread_name_prefix="thesis-import")
+
+
+def _update_job(job_id: uuid.UUID, **fields) -> None:
+    # Session riêng, commit ngay: tiến độ phải thấy được trong khi transaction import vẫn đang mở
+    db = SessionLocal()
+    try:
+        db.execute(update(ThesisImportJob).where(ThesisImportJob.id == job_id).values(**fields))
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception(f"Không cập nhật được trạng thái job import {job_id}")
+    finally:
+        db.close()
+
+
+def _purge_finished_jobs(db: Session) -> None:
+    expired_before = datetime.now() - timedelta(seconds=IMPORT_JOB_RETENTION_SECONDS)
+    db.execute(delete(ThesisImportJob).where(ThesisImportJob.finished_at < expired_before))
+
+
+def _run_import_job(job_id: uuid.UUID, file_path: str, creator_id: uuid.UUID, thesis_status: int) -> None:
+    _update_job(job_id, status=JOB_RUNNING, started_at=datetime.now())
+    db = SessionLocal()
+    try:
+        df = read_thesis_import_file(file_path)
+        _update_job(job_id, rows_total=len(df))
+
+        def _on_progress(processed: int, failed: int):
+            _update_job(job_id, rows_processed=processed, rows_failed=failed)
+
+        result = import_theses_from_dataframe(db, df, creator_id, thesis_status=thesis_status, on_progress=_on_progress)
+        _update_job(
+            job_id,
+            status=JOB_COMPLETED,
+            rows_processed=len(df),
+            rows_failed=len(result["errors"]),
+            result=jsonable_encoder(ImportResponse(**result)),
+            finished_at=datetime.now()
+        )
+        logger.info(f"Job import {job_id} hoàn tất: {result['success']} thành công, {len(result['errors'])} lỗi")
+    except HTTPException as e:
+        db.rollback()
+        _update_job(job_id, status=JOB_FAILED, error=str(e.detail), finished_at=datetime.now())
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"Job import {job_id} thất bại")
+        _update_job(job_id, status=JOB_FAILED, error=f"Lỗi xử lý file Excel: {str(e)}", finished_at=datetime.now())
+    finally:
+        db.close()
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+
+def submit_import_job(db: Session, upload: BinaryIO, file_name: Optional[str], creator_id: uuid.UUID, thesis_status: int = 1) -> ImportJobResponse:
+    """
+    Lưu file upload ra đĩa (copy theo từng khối, không đọc toàn bộ vào bộ nhớ),
+    ghi job vào bảng thesis_import_job, đưa vào pool và trả về ngay thông tin job.
+    """
+    job_id = uuid.uuid4()
+    suffix = os.path.splitext(file_name or "")[1] or ".xlsx"
+    with tempfile.NamedTemporaryFile(dir=IMPORT_JOB_DIR, prefix=f"thesis-import-{job_id}-", suffix=suffix, delete=False) as tmp:
+        shutil.copyfileobj(upload, tmp)
+        file_path = tmp.name
+
+    _purge_finished_jobs(db)
+    db.add(ThesisImportJob(
+        id=job_id,
+        status=JOB_PENDING,
+        file_name=file_name,
+        created_by=creator_id,
+        rows_processed=0,
+        rows_failed=0,
+        created_at=datetime.now()
+    ))
+    db.commit()
+    _executor.submit(_run_import_job, job_id, file_path, creator_id, thesis_status)
+    return get_import_job(db, job_id)
+
+
+def get_import_job(db: Session, job_id: uuid.UUID) -> Optional[ImportJobResponse]:
+    job = db.query(ThesisImportJob).filter(ThesisImportJob.id == job_id).first()
+    if not job:
+        return None
+    return ImportJobResponse(
+        id=job.id,
+        status=job.status,
+        file_name=job.file_name,
+        created_by=job.created_by,
+        rows_total=job.rows_total,
+        rows_processed=job.rows_processed,
+        rows_failed=job.rows_failed,
+        error=job.error,
+        result=job.result,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
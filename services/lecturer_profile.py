@@ -2,6 +2,7 @@ from models.model import Information, LecturerInfo, Department
 from schemas.information import InformationResponse
 from schemas.lecturer_info import LecturerInfoResponse
 from schemas.lecturer_profile import LecturerFullProfile, LecturerCreateProfile, LecturerUpdateProfile
+from services.reference_data import get_departments
 from sqlalchemy.orm import Session
 from uuid import uuid4
 
@@ -25,7 +26,7 @@ def create_lecturer_profile(db: Session, profile_data: LecturerCreateProfile, us
     db.refresh(info)
     db.refresh(lecturer)
 
-    department = db.query(Department).filter(Department.id == lecturer.department).first()
+    department = get_departments(db).get(lecturer.department)
     dept_name = department.name if department else "Không rõ"
 
     return LecturerFullProfile(
@@ -54,7 +55,7 @@ def update_lecturer_profile(db: Session, profile_data: LecturerUpdateProfile, us
     db.refresh(info)
     db.refresh(lecturer)
 
-    department = db.query(Department).filter(Department.id == lecturer.department).first()
+    department = get_departments(db).get(lecturer.department)
     dept_name = department.name if department else "Không rõ"
 
     return LecturerFullProfile(
@@ -74,7 +75,7 @@ def get_lecturer_profile_by_user_id(db: Session, user_id):
         return None
 
     # Lấy tên khoa
-    department = db.query(Department).filter(Department.id == lecturer.department).first()
+    department = get_departments(db).get(lecturer.department)
     department_name = department.name if department else "Không rõ"
 
     # Mapping giới tính
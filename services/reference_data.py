@@ -0,0 +1,109 @@
+import os
+from typing import Dict
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from db.async_database import AsyncSessionLocal
+from db.routing import primary_session
+from models.model import AcademyYear, Batch, Department, Major, Semester
+from utils.cache import TTLCache
+
+# Dữ liệu danh mục (chuyên ngành, bộ môn, đợt, học kỳ, năm học) rất ít thay đổi
+# nên được giữ trong bộ nhớ của process và chỉ nạp lại khi hết TTL hoặc khi có thay đổi.
+REFERENCE_CACHE_TTL_SECONDS = float(os.getenv("REFERENCE_CACHE_TTL_SECONDS", 300))
+
+_REFERENCE_MODELS = (Major, Department, Batch, Semester, AcademyYear)
+
+_cache = TTLCache("reference_data", ttl_seconds=REFERENCE_CACHE_TTL_SECONDS)
+
+
+def _load_table(db: Session, model) -> Dict:
+    # Truy vấn theo cột để nhận về các Row bất biến, không gắn với session,
+    # nên có thể dùng lại an toàn giữa các request.
+    with primary_session(db) as primary:
+        return {row.id: row for row in primary.query(*model.__table__.columns).all()}
+
+
+def _get_table(db: Session, model) -> Dict:
+    return _cache.get_or_load(model.__tablename__, lambda: _load_table(db, model))
+
+
+def get_majors(db: Session) -> Dict:
+    return _get_table(db, Major)
+
+
+def get_departments(db: Session) -> Dict:
+    return _get_table(db, Department)
+
+
+def get_batches(db: Session) -> Dict:
+    return _get_table(db, Batch)
+
+
+def get_semesters(db: Session) -> Dict:
+    return _get_table(db, Semester)
+
+
+def get_academy_years(db: Session) -> Dict:
+    return _get_table(db, AcademyYear)
+
+
+def _load_all_tables(db: Session) -> None:
+    for model in _REFERENCE_MODELS:
+        _get_table(db, model)
+
+
+async def warm_reference_data(db: AsyncSession) -> None:
+    """
+    Nạp sẵn cache danh mục trước khi dựng dữ liệu qua run_sync trên session replica async:
+    cache trượt bên trong run_sync thì primary_session mở SessionLocal (psycopg2) ngay trên event loop.
+    Ở đây nạp qua engine async của primary nên không chặn event loop.
+    """
+    if not db.info.get("replica"):
+        return
+    if all(_cache.contains(model.__tablename__) for model in _REFERENCE_MODELS):
+        return
+    async with AsyncSessionLocal() as primary:
+        await primary.run_sync(_load_all_tables)
+
+
+def invalidate_reference_data(*_args, **_kwargs) -> None:
+    """Xóa toàn bộ dữ liệu danh mục đang cache. Gọi sau mọi thao tác ghi lên các bảng danh mục."""
+    _cache.invalidate()
+
+
+def get_reference_cache_stats() -> dict:
+    return _cache.stats()
+
+
+# Tự động làm mới cache khi các bảng danh mục được ghi qua ORM (kể cả UPDATE/DELETE hàng loạt).
+# Chỉ đánh dấu lúc flush và xóa cache sau commit: xóa ngay lúc flush thì request khác có thể nạp lại
+# dữ liệu cũ trước khi transaction commit (hoặc nạp lại rồi transaction bị rollback) và giữ nó tới hết TTL.
+@event.listens_for(Session, "after_flush")
+def _mark_on_flush(session, flush_context):
+    if session.info.get("reference_data_changed"):
+        return
+    changed = (session.new | session.dirty | session.deleted)
+    if any(isinstance(obj, _REFERENCE_MODELS) for obj in changed):
+        session.info["reference_data_changed"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_on_bulk_write(orm_execute_state):
+    # Các câu UPDATE/DELETE hàng loạt (query.update / query.delete) không kích hoạt sự kiện flush
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in _REFERENCE_MODELS:
+        orm_execute_state.session.info["reference_data_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("reference_data_changed", False):
+        invalidate_reference_data()
+
+
+@event.listens_for(Session, "after_rollback")
+def _reset_after_rollback(session):
+    session.info.pop("reference_data_changed", None)
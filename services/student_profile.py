@@ -5,6 +5,7 @@ from models.model import Information, Major, StudentInfo, User
 from schemas.student_profile import StudentCreateProfile, StudentUpdateProfile, StudentFullProfile
 from schemas.information import InformationResponse
 from schemas.student_info import StudentInfoResponse
+from services.reference_data import get_majors
 from uuid import UUID, uuid4
 
 def create_student_profile(db: Session, profile_data: StudentCreateProfile, user_id):
@@ -34,7 +35,7 @@ def create_student_profile(db: Session, profile_data: StudentCreateProfile, user
     db.refresh(student)
 
     # Truy vấn tên chuyên ngành
-    major = db.query(Major).filter(Major.id == student.major_id).first()
+    major = get_majors(db).get(student.major_id)
     major_name = major.name if major else "Không rõ"
 
     return StudentFullProfile(
@@ -82,7 +83,7 @@ def update_student_profile(db: Session, profile_data: StudentUpdateProfile, user
         raise HTTPException(status_code=404, detail="Không tìm thấy người dùng.")
 
     # 2. Lấy các thông tin phụ khác như cũ
-    major = db.query(Major).filter(Major.id == student.major_id).first()
+    major = get_majors(db).get(student.major_id)
     major_name = major.name if major else "Không rõ"
 
     gender_map = {0: "Bê đê", 1: "Nam", 2: "Nữ"}
@@ -126,7 +127,7 @@ def get_student_profile_by_user_id(db: Session, user_id):
     if not user or not info or not student:
         return None
         
-    major = db.query(Major).filter(Major.id == student.major_id).first()
+    major = get_majors(db).get(student.major_id)
     major_name = major.name if major else "Không rõ"
     
     gender_map = {
@@ -180,17 +181,27 @@ def get_all_student_profiles(db: Session, major_id: Optional[UUID] = None, curre
         
     students = query.all()
     results = []
-    
+
+    # Lấy User và Information của tất cả sinh viên bằng 2 truy vấn IN thay vì 2 truy vấn mỗi sinh viên
+    user_ids = {student.user_id for student in students}
+    user_map = {}
+    info_map = {}
+    if user_ids:
+        user_map = {user.id: user for user in db.query(User).filter(User.id.in_(user_ids)).all()}
+        for info in db.query(Information).filter(Information.user_id.in_(user_ids)).all():
+            info_map.setdefault(info.user_id, info)
+    major_map = get_majors(db)
+
     for student in students:
         # Lấy thông tin từ các bảng liên quan
-        user = db.query(User).filter(User.id == student.user_id).first()
-        info = db.query(Information).filter(Information.user_id == student.user_id).first()
+        user = user_map.get(student.user_id)
+        info = info_map.get(student.user_id)
 
         # Nếu không tồn tại user hoặc thông tin cá nhân, bỏ qua sinh viên này
         if not user or not info:
             continue
             
-        major = db.query(Major).filter(Major.id == student.major_id).first()
+        major = major_map.get(student.major_id)
         major_name = major.name if major else "Không rõ"
         
         gender_int = int(info.gender)
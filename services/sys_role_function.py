@@ -1,12 +1,125 @@
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from models.model import SysFunction, SysRole, SysRoleFunction
-from schemas.sys_role import FunctionResponseTree, RoleResponseTree
-from schemas.sys_role_function import SysRoleFunctionCreate, SysRoleFunctionUpdate, SysRoleFunctionResponse
+from models.model import SysRole, SysRoleFunction
+from schemas.sys_role import RoleResponseTree
+from schemas.sys_role_function import BulkRoleFunctionAssignRequest, BulkRoleFunctionAssignResponse, SysRoleFunctionCreate, SysRoleFunctionUpdate, SysRoleFunctionResponse
 from fastapi import HTTPException, status
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Set
+from services.function_tree import get_function_tree, status_label_en
+
+ROLE_FUNCTION_ASSIGN_MODES = ("grant", "revoke", "replace")
+
+
+def _read_role_function_ids(db: Session, role_ids: Iterable[int]) -> Dict[int, Set[int]]:
+    """Một truy vấn cho các chức năng hiện đang gán của nhiều vai trò."""
+    role_ids = list(role_ids)
+    assigned: Dict[int, Set[int]] = {role_id: set() for role_id in role_ids}
+    rows = db.query(SysRoleFunction.role_id, SysRoleFunction.function_id).filter(SysRoleFunction.role_id.in_(role_ids)).all()
+    for role_id, function_id in rows:
+        assigned[role_id].add(function_id)
+    return assigned
+
+
+def apply_role_function_changes(
+    db: Session,
+    existing: Dict[int, Set[int]],
+    function_ids: Iterable[int],
+    mode: str,
+    status_value: Optional[int],
+    user_id: str
+) -> Dict[str, int]:
+    """
+    Áp dụng thay đổi phân quyền cho các vai trò trong `existing` (role_id -> function_id đang gán):
+    tính tập thêm/xóa trong bộ nhớ rồi ghi bằng tối đa một INSERT ... ON CONFLICT DO NOTHING,
+    một DELETE và một UPDATE. Không commit; phiên bản phân quyền chỉ tăng một lần trong transaction.
+    """
+    requested = set(function_ids)
+    role_ids = list(existing)
+    counts = {"added": 0, "removed": 0, "updated": 0}
+
+    if mode == "revoke":
+        if any(existing[role_id] & requested for role_id in role_ids):
+            counts["removed"] = db.execute(
+                delete(SysRoleFunction)
+                .where(SysRoleFunction.role_id.in_(role_ids), SysRoleFunction.function_id.in_(requested))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        return counts
+
+    if mode == "replace" and any(existing[role_id] - requested for role_id in role_ids):
+        counts["removed"] = db.execute(
+            delete(SysRoleFunction)
+            .where(SysRoleFunction.role_id.in_(role_ids), SysRoleFunction.function_id.notin_(requested))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    if status_value is not None and any(existing[role_id] & requested for role_id in role_ids):
+        counts["updated"] = db.execute(
+            update(SysRoleFunction)
+            .where(SysRoleFunction.role_id.in_(role_ids), SysRoleFunction.function_id.in_(requested))
+            .values(status=status_value)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    now = datetime.utcnow()
+    new_rows = [
+        {
+            "role_id": role_id,
+            "function_id": function_id,
+            "status": status_value if status_value is not None else 1,
+            "created_by": user_id,
+            "create_datetime": now,
+        }
+        for role_id in role_ids
+        for function_id in sorted(requested - existing[role_id])
+    ]
+    if new_rows:
+        # Tập cần thêm đã được trừ đi các dòng hiện có; ON CONFLICT không chỉ định đích để vẫn chạy được
+        # trên CSDL chưa có ux_role_function_role_function (xem db/migrations/019_role_function_unique.sql)
+        counts["added"] = db.execute(
+            pg_insert(SysRoleFunction)
+            .values(new_rows)
+            .on_conflict_do_nothing()
+        ).rowcount
+    return counts
+
+
+def assign_role_functions_bulk(
+    db: Session,
+    data: BulkRoleFunctionAssignRequest,
+    user_id: str
+) -> BulkRoleFunctionAssignResponse:
+    """
+    Gán / thu hồi / đặt lại chức năng cho một hoặc nhiều vai trò trong một transaction.
+    Cấp một module mới cho 20 vai trò chỉ tốn một lượt đọc và một lượt ghi mỗi bảng.
+    """
+    if data.mode not in ROLE_FUNCTION_ASSIGN_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"mode phải là một trong: {', '.join(ROLE_FUNCTION_ASSIGN_MODES)}"
+        )
+    role_ids = sorted(set(data.role_ids))
+    if not role_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Danh sách vai trò trống.")
+
+    found_role_ids = {row.id for row in db.query(SysRole.id).filter(SysRole.id.in_(role_ids)).all()}
+    missing_roles = [role_id for role_id in role_ids if role_id not in found_role_ids]
+    if missing_roles:
+        raise HTTPException(status_code=404, detail=f"Vai trò không tồn tại: {missing_roles}")
+
+    # Kiểm tra chức năng trên cây đã cache, không cần truy vấn
+    tree = get_function_tree(db)
+    missing_functions = sorted(set(data.function_ids) - set(tree.functions))
+    if missing_functions:
+        raise HTTPException(status_code=404, detail=f"Chức năng không tồn tại: {missing_functions}")
+
+    existing = _read_role_function_ids(db, role_ids)
+    counts = apply_role_function_changes(db, existing, data.function_ids, data.mode, data.status, user_id)
+    db.commit()
+    return BulkRoleFunctionAssignResponse(message="Cập nhật phân quyền thành công", role_ids=role_ids, **counts)
 
-from services.sys_role import has_assigned_child
 
 def create_role_functions(
     db: Session,
@@ -18,58 +131,21 @@ def create_role_functions(
     if not role:
         raise HTTPException(status_code=404, detail="Vai trò không tồn tại.")
 
-    duplicated = []
-    for function_id in role_function_data.function_ids:
-        exists = db.query(SysRoleFunction).filter_by(
-            role_id=role_function_data.role_id,
-            function_id=function_id
-        ).first()
-        if exists:
-            duplicated.append(function_id)
-        else:
-            db.add(SysRoleFunction(
-                role_id=role_function_data.role_id,
-                function_id=function_id,
-                status=role_function_data.status if role_function_data.status is not None else 1,
-                created_by=user_id,
-                create_datetime=datetime.utcnow()
-            ))
-
+    # Bước 2: Một truy vấn lấy các chức năng đã cấp, rồi thêm hàng loạt phần còn thiếu
+    existing = _read_role_function_ids(db, [role.id])
+    duplicated = [function_id for function_id in role_function_data.function_ids if function_id in existing[role.id]]
     if duplicated:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Các chức năng đã được cấp quyền: {duplicated}"
         )
 
+    apply_role_function_changes(db, existing, role_function_data.function_ids, "grant", role_function_data.status, user_id)
     db.commit()
 
-    # Bước 3: Truy vấn tất cả function đã được cấp cho role
-    function_ids = db.query(SysRoleFunction.function_id).filter_by(role_id=role.id).all()
-    function_ids = [fid[0] for fid in function_ids]
-
-    functions = db.query(SysFunction).filter(SysFunction.id.in_(function_ids)).all()
-
-    # Bước 4: Xây dựng cây chức năng
-    def build_tree(items: List[SysFunction], parent_id: Optional[int] = None) -> List[FunctionResponseTree]:
-        tree = []
-        for item in items:
-            if item.parent_id == parent_id:
-                node = FunctionResponseTree(
-                    id=item.id,
-                    name=item.name,
-                    path=item.path,
-                    type=item.type,
-                    parent_id=item.parent_id,
-                    description=item.description,
-                    status="enabled" if item.status == 1 else "disabled",
-                    is_assigned=True,  # Vì tất cả đều là function đã được cấp
-                    children=[]
-                )
-                node.children = build_tree(items, item.id)
-                tree.append(node)
-        return tree
-
-    function_tree = build_tree(functions)
+    # Bước 3-4: Cây các chức năng đã được cấp cho role (dựng từ cây chức năng dùng chung)
+    tree = get_function_tree(db)
+    function_tree = tree.assigned_tree(tree.assigned_ids(role.id), status_label=status_label_en, mark_assigned=True)
 
     # Bước 5: Trả về thông tin role kèm cây function
     return RoleResponseTree(
@@ -101,67 +177,15 @@ def update_role_and_functions(
         role.status = update_data.status
     role.update_datetime = datetime.utcnow()
 
-    # 3. ✅ Cập nhật chức năng (function_ids) giống logic cũ
-    existing_links = db.query(SysRoleFunction).filter_by(role_id=role_id).all()
-    existing_function_ids = {link.function_id for link in existing_links}
-    new_function_ids = set(update_data.function_ids)
-
-    # 3.1 Xoá những function không còn trong danh sách mới
-    to_delete = existing_function_ids - new_function_ids
-    if to_delete:
-        db.query(SysRoleFunction).filter(
-            SysRoleFunction.role_id == role_id,
-            SysRoleFunction.function_id.in_(to_delete)
-        ).delete(synchronize_session=False)
-
-    # 3.2 Thêm mới những function chưa từng gán
-    to_add = new_function_ids - existing_function_ids
-    for fid in to_add:
-        db.add(SysRoleFunction(
-            role_id=role_id,
-            function_id=fid,
-            status=update_data.status or 1,
-            created_by=user_id,
-            create_datetime=datetime.utcnow()
-        ))
-
-    # 3.3 Cập nhật lại trạng thái các function vẫn giữ nguyên
-    db.query(SysRoleFunction).filter(
-        SysRoleFunction.role_id == role_id,
-        SysRoleFunction.function_id.in_(existing_function_ids & new_function_ids)
-    ).update({SysRoleFunction.status: update_data.status}, synchronize_session=False)
+    # 3. ✅ Cập nhật chức năng: tính tập thêm/xóa trong bộ nhớ, ghi hàng loạt
+    existing = _read_role_function_ids(db, [role_id])
+    apply_role_function_changes(db, existing, update_data.function_ids, "replace", update_data.status, user_id)
 
     db.commit()
 
     # 4. Dựng lại cấu trúc trả về RoleResponseTree
-    function_ids = db.query(SysRoleFunction.function_id).filter_by(role_id=role.id).all()
-    function_ids = [fid[0] for fid in function_ids]
-    all_functions = db.query(SysFunction).all()
-    assigned_ids = set(function_ids)
-
-    function_dict = {
-        f.id: FunctionResponseTree(
-            id=f.id,
-            name=f.name,
-            path=f.path,
-            type=f.type,
-            parent_id=f.parent_id,
-            description=f.description,
-            status="Hoạt động" if f.status == 1 else "Ngừng hoạt động",
-            is_assigned=(f.id in assigned_ids),
-            children=[]
-        )
-        for f in all_functions
-    }
-
-    for fn in function_dict.values():
-        if fn.parent_id and fn.parent_id in function_dict:
-            function_dict[fn.parent_id].children.append(fn)
-
-    roots = [
-        fn for fn in function_dict.values()
-        if fn.parent_id is None and has_assigned_child(fn, assigned_ids)
-    ]
+    tree = get_function_tree(db)
+    roots = tree.full_tree(tree.assigned_ids(role.id))
 
     return RoleResponseTree(
         id=role.id,
@@ -182,70 +206,15 @@ def update_role_function(
     if not role:
         raise HTTPException(status_code=404, detail="Vai trò không tồn tại.")
 
-    # Lấy tất cả các function hiện đang được gán cho role
-    existing_links = db.query(SysRoleFunction).filter_by(role_id=role_id).all()
-    existing_function_ids = {link.function_id for link in existing_links}
-    new_function_ids = set(update_data.function_ids)
-
-    # Các function cần xóa (thu hồi)
-    to_delete = existing_function_ids - new_function_ids
-    if to_delete:
-        db.query(SysRoleFunction).filter(
-            SysRoleFunction.role_id == role_id,
-            SysRoleFunction.function_id.in_(to_delete)
-        ).delete(synchronize_session=False)
-
-    # Các function cần thêm mới
-    to_add = new_function_ids - existing_function_ids
-    for fid in to_add:
-        db.add(SysRoleFunction(
-            role_id=role_id,
-            function_id=fid,
-            status=update_data.status or 1,
-            created_by=user_id,
-            create_datetime=datetime.utcnow()
-        ))
-
-    # Cập nhật trạng thái các function còn lại
-    db.query(SysRoleFunction).filter(
-        SysRoleFunction.role_id == role_id,
-        SysRoleFunction.function_id.in_(existing_function_ids & new_function_ids)
-    ).update({SysRoleFunction.status: update_data.status}, synchronize_session=False)
+    # Thu hồi / thêm mới / cập nhật trạng thái hàng loạt
+    existing = _read_role_function_ids(db, [role_id])
+    apply_role_function_changes(db, existing, update_data.function_ids, "replace", update_data.status, user_id)
 
     db.commit()
 
     # Trả lại kết quả giống RoleResponseTree
-    function_ids = db.query(SysRoleFunction.function_id).filter_by(role_id=role.id).all()
-    function_ids = [fid[0] for fid in function_ids]
-
-    all_functions = db.query(SysFunction).all()
-    assigned_ids = set(function_ids)
-
-    # Dựng dict function
-    function_dict = {
-        f.id: FunctionResponseTree(
-            id=f.id,
-            name=f.name,
-            path=f.path,
-            type=f.type,
-            parent_id=f.parent_id,
-            description=f.description,
-            status="Hoạt động" if f.status == 1 else "Ngừng hoạt động",
-            is_assigned=(f.id in assigned_ids),
-            children=[]
-        )
-        for f in all_functions
-    }
-
-    # Gắn cây cha-con
-    for fn in function_dict.values():
-        if fn.parent_id and fn.parent_id in function_dict:
-            function_dict[fn.parent_id].children.append(fn)
-
-    roots = [
-        fn for fn in function_dict.values()
-        if fn.parent_id is None and has_assigned_child(fn, assigned_ids)
-    ]
+    tree = get_function_tree(db)
+    roots = tree.full_tree(tree.assigned_ids(role.id))
 
     return RoleResponseTree(
         id=role.id,
@@ -1,18 +1,21 @@
-from typing import List, Optional
+import csv
+from io import StringIO
+import os
+from typing import Dict, List, Optional
 import uuid
-import bcrypt
-from sqlalchemy import UUID
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import UUID, insert, or_
 from sqlalchemy.orm import Session
-from models.model import Department, Information, LecturerInfo, Major, StudentInfo, User
+from auth.passwords import hash_password, hash_password_async, hash_passwords_bulk
+from models.model import Department, Information, LecturerInfo, Major, StudentInfo, SysRole, SysUserRole, User
 from schemas.information import InformationResponse
 from schemas.lecturer_info import LecturerInfoResponse
 from schemas.student_info import StudentInfoResponse
-from schemas.sysuser import UserCreate, UserFullProfile, UserResponse
+from schemas.sysuser import BulkRegisterResponse, BulkRegisterRowResult, UserCreate, UserFullProfile, UserResponse
+from services.reference_data import get_departments, get_majors
 
-def create_user(db: Session, user: UserCreate):
-    if user.user_type == 2:
-        user.password = user.user_name
-    hashed_password = bcrypt.hashpw(user.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+def _insert_user(db: Session, user: UserCreate, hashed_password: str) -> User:
     db_user = User(
         id=uuid.uuid4(),
         user_name=user.user_name,
@@ -25,6 +28,118 @@ def create_user(db: Session, user: UserCreate):
     db.refresh(db_user)
     return db_user
 
+
+def create_user(db: Session, user: UserCreate):
+    if user.user_type == 2:
+        user.password = user.user_name
+    return _insert_user(db, user, hash_password(user.password))
+
+
+async def create_user_async(db: Session, user: UserCreate):
+    """
+    Bản dùng cho endpoint async: chờ bcrypt trên pool băm mật khẩu mà không giữ thread nào của threadpool,
+    chỉ phần ghi DB chạy qua run_in_threadpool.
+    """
+    if user.user_type == 2:
+        user.password = user.user_name
+    hashed_password = await hash_password_async(user.password)
+    return await run_in_threadpool(_insert_user, db, user, hashed_password)
+
+# Vai trò mặc định theo loại tài khoản (giống /auth/register)
+DEFAULT_ROLE_CODES = {1: "admin", 2: "user", 3: "lecture"}
+BULK_REGISTER_MAX_ROWS = int(os.getenv("BULK_REGISTER_MAX_ROWS", 5000))
+
+
+def parse_bulk_register_csv(content: bytes) -> List[dict]:
+    """Đọc CSV có dòng tiêu đề (user_name, password, user_type, is_active); ô trống được bỏ qua."""
+    reader = csv.DictReader(StringIO(content.decode("utf-8-sig")))
+    return [
+        {key.strip(): value.strip() for key, value in row.items() if key and value is not None and value.strip() != ""}
+        for row in reader
+    ]
+
+
+def _resolve_default_role_ids(db: Session) -> Dict[int, Optional[int]]:
+    """Một truy vấn cho vai trò mặc định của mọi loại tài khoản; không có thì dùng vai trò id=1."""
+    roles = db.query(SysRole.id, SysRole.role_code).filter(
+        or_(SysRole.role_code.in_(DEFAULT_ROLE_CODES.values()), SysRole.id == 1)
+    ).all()
+    by_code = {role.role_code: role.id for role in roles}
+    fallback = 1 if any(role.id == 1 for role in roles) else None
+    return {user_type: by_code.get(role_code, fallback) for user_type, role_code in DEFAULT_ROLE_CODES.items()}
+
+
+def _format_validation_error(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors())
+
+
+def create_users_bulk(db: Session, rows: List[dict]) -> BulkRegisterResponse:
+    """
+    Tạo tài khoản hàng loạt: kiểm tra trùng user_name bằng một truy vấn, băm mật khẩu song song
+    trên pool tiến trình, rồi thêm User và SysUserRole hàng loạt trong một transaction.
+    Dòng lỗi không làm hỏng các dòng khác; kết quả trả về theo từng dòng (đánh số từ 1).
+    """
+    results: List[Optional[BulkRegisterRowResult]] = [None] * len(rows)
+
+    def fail(index: int, user_name: Optional[str], error: str):
+        results[index] = BulkRegisterRowResult(row=index + 1, user_name=user_name, status="error", error=error)
+
+    valid = []
+    for index, raw in enumerate(rows):
+        if not isinstance(raw, dict):
+            fail(index, None, "Dòng không hợp lệ")
+            continue
+        try:
+            user = UserCreate.parse_obj(raw)
+        except ValidationError as e:
+            fail(index, raw.get("user_name"), _format_validation_error(e))
+            continue
+        if user.user_type not in DEFAULT_ROLE_CODES:
+            fail(index, user.user_name, "Invalid user type")
+            continue
+        valid.append((index, user))
+
+    user_names = list({user.user_name for _, user in valid})
+    existing = {row.user_name for row in db.query(User.user_name).filter(User.user_name.in_(user_names)).all()} if user_names else set()
+
+    to_create = []
+    first_row: Dict[str, int] = {}
+    for index, user in valid:
+        if user.user_name in existing:
+            fail(index, user.user_name, "User with this username already exists")
+        elif user.user_name in first_row:
+            fail(index, user.user_name, f"Trùng user_name với dòng {first_row[user.user_name]}")
+        else:
+            first_row[user.user_name] = index + 1
+            to_create.append((index, user))
+
+    # Sinh viên dùng user_name làm mật khẩu mặc định, giống create_user
+    hashed_passwords = hash_passwords_bulk([user.user_name if user.user_type == 2 else user.password for _, user in to_create])
+    role_ids = _resolve_default_role_ids(db) if to_create else {}
+
+    user_rows, user_role_rows = [], []
+    for (index, user), hashed_password in zip(to_create, hashed_passwords):
+        user_id = uuid.uuid4()
+        user_rows.append({
+            "id": user_id,
+            "user_name": user.user_name,
+            "password": hashed_password,
+            "is_active": user.is_active if user.is_active is not None else True,
+            "user_type": user.user_type,
+        })
+        if role_ids.get(user.user_type) is not None:
+            user_role_rows.append({"user_id": user_id, "role_id": role_ids[user.user_type]})
+        results[index] = BulkRegisterRowResult(row=index + 1, user_name=user.user_name, status="created", id=user_id)
+
+    if user_rows:
+        db.execute(insert(User), user_rows)
+        if user_role_rows:
+            db.execute(insert(SysUserRole), user_role_rows)
+        db.commit()
+
+    return BulkRegisterResponse(created=len(user_rows), failed=len(rows) - len(user_rows), results=results)
+
+
 def get_all_lecturers(db: Session):
     users = db.query(User).filter(User.user_type == 3).all()
     result = []
@@ -35,7 +150,7 @@ def get_all_lecturers(db: Session):
 
         department_name = None
         if lecturer_info and lecturer_info.department is not None:
-            dept = db.query(Department).filter(Department.id == lecturer_info.department).first()
+            dept = get_departments(db).get(lecturer_info.department)
             department_name = dept.name if dept else None
 
         if info and lecturer_info:
@@ -112,7 +227,7 @@ def get_user_full_profile_by_id(db: Session, user_id: UUID) -> Optional[UserFull
 
     if user.user_type == 2:  # Student
         student = db.query(StudentInfo).filter(StudentInfo.user_id == user_id).first()
-        major = db.query(Major).filter(Major.id == student.major_id).first() if student else None
+        major = get_majors(db).get(student.major_id) if student else None
         student_info = StudentInfoResponse(
             id=student.id,
             user_id=student.user_id,
@@ -126,7 +241,7 @@ def get_user_full_profile_by_id(db: Session, user_id: UUID) -> Optional[UserFull
 
     elif user.user_type == 3:  # Lecturer
         lecturer = db.query(LecturerInfo).filter(LecturerInfo.user_id == user_id).first()
-        department = db.query(Department).filter(Department.id == lecturer.department).first() if lecturer else None
+        department = get_departments(db).get(lecturer.department) if lecturer else None
         lecturer_info = LecturerInfoResponse(
             id=lecturer.id,
             user_id=lecturer.user_id,
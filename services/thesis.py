@@ -1,11 +1,18 @@
+import base64
 from datetime import datetime
-from typing import List
+import json
+import os
+from typing import Iterator, List, Optional, Tuple
 import uuid
 from fastapi import HTTPException,status
-from sqlalchemy import UUID, or_
+from sqlalchemy import UUID, delete, func, insert, or_, select, tuple_, update
 from sqlalchemy.orm import Session
+from db.routing import primary_session
 from models.model import AcademyYear, Batch, Department, Information, LecturerInfo, Major, Semester, Thesis, ThesisLecturer, User
-from schemas.thesis import AcademyYearResponse, BatchResponse, BatchSimpleResponse, BatchUpdateError, DepartmentResponse, InstructorResponse, SemesterResponse, ThesisBatchUpdateRequest, ThesisCreate, ThesisResponse, ThesisUpdate
+from services.reference_data import get_academy_years, get_batches, get_departments, get_majors, get_semesters
+from utils.cache import TTLCache
+from utils.transactions import apply_in_savepoints
+from schemas.thesis import AcademyYearResponse, BatchResponse, BatchSimpleResponse, BatchUpdateError, DepartmentResponse, InstructorResponse, SemesterResponse, ThesisBatchCount, ThesisBatchUpdateRequest, ThesisCreate, ThesisMajorCount, ThesisResponse, ThesisStatsResponse, ThesisStatusCount, ThesisStatusTransitionRequest, ThesisStatusTransitionResult, ThesisTypeCount, ThesisUpdate
 
 def create(db: Session, thesis: ThesisCreate, lecturer_id: uuid.UUID):
     """
@@ -44,7 +51,7 @@ def create(db: Session, thesis: ThesisCreate, lecturer_id: uuid.UUID):
 
     # 4. Kiểm tra bộ môn (department) có hợp lệ không
     if thesis.department_id:
-        department = db.query(Department).filter(Department.id == thesis.department_id).first()
+        department = get_departments(db).get(thesis.department_id)
         if not department:
             raise HTTPException(status_code=400, detail=f"Bộ môn với ID {thesis.department_id} không tồn tại.")
 
@@ -78,6 +85,7 @@ def create(db: Session, thesis: ThesisCreate, lecturer_id: uuid.UUID):
             db.add(ThesisLecturer(lecturer_id=r_id, thesis_id=db_thesis.id, role=2))
 
     db.commit()
+    invalidate_thesis_stats(db_thesis.batch_id)
 
     # 7. Trả về thông tin chi tiết của đề tài vừa tạo
     return get_thesis_by_id(db, db_thesis.id)
@@ -100,9 +108,10 @@ def update_thesis(db: Session, thesis_id: UUID, thesis_update_data: ThesisUpdate
             detail="Bạn không có quyền sửa đề tài này."
         )
 
+    previous_batch_id = db_thesis.batch_id
     update_data = thesis_update_data.dict(exclude_unset=True)
     if "department_id" in update_data and update_data["department_id"] is not None:
-        department = db.query(Department).filter(Department.id == update_data["department_id"]).first()
+        department = get_departments(db).get(update_data["department_id"])
         if not department:
             raise HTTPException(status_code=400, detail="ID của bộ môn không hợp lệ.")
     if "lecturer_ids" in update_data:
@@ -130,6 +139,7 @@ def update_thesis(db: Session, thesis_id: UUID, thesis_update_data: ThesisUpdate
     
     db.commit()
     db.refresh(db_thesis)
+    invalidate_thesis_stats(previous_batch_id, db_thesis.batch_id)
 
     return get_thesis_by_id(db, db_thesis.id)
 
@@ -148,7 +158,7 @@ def get_thesis_by_id(db: Session, thesis_id: UUID) -> ThesisResponse:
         lecturer_info = db.query(LecturerInfo).filter(LecturerInfo.user_id == tl.lecturer_id).first()
         if lecturer_info:
             user_info = db.query(Information).filter(Information.user_id == lecturer_info.user_id).first()
-            department = db.query(Department).filter(Department.id == lecturer_info.department).first()
+            department = get_departments(db).get(lecturer_info.department)
             
             if user_info:
                 lecturer_details = InstructorResponse(
@@ -167,24 +177,24 @@ def get_thesis_by_id(db: Session, thesis_id: UUID) -> ThesisResponse:
 
     # --- Lấy các thông tin liên quan khác ---
     batch_response = None
-    batch = db.query(Batch).filter(Batch.id == thesis.batch_id).first()
+    batch = get_batches(db).get(thesis.batch_id)
     if batch:
         semester_response = None
-        semester = db.query(Semester).filter(Semester.id == batch.semester_id).first()
+        semester = get_semesters(db).get(batch.semester_id)
         if semester:
             academy_year_response = None
-            academy_year = db.query(AcademyYear).filter(AcademyYear.id == semester.academy_year_id).first()
+            academy_year = get_academy_years(db).get(semester.academy_year_id)
             if academy_year:
                 academy_year_response = AcademyYearResponse.from_orm(academy_year)
             semester_response = SemesterResponse(id=semester.id, name=semester.name, start_date=semester.start_date, end_date=semester.end_date, academy_year=academy_year_response)
         batch_response = BatchResponse(id=batch.id, name=batch.name, start_date=batch.start_date, end_date=batch.end_date, semester=semester_response)
         
-    major = db.query(Major).filter(Major.id == thesis.major_id).first()
+    major = get_majors(db).get(thesis.major_id)
     major_name = major.name if major else "Chuyên ngành không xác định"
     
     department_response = None
     if thesis.department_id:
-        dept_model = db.query(Department).filter(Department.id == thesis.department_id).first()
+        dept_model = get_departments(db).get(thesis.department_id)
         if dept_model:
             department_response = DepartmentResponse.from_orm(dept_model)
 
@@ -216,157 +226,103 @@ def get_thesis_by_id(db: Session, thesis_id: UUID) -> ThesisResponse:
         major=major_name
     )
 
-def get_all_theses(db: Session) -> list[ThesisResponse]:
-    theses = db.query(Thesis).order_by(Thesis.create_datetime.desc()).all()
-    thesis_responses = []
-    for thesis in theses:
-        thesis_lecturers = db.query(ThesisLecturer).filter(ThesisLecturer.thesis_id == thesis.id).all()
-        instructors_list = []
-        reviewers_list = []
-
-        for tl in thesis_lecturers:
-            lecturer_info = db.query(LecturerInfo).filter(LecturerInfo.user_id == tl.lecturer_id).first()
-            if lecturer_info:
-                user_info = db.query(Information).filter(Information.user_id == lecturer_info.user_id).first()
-                department = db.query(Department).filter(Department.id == lecturer_info.department).first()
-
-                if user_info:
-                    lecturer_details = InstructorResponse(
-                        id=tl.lecturer_id, 
-                        name=f"{user_info.last_name} {user_info.first_name}",
-                        email=lecturer_info.email,
-                        lecturer_code=lecturer_info.lecturer_code,
-                        department=lecturer_info.department,
-                        department_name=department.name if department else None
-                    )
-                    # Phân loại vai trò
-                    if tl.role == 1:  # Giảng viên hướng dẫn
-                        instructors_list.append(lecturer_details)
-                    elif tl.role == 2:  # Giảng viên phản biện
-                        reviewers_list.append(lecturer_details)
-        batch = db.query(Batch).filter(Batch.id == thesis.batch_id).first()
-        semester = db.query(Semester).filter(Semester.id == batch.semester_id).first() if batch else None
-        academy_year = db.query(AcademyYear).filter(AcademyYear.id == semester.academy_year_id).first() if semester else None
-        major = db.query(Major).filter(Major.id == thesis.major_id).first()
-        major_name = major.name if major else "Chuyên ngành không xác định"
-        department_response = None
-        if thesis.department_id:
-            department = db.query(Department).filter(Department.id == thesis.department_id).first()
-            if department:
-                department_response = DepartmentResponse.from_orm(department)
-
-        thesis_responses.append(ThesisResponse(
-            id=thesis.id,
-            thesis_type=thesis.thesis_type,
-            status=(
-                "Từ chối" if thesis.status == 0 else
-                "Chờ duyệt" if thesis.status == 1 else
-                "Đã duyệt cấp bộ môn" if thesis.status == 2 else
-                "Đã duyệt cấp khoa" if thesis.status == 3 else
-                "Chưa được đăng ký" if thesis.status == 4 else
-                "Đã được đăng ký" if thesis.status == 5 else
-                "Không xác định"
-            ),
-            reason=thesis.reason,
-            name=thesis.title,
-            major_id=thesis.major_id,
-            description=thesis.description,
-            start_date=thesis.start_date,
-            end_date=thesis.end_date,
-            instructors=instructors_list, # Trả về danh sách GVHD
-            reviewers=reviewers_list,   
-            department=department_response,
-            committee_id=thesis.committee_id,
-            name_thesis_type="Khóa luận" if thesis.thesis_type == 1 else "Đồ án",
-            batch={
-                "id": batch.id,
-                "name": batch.name,
-                "start_date": batch.start_date,
-                "end_date": batch.end_date,
-                "semester": {
-                    "id": semester.id,
-                    "name": semester.name,
-                    "start_date": semester.start_date,
-                    "end_date": semester.end_date,
-                    "academy_year": {
-                        "id": academy_year.id,
-                        "name": academy_year.name,
-                        "start_date": academy_year.start_date,
-                        "end_date": academy_year.end_date
-                    } if academy_year else None
-                } if semester else None
-            } if batch else None,
-            major=major_name
-        ))
-
-    return thesis_responses
+THESIS_STATUS_LABELS = {
+    0: "Từ chối",
+    1: "Chờ duyệt",
+    2: "Đã duyệt cấp bộ môn",
+    3: "Đã duyệt cấp khoa",
+    4: "Chưa được đăng ký",
+    5: "Đã được đăng ký"
+}
+
+# Các bước chuyển trạng thái hợp lệ: trạng thái hiện tại -> các trạng thái được phép chuyển tới
+THESIS_STATUS_TRANSITIONS = {
+    0: {1},        # Từ chối -> gửi duyệt lại
+    1: {0, 2},     # Chờ duyệt -> từ chối / duyệt cấp bộ môn
+    2: {0, 3},     # Duyệt cấp bộ môn -> từ chối / duyệt cấp khoa
+    3: {0, 4},     # Duyệt cấp khoa -> từ chối / mở đăng ký
+    4: {3, 5},     # Chưa được đăng ký -> đóng đăng ký / đã được đăng ký
+    5: {4},        # Đã được đăng ký -> hủy đăng ký
+}
+
+def build_thesis_responses(db: Session, theses: List[Thesis]) -> list[ThesisResponse]:
+    """
+    Dựng danh sách ThesisResponse cho một tập đề tài bất kỳ.
+    Giảng viên được nạp bằng một số câu truy vấn IN (...) cố định, dữ liệu danh mục lấy từ cache,
+    sau đó ghép lại bằng các map trong bộ nhớ (không phụ thuộc vào số lượng đề tài).
+    """
+    if not theses:
+        return []
+
+    # 1. Giảng viên hướng dẫn / phản biện của tất cả đề tài
+    thesis_ids = {t.id for t in theses}
+    thesis_lecturers = db.query(ThesisLecturer).filter(ThesisLecturer.thesis_id.in_(thesis_ids)).all()
+    lecturer_user_ids = {tl.lecturer_id for tl in thesis_lecturers}
+
+    lecturer_map = {}
+    info_map = {}
+    if lecturer_user_ids:
+        for lec in db.query(LecturerInfo).filter(LecturerInfo.user_id.in_(lecturer_user_ids)).all():
+            lecturer_map.setdefault(lec.user_id, lec)
+        for info in db.query(Information).filter(Information.user_id.in_(lecturer_user_ids)).all():
+            info_map.setdefault(info.user_id, info)
+
+    # 2. Bộ môn, đợt, học kỳ, năm học, chuyên ngành lấy từ cache danh mục
+    department_map = get_departments(db)
+    batch_map = get_batches(db)
+    semester_map = get_semesters(db)
+    academy_year_map = get_academy_years(db)
+    major_map = get_majors(db)
+
+    # 3. Dựng thông tin giảng viên theo từng đề tài
+    lecturers_by_thesis = {}
+    for tl in thesis_lecturers:
+        lecturer_info = lecturer_map.get(tl.lecturer_id)
+        user_info = info_map.get(tl.lecturer_id)
+        if not lecturer_info or not user_info:
+            continue
+        department = department_map.get(lecturer_info.department)
+        lecturer_details = InstructorResponse(
+            id=tl.lecturer_id,
+            name=f"{user_info.last_name} {user_info.first_name}",
+            email=lecturer_info.email,
+            lecturer_code=lecturer_info.lecturer_code,
+            department=lecturer_info.department,
+            department_name=department.name if department else None
+        )
+        instructors_list, reviewers_list = lecturers_by_thesis.setdefault(tl.thesis_id, ([], []))
+        if tl.role == 1:  # Giảng viên hướng dẫn
+            instructors_list.append(lecturer_details)
+        elif tl.role == 2:  # Giảng viên phản biện
+            reviewers_list.append(lecturer_details)
+
+    # 4. Dựng thông tin Đợt - Học kỳ - Năm học (mỗi đợt chỉ dựng một lần)
+    batch_responses = {}
+    for batch_id in {t.batch_id for t in theses}:
+        batch = batch_map.get(batch_id)
+        if not batch:
+            continue
+        semester_response = None
+        semester = semester_map.get(batch.semester_id)
+        if semester:
+            academy_year_response = None
+            academy_year = academy_year_map.get(semester.academy_year_id)
+            if academy_year:
+                academy_year_response = AcademyYearResponse.from_orm(academy_year)
+            semester_response = SemesterResponse(id=semester.id, name=semester.name, start_date=semester.start_date, end_date=semester.end_date, academy_year=academy_year_response)
+        batch_responses[batch.id] = BatchResponse(id=batch.id, name=batch.name, start_date=batch.start_date, end_date=batch.end_date, semester=semester_response)
 
-def get_theses_by_major_id(db: Session, major_id: UUID) -> list[ThesisResponse]:
-    # Thêm điều kiện lọc theo major_id
-    theses = db.query(Thesis).filter(Thesis.major_id == major_id).order_by(Thesis.create_datetime.desc()).all()
-    
-    # Phần logic còn lại giống hệt hàm get_all_theses để đảm bảo dữ liệu trả về nhất quán
+    # 5. Tạo đối tượng trả về hoàn chỉnh
     results = []
     for thesis in theses:
-        # Lấy và phân loại giảng viên
-        thesis_lecturers = db.query(ThesisLecturer).filter(ThesisLecturer.thesis_id == thesis.id).all()
-        instructors_list = []
-        reviewers_list = []
-        for tl in thesis_lecturers:
-            lecturer_info = db.query(LecturerInfo).filter(LecturerInfo.user_id == tl.lecturer_id).first()
-            if lecturer_info:
-                user_info = db.query(Information).filter(Information.user_id == lecturer_info.user_id).first()
-                department = db.query(Department).filter(Department.id == lecturer_info.department).first()
-                if user_info:
-                    lecturer_details = InstructorResponse(
-                        id=tl.lecturer_id, 
-                        name=f"{user_info.last_name} {user_info.first_name}",
-                        email=lecturer_info.email,
-                        lecturer_code=lecturer_info.lecturer_code,
-                        department=lecturer_info.department,
-                        department_name=department.name if department else None
-                    )
-                    if tl.role == 1:
-                        instructors_list.append(lecturer_details)
-                    elif tl.role == 2:
-                        reviewers_list.append(lecturer_details)
-        
-        # Lấy các thông tin liên quan khác
-        batch_response = None
-        batch = db.query(Batch).filter(Batch.id == thesis.batch_id).first()
-        if batch:
-            semester_response = None
-            semester = db.query(Semester).filter(Semester.id == batch.semester_id).first()
-            if semester:
-                academy_year_response = None
-                academy_year = db.query(AcademyYear).filter(AcademyYear.id == semester.academy_year_id).first()
-                if academy_year:
-                    academy_year_response = AcademyYearResponse.from_orm(academy_year)
-                semester_response = SemesterResponse(id=semester.id, name=semester.name, start_date=semester.start_date, end_date=semester.end_date, academy_year=academy_year_response)
-            batch_response = BatchResponse(id=batch.id, name=batch.name, start_date=batch.start_date, end_date=batch.end_date, semester=semester_response)
-        
-        major = db.query(Major).filter(Major.id == thesis.major_id).first()
-        major_name = major.name if major else "Chuyên ngành không xác định"
-        
-        department_response = None
-        if thesis.department_id:
-            dept_model = db.query(Department).filter(Department.id == thesis.department_id).first()
-            if dept_model:
-                department_response = DepartmentResponse.from_orm(dept_model)
+        instructors_list, reviewers_list = lecturers_by_thesis.get(thesis.id, ([], []))
+        major = major_map.get(thesis.major_id)
+        department = department_map.get(thesis.department_id) if thesis.department_id else None
 
         results.append(ThesisResponse(
             id=thesis.id,
             thesis_type=thesis.thesis_type,
-            status=(
-                "Từ chối" if thesis.status == 0 else
-                "Chờ duyệt" if thesis.status == 1 else
-                "Đã duyệt cấp bộ môn" if thesis.status == 2 else
-                "Đã duyệt cấp khoa" if thesis.status == 3 else
-                "Chưa được đăng ký" if thesis.status == 4 else
-                "Đã được đăng ký" if thesis.status == 5 else
-                "Không xác định"
-            ),
-            major_id=thesis.major_id,
+            status=THESIS_STATUS_LABELS.get(thesis.status, "Không xác định"),
             name=thesis.title,
             description=thesis.description,
             start_date=thesis.start_date,
@@ -375,14 +331,110 @@ def get_theses_by_major_id(db: Session, major_id: UUID) -> list[ThesisResponse]:
             reason=thesis.reason,
             instructors=instructors_list,
             reviewers=reviewers_list,
-            department=department_response,
+            department=DepartmentResponse.from_orm(department) if department else None,
             name_thesis_type="Khóa luận" if thesis.thesis_type == 1 else "Đồ án",
-            batch=batch_response,
-            major=major_name,
+            batch=batch_responses.get(thesis.batch_id),
+            major_id=thesis.major_id,
+            major=major.name if major else "Chuyên ngành không xác định",
             committee_id=thesis.committee_id
         ))
+
     return results
 
+def get_all_theses(db: Session) -> list[ThesisResponse]:
+    theses = db.query(Thesis).order_by(Thesis.create_datetime.desc()).all()
+    return build_thesis_responses(db, theses)
+
+def get_theses_by_major_id(db: Session, major_id: UUID) -> list[ThesisResponse]:
+    theses = db.query(Thesis).filter(Thesis.major_id == major_id).order_by(Thesis.create_datetime.desc()).all()
+    return build_thesis_responses(db, theses)
+
+def encode_thesis_cursor(thesis: Thesis) -> str:
+    payload = json.dumps({"t": thesis.create_datetime.isoformat(), "id": str(thesis.id)})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_thesis_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(payload["t"]), uuid.UUID(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor phân trang không hợp lệ.")
+
+def filter_theses_query(
+    query,
+    status: Optional[int] = None,
+    thesis_type: Optional[int] = None,
+    batch_id: Optional[UUID] = None,
+    major_id: Optional[UUID] = None,
+    department_id: Optional[int] = None,
+    lecturer_id: Optional[UUID] = None
+):
+    if status is not None:
+        query = query.filter(Thesis.status == status)
+    if thesis_type is not None:
+        query = query.filter(Thesis.thesis_type == thesis_type)
+    if batch_id is not None:
+        query = query.filter(Thesis.batch_id == batch_id)
+    if major_id is not None:
+        query = query.filter(Thesis.major_id == major_id)
+    if department_id is not None:
+        query = query.filter(Thesis.department_id == department_id)
+    if lecturer_id is not None:
+        query = query.filter(Thesis.id.in_(
+            select(ThesisLecturer.thesis_id).where(ThesisLecturer.lecturer_id == lecturer_id)
+        ))
+    return query
+
+def list_theses(
+    db: Session,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    **filters
+) -> Tuple[list[ThesisResponse], Optional[str], Optional[int]]:
+    """
+    Lấy danh sách đề tài có lọc và phân trang keyset theo (create_datetime, id) giảm dần.
+    Trả về (danh sách đề tài, cursor trang kế tiếp, tổng số bản ghi nếu được yêu cầu).
+    Không truyền limit thì trả về toàn bộ như trước đây.
+    """
+    query = filter_theses_query(db.query(Thesis), **filters)
+
+    total = query.order_by(None).count() if include_total else None
+
+    if cursor:
+        cursor_datetime, cursor_id = decode_thesis_cursor(cursor)
+        query = query.filter(tuple_(Thesis.create_datetime, Thesis.id) < tuple_(cursor_datetime, cursor_id))
+
+    query = query.order_by(Thesis.create_datetime.desc(), Thesis.id.desc())
+    if limit is None:
+        return build_thesis_responses(db, query.all()), None, total
+
+    # Lấy dư một bản ghi để biết còn trang sau hay không
+    theses = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(theses) > limit:
+        theses = theses[:limit]
+        next_cursor = encode_thesis_cursor(theses[-1])
+
+    return build_thesis_responses(db, theses), next_cursor, total
+
+def iter_thesis_responses(db: Session, chunk_size: int = 200, **filters) -> Iterator[ThesisResponse]:
+    """
+    Duyệt toàn bộ đề tài (có lọc) bằng con trỏ phía server (yield_per) và trả về từng ThesisResponse.
+    Mỗi lô chunk_size đề tài được dựng bằng build_thesis_responses nên bộ nhớ chỉ phụ thuộc vào kích thước lô.
+    """
+    query = filter_theses_query(db.query(Thesis), **filters)
+    query = query.order_by(Thesis.create_datetime.desc(), Thesis.id.desc()).yield_per(chunk_size)
+
+    chunk = []
+    for thesis in query:
+        chunk.append(thesis)
+        if len(chunk) >= chunk_size:
+            yield from build_thesis_responses(db, chunk)
+            chunk = []
+    if chunk:
+        yield from build_thesis_responses(db, chunk)
+
 def delete_thesis(db: Session, thesis_id: UUID):
     """
     Xóa một luận văn (thesis).
@@ -395,195 +447,38 @@ def delete_thesis(db: Session, thesis_id: UUID):
         )
     db.delete(db_thesis)
     db.commit()
+    invalidate_thesis_stats(db_thesis.batch_id)
     return {"message": "Thesis deleted successfully"}
 
 def get_all_majors(db: Session):
-    return db.query(Major).all()
+    return list(get_majors(db).values())
 
 def get_all_departments(db: Session):
-    return db.query(Department).all()
+    return list(get_departments(db).values())
 
 def get_theses_by_batch_id(db: Session, batch_id: UUID) -> list[ThesisResponse]:
     theses = db.query(Thesis).filter(Thesis.batch_id == batch_id).order_by(Thesis.create_datetime.desc()).all()
-    results = []
-
-    for thesis in theses:
-        thesis_lecturers = db.query(ThesisLecturer).filter(ThesisLecturer.thesis_id == thesis.id).all()
-        instructors_list = []
-        reviewers_list = []
-
-        for tl in thesis_lecturers:
-            lecturer_info = db.query(LecturerInfo).filter(LecturerInfo.user_id == tl.lecturer_id).first()
-            if lecturer_info:
-                user_info = db.query(Information).filter(Information.user_id == lecturer_info.user_id).first()
-                department = db.query(Department).filter(Department.id == lecturer_info.department).first()
-                if user_info:
-                    lecturer_details = InstructorResponse(
-                        id=tl.lecturer_id, 
-                        name=f"{user_info.last_name} {user_info.first_name}",
-                        email=lecturer_info.email,
-                        lecturer_code=lecturer_info.lecturer_code,
-                        department=lecturer_info.department,
-                        department_name=department.name if department else None
-                    )
-                    if tl.role == 1:
-                        instructors_list.append(lecturer_details)
-                    elif tl.role == 2:
-                        reviewers_list.append(lecturer_details)
-
-        # 2. Lấy thông tin Đợt, Học kỳ, Năm học
-        batch_response = None
-        batch = db.query(Batch).filter(Batch.id == thesis.batch_id).first()
-        if batch:
-            semester_response = None
-            semester = db.query(Semester).filter(Semester.id == batch.semester_id).first()
-            if semester:
-                academy_year_response = None
-                academy_year = db.query(AcademyYear).filter(AcademyYear.id == semester.academy_year_id).first()
-                if academy_year:
-                    academy_year_response = AcademyYearResponse.from_orm(academy_year)
-                semester_response = SemesterResponse(id=semester.id, name=semester.name, start_date=semester.start_date, end_date=semester.end_date, academy_year=academy_year_response)
-            batch_response = BatchResponse(id=batch.id, name=batch.name, start_date=batch.start_date, end_date=batch.end_date, semester=semester_response)
-        
-        # 3. Lấy thông tin Chuyên ngành và Bộ môn
-        major = db.query(Major).filter(Major.id == thesis.major_id).first()
-        major_name = major.name if major else "Chuyên ngành không xác định"
-        
-        department_response = None
-        if thesis.department_id:
-            dept_model = db.query(Department).filter(Department.id == thesis.department_id).first()
-            if dept_model:
-                department_response = DepartmentResponse.from_orm(dept_model)
-
-        # 4. Tạo đối tượng trả về hoàn chỉnh
-        results.append(ThesisResponse(
-            id=thesis.id,
-            thesis_type=thesis.thesis_type,
-            status=(
-                "Từ chối" if thesis.status == 0 else
-                "Chờ duyệt" if thesis.status == 1 else
-                "Đã duyệt cấp bộ môn" if thesis.status == 2 else
-                "Đã duyệt cấp khoa" if thesis.status == 3 else
-                "Chưa được đăng ký" if thesis.status == 4 else
-                "Đã được đăng ký" if thesis.status == 5 else
-                "Không xác định"
-            ),
-            name=thesis.title,
-            description=thesis.description,
-            start_date=thesis.start_date,
-            end_date=thesis.end_date,
-            notes=thesis.notes,
-            reason=thesis.reason,
-            instructors=instructors_list,
-            major_id=thesis.major_id,
-            reviewers=reviewers_list,
-            department=department_response,
-            name_thesis_type="Khóa luận" if thesis.thesis_type == 1 else "Đồ án",
-            batch=batch_response,
-            major=major_name,
-            committee_id=thesis.committee_id
-        ))
-
-    return results
+    return build_thesis_responses(db, theses)
 
 def get_theses_by_batch_and_major(db: Session, batch_id: UUID, major_id: UUID) -> list[ThesisResponse]:
     """
     Lấy danh sách đề tài theo một Đợt cụ thể VÀ một Chuyên ngành cụ thể.
     """
-    # 1. Truy vấn cơ sở dữ liệu với cả hai điều kiện lọc
     theses = db.query(Thesis).filter(
         Thesis.batch_id == batch_id,
         Thesis.major_id == major_id
     ).order_by(Thesis.create_datetime.desc()).all()
-    
-    results = []
+    return build_thesis_responses(db, theses)
 
-    # 2. Lặp qua từng đề tài để lấy thông tin chi tiết (logic giống hệt các hàm get khác)
-    for thesis in theses:
-        # Lấy và phân loại giảng viên
-        thesis_lecturers = db.query(ThesisLecturer).filter(ThesisLecturer.thesis_id == thesis.id).all()
-        instructors_list = []
-        reviewers_list = []
-        for tl in thesis_lecturers:
-            lecturer_info = db.query(LecturerInfo).filter(LecturerInfo.user_id == tl.lecturer_id).first()
-            if lecturer_info:
-                user_info = db.query(Information).filter(Information.user_id == lecturer_info.user_id).first()
-                department = db.query(Department).filter(Department.id == lecturer_info.department).first()
-                if user_info:
-                    lecturer_details = InstructorResponse(
-                        id=tl.lecturer_id, 
-                        name=f"{user_info.last_name} {user_info.first_name}",
-                        email=lecturer_info.email,
-                        lecturer_code=lecturer_info.lecturer_code,
-                        department=lecturer_info.department,
-                        department_name=department.name if department else None
-                    )
-                    if tl.role == 1:
-                        instructors_list.append(lecturer_details)
-                    elif tl.role == 2:
-                        reviewers_list.append(lecturer_details)
-        
-        # Lấy thông tin Đợt, Học kỳ, Năm học
-        batch_response = None
-        batch = db.query(Batch).filter(Batch.id == thesis.batch_id).first()
-        if batch:
-            semester_response = None
-            semester = db.query(Semester).filter(Semester.id == batch.semester_id).first()
-            if semester:
-                academy_year_response = None
-                academy_year = db.query(AcademyYear).filter(AcademyYear.id == semester.academy_year_id).first()
-                if academy_year:
-                    academy_year_response = AcademyYearResponse.from_orm(academy_year)
-                semester_response = SemesterResponse(id=semester.id, name=semester.name, start_date=semester.start_date, end_date=semester.end_date, academy_year=academy_year_response)
-            batch_response = BatchResponse(id=batch.id, name=batch.name, start_date=batch.start_date, end_date=batch.end_date, semester=semester_response)
-        
-        # Lấy thông tin Chuyên ngành và Bộ môn
-        major = db.query(Major).filter(Major.id == thesis.major_id).first()
-        major_name = major.name if major else "Chuyên ngành không xác định"
-        
-        department_response = None
-        if thesis.department_id:
-            dept_model = db.query(Department).filter(Department.id == thesis.department_id).first()
-            if dept_model:
-                department_response = DepartmentResponse.from_orm(dept_model)
-
-        # 3. Tạo đối tượng trả về hoàn chỉnh
-        results.append(ThesisResponse(
-            id=thesis.id,
-            thesis_type=thesis.thesis_type,
-            status=(
-                "Từ chối" if thesis.status == 0 else
-                "Chờ duyệt" if thesis.status == 1 else
-                "Đã duyệt cấp bộ môn" if thesis.status == 2 else
-                "Đã duyệt cấp khoa" if thesis.status == 3 else
-                "Chưa được đăng ký" if thesis.status == 4 else
-                "Đã được đăng ký" if thesis.status == 5 else
-                "Không xác định"
-            ),
-            name=thesis.title,
-            description=thesis.description,
-            start_date=thesis.start_date,
-            end_date=thesis.end_date,
-            notes=thesis.notes,
-            reason=thesis.reason,
-            instructors=instructors_list,
-            reviewers=reviewers_list,
-            department=department_response,
-            name_thesis_type="Khóa luận" if thesis.thesis_type == 1 else "Đồ án",
-            batch=batch_response,
-            major_id=thesis.major_id,
-            major=major_name,
-            committee_id=thesis.committee_id
-        ))
-        
-    return results
 def get_all_batches_with_details(db: Session) -> list[BatchResponse]:
-    batches = db.query(Batch).order_by(Batch.create_datetime.desc()).all()
+    batches = sorted(get_batches(db).values(), key=lambda b: b.create_datetime or datetime.min, reverse=True)
+    semester_map = get_semesters(db)
+    academy_year_map = get_academy_years(db)
     results = []
 
     for batch in batches:
-        semester = db.query(Semester).filter(Semester.id == batch.semester_id).first()
-        academy_year = db.query(AcademyYear).filter(AcademyYear.id == semester.academy_year_id).first() if semester else None
+        semester = semester_map.get(batch.semester_id)
+        academy_year = academy_year_map.get(semester.academy_year_id) if semester else None
 
         results.append(BatchResponse(
             id=batch.id,
@@ -607,61 +502,226 @@ def get_all_batches_with_details(db: Session) -> list[BatchResponse]:
     return results
 
 def batch_update_theses(db: Session, update_request: ThesisBatchUpdateRequest, user_id: UUID):
-    success_count = 0
+    """
+    Cập nhật nhiều đề tài theo lô:
+    - Kiểm tra đề tài, giảng viên và bộ môn của cả lô bằng một số câu truy vấn cố định.
+    - So sánh danh sách GVHD/GVPB hiện tại với danh sách mới, chỉ thêm/xóa các liên kết thay đổi.
+    - Các trường thông tin được ghi bằng UPDATE hàng loạt; đề tài lỗi được tách bằng SAVEPOINT
+      để các đề tài còn lại vẫn được lưu.
+    """
     errors: List[BatchUpdateError] = []
+    items = update_request.theses
+    if not items:
+        return {"success_count": 0, "errors": errors}
+
+    # 1. Nạp dữ liệu cần kiểm tra cho cả lô
+    thesis_ids = {item.id for item in items}
+    batch_of_thesis = {row.id: row.batch_id for row in db.query(Thesis.id, Thesis.batch_id).filter(Thesis.id.in_(thesis_ids)).all()}
+    existing_ids = set(batch_of_thesis)
+
+    requested_lecturer_ids = set()
+    for item in items:
+        requested_lecturer_ids.update(item.update_data.lecturer_ids or [])
+        requested_lecturer_ids.update(item.update_data.reviewer_ids or [])
+    valid_lecturer_ids = set()
+    if requested_lecturer_ids:
+        valid_lecturer_ids = {
+            row.id for row in db.query(User.id).filter(User.id.in_(requested_lecturer_ids), User.user_type == 3).all()
+        }
+
+    current_links = {}
+    for link in db.query(ThesisLecturer.id, ThesisLecturer.thesis_id, ThesisLecturer.lecturer_id, ThesisLecturer.role).filter(ThesisLecturer.thesis_id.in_(existing_ids)).all():
+        current_links.setdefault((link.thesis_id, link.role), {})[link.lecturer_id] = link.id
+
+    departments = get_departments(db)
+    thesis_columns = set(Thesis.__table__.columns.keys()) - {"id"}
+    now = datetime.utcnow()
+
+    # 2. Tính toán thay đổi cho từng đề tài (không truy vấn thêm)
+    pending = []
+    for item in items:
+        if item.id not in existing_ids:
+            errors.append(BatchUpdateError(id=item.id, error="Không tìm thấy đề tài."))
+            continue
 
-    thesis_ids = [item.id for item in update_request.theses]
-    theses_to_update = db.query(Thesis).filter(Thesis.id.in_(thesis_ids)).all()
-    
-    thesis_map = {str(t.id): t for t in theses_to_update}
+        update_data = item.update_data.dict(exclude_unset=True)
+        role_updates = {1: update_data.pop("lecturer_ids", None), 2: update_data.pop("reviewer_ids", None)}
 
-    for item in update_request.theses:
-        thesis_id_str = str(item.id)
-        
-        if thesis_id_str not in thesis_map:
-            errors.append(BatchUpdateError(id=item.id, error="Không tìm thấy đề tài."))
+        if update_data.get("department_id") is not None and update_data["department_id"] not in departments:
+            errors.append(BatchUpdateError(id=item.id, error="ID của bộ môn không hợp lệ."))
+            continue
+        invalid_ids = {lec_id for ids in role_updates.values() if ids for lec_id in ids} - valid_lecturer_ids
+        if invalid_ids:
+            errors.append(BatchUpdateError(id=item.id, error=f"ID giảng viên không hợp lệ: {', '.join(str(i) for i in invalid_ids)}"))
             continue
 
-        db_thesis = thesis_map[thesis_id_str]
-
-        # is_creator = db_thesis.create_by == user_id
-        # is_instructor = db.query(ThesisLecturer).filter(
-        #     ThesisLecturer.thesis_id == item.id,
-        #     ThesisLecturer.lecturer_id == user_id
-        # ).first() is not None
-
-        # if not (is_creator or is_instructor):
-        #     errors.append(BatchUpdateError(id=item.id, error="Không có quyền cập nhật đề tài này."))
-        #     continue
-
-        try:
-            update_data = item.update_data.dict(exclude_unset=True) 
-            update_instructors = "instructor_ids" in update_data
-            update_reviewers = "reviewer_ids" in update_data
-
-            if update_instructors or update_reviewers:
-                db.query(ThesisLecturer).filter(ThesisLecturer.thesis_id == item.id).delete(synchronize_session=False)
-                if update_instructors:
-                    new_instructor_ids = update_data.pop("instructor_ids")
-                    for lec_id in new_instructor_ids:
-                        db.add(ThesisLecturer(lecturer_id=lec_id, thesis_id=item.id, role=1))
-
-                # Thêm lại danh sách giảng viên phản biện mới (nếu có)
-                if update_reviewers:
-                    new_reviewer_ids = update_data.pop("reviewer_ids")
-                    for rev_id in new_reviewer_ids:
-                        db.add(ThesisLecturer(lecturer_id=rev_id, thesis_id=item.id, role=2))
-            # Cập nhật các trường thông tin còn lại
-            for key, value in update_data.items():
-                if hasattr(db_thesis, key):
-                    setattr(db_thesis, key, value)
-            
-            db_thesis.update_datetime = datetime.utcnow()
-            success_count += 1
-        except Exception as e:
-            errors.append(BatchUpdateError(id=item.id, error=str(e)))
+        links_to_delete, links_to_insert = [], []
+        for role, new_ids in role_updates.items():
+            if new_ids is None:
+                continue
+            current = current_links.get((item.id, role), {})
+            new_set = set(new_ids)
+            links_to_delete.extend(link_id for lec_id, link_id in current.items() if lec_id not in new_set)
+            links_to_insert.extend(
+                {"id": uuid.uuid4(), "thesis_id": item.id, "lecturer_id": lec_id, "role": role}
+                for lec_id in dict.fromkeys(new_ids) if lec_id not in current
+            )
 
-    if success_count > 0:
-        db.commit()
+        fields = {key: value for key, value in update_data.items() if key in thesis_columns}
+        fields.update(id=item.id, update_datetime=now)
+        pending.append({"id": item.id, "fields": fields, "delete": links_to_delete, "insert": links_to_insert})
+
+    # 3. Ghi hàng loạt, đề tài lỗi được tách riêng bằng SAVEPOINT
+    def _apply(batch):
+        link_ids = [link_id for entry in batch for link_id in entry["delete"]]
+        if link_ids:
+            db.execute(delete(ThesisLecturer).where(ThesisLecturer.id.in_(link_ids)))
+        new_links = [link for entry in batch for link in entry["insert"]]
+        if new_links:
+            db.execute(insert(ThesisLecturer), new_links)
+        db.execute(update(Thesis), [entry["fields"] for entry in batch])
+
+    applied, failed = apply_in_savepoints(db, pending, _apply)
+    for entry, e in failed:
+        errors.append(BatchUpdateError(id=entry["id"], error=str(getattr(e, "orig", None) or e)))
+    db.commit()
+    if applied:
+        invalidate_thesis_stats(*(batch_of_thesis[entry["id"]] for entry in applied), *(entry["fields"].get("batch_id") for entry in applied))
 
-    return {"success_count": success_count, "errors": errors}
+    return {"success_count": len(applied), "errors": errors}
+
+def transition_thesis_statuses(db: Session, request: ThesisStatusTransitionRequest) -> dict:
+    """
+    Chuyển trạng thái cho nhiều đề tài trong một lần gọi.
+    Trạng thái hiện tại được đọc một lần cho cả lô; mỗi nhóm có cùng trạng thái nguồn được cập nhật
+    bằng một câu UPDATE ... WHERE id IN (...) AND status = :expected, nên đề tài bị đổi trạng thái
+    đồng thời bởi request khác sẽ không bị ghi đè.
+    """
+    target = request.status
+    if target not in THESIS_STATUS_LABELS:
+        raise HTTPException(status_code=400, detail=f"Trạng thái '{target}' không hợp lệ.")
+
+    thesis_ids = list(dict.fromkeys(request.thesis_ids))
+    current_status, batch_of_thesis = {}, {}
+    if thesis_ids:
+        for row in db.query(Thesis.id, Thesis.status, Thesis.batch_id).filter(Thesis.id.in_(thesis_ids)).all():
+            current_status[row.id] = row.status
+            batch_of_thesis[row.id] = row.batch_id
+
+    results = {}
+    ids_by_status = {}
+    for thesis_id in thesis_ids:
+        if thesis_id not in current_status:
+            results[thesis_id] = ThesisStatusTransitionResult(id=thesis_id, success=False, error="Không tìm thấy đề tài.")
+            continue
+        from_status = current_status[thesis_id]
+        if target not in THESIS_STATUS_TRANSITIONS.get(from_status, set()):
+            results[thesis_id] = ThesisStatusTransitionResult(
+                id=thesis_id,
+                success=False,
+                from_status=from_status,
+                error=f"Không thể chuyển từ '{THESIS_STATUS_LABELS.get(from_status, 'Không xác định')}' sang '{THESIS_STATUS_LABELS[target]}'."
+            )
+            continue
+        ids_by_status.setdefault(from_status, []).append(thesis_id)
+
+    values = {"status": target, "update_datetime": datetime.utcnow()}
+    if request.reason is not None:
+        values["reason"] = request.reason
+
+    for from_status, ids in ids_by_status.items():
+        updated_ids = set(db.execute(
+            update(Thesis)
+            .where(Thesis.id.in_(ids), Thesis.status == from_status)
+            .values(**values)
+            .returning(Thesis.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all())
+        for thesis_id in ids:
+            if thesis_id in updated_ids:
+                results[thesis_id] = ThesisStatusTransitionResult(id=thesis_id, success=True, from_status=from_status, status=target)
+            else:
+                results[thesis_id] = ThesisStatusTransitionResult(
+                    id=thesis_id,
+                    success=False,
+                    from_status=from_status,
+                    error="Trạng thái đề tài đã bị thay đổi bởi thao tác khác."
+                )
+    db.commit()
+
+    ordered = [results[thesis_id] for thesis_id in thesis_ids]
+    changed_batches = [batch_of_thesis[r.id] for r in ordered if r.success]
+    if changed_batches:
+        invalidate_thesis_stats(*changed_batches)
+    return {"success_count": sum(1 for r in ordered if r.success), "results": ordered}
+
+# Thống kê cho dashboard được cache theo từng đợt; TTL chỉ là lưới an toàn,
+# các thao tác ghi lên đề tài sẽ chủ động xóa cache qua invalidate_thesis_stats.
+THESIS_STATS_CACHE_TTL_SECONDS = float(os.getenv("THESIS_STATS_CACHE_TTL_SECONDS", 300))
+
+_ALL_BATCHES = "all"
+
+_stats_cache = TTLCache("thesis_stats", ttl_seconds=THESIS_STATS_CACHE_TTL_SECONDS, maxsize=256)
+
+
+def _compute_stats(db: Session, batch_id: Optional[UUID]) -> ThesisStatsResponse:
+    # Một câu GROUP BY duy nhất theo cả 4 chiều, sau đó cộng dồn trong Python
+    query = db.query(Thesis.status, Thesis.thesis_type, Thesis.major_id, Thesis.batch_id, func.count(Thesis.id))
+    if batch_id is not None:
+        query = query.filter(Thesis.batch_id == batch_id)
+    rows = query.group_by(Thesis.status, Thesis.thesis_type, Thesis.major_id, Thesis.batch_id).all()
+
+    total = 0
+    by_status, by_type, by_major, by_batch = {}, {}, {}, {}
+    for status, thesis_type, major_id, row_batch_id, count in rows:
+        total += count
+        by_status[status] = by_status.get(status, 0) + count
+        by_type[thesis_type] = by_type.get(thesis_type, 0) + count
+        by_major[major_id] = by_major.get(major_id, 0) + count
+        by_batch[row_batch_id] = by_batch.get(row_batch_id, 0) + count
+
+    major_map = get_majors(db)
+    batch_map = get_batches(db)
+    return ThesisStatsResponse(
+        batch_id=batch_id,
+        total=total,
+        # Đề tài chưa có trạng thái được gom vào nhóm "Không xác định" để tổng các nhóm luôn bằng total
+        by_status=[
+            ThesisStatusCount(status=s, label=THESIS_STATUS_LABELS.get(s, "Không xác định"), count=c)
+            for s, c in sorted(by_status.items(), key=lambda item: (item[0] is None, item[0] or 0))
+        ],
+        by_type=[
+            ThesisTypeCount(thesis_type=t, name="Khóa luận" if t == 1 else "Đồ án", count=c)
+            for t, c in sorted(by_type.items())
+        ],
+        by_major=[
+            ThesisMajorCount(major_id=m, major_name=major_map[m].name if m in major_map else None, count=c)
+            for m, c in sorted(by_major.items(), key=lambda item: -item[1])
+        ],
+        by_batch=[
+            ThesisBatchCount(batch_id=b, batch_name=batch_map[b].name if b in batch_map else None, count=c)
+            for b, c in sorted(by_batch.items(), key=lambda item: -item[1])
+        ],
+        generated_at=datetime.now()
+    )
+
+def _load_stats(db: Session, batch_id: Optional[UUID]) -> ThesisStatsResponse:
+    with primary_session(db) as primary:
+        return _compute_stats(primary, batch_id)
+
+def get_thesis_stats(db: Session, batch_id: Optional[UUID] = None) -> ThesisStatsResponse:
+    key = batch_id if batch_id is not None else _ALL_BATCHES
+    return _stats_cache.get_or_load(key, lambda: _load_stats(db, batch_id))
+
+def invalidate_thesis_stats(*batch_ids: Optional[UUID]) -> None:
+    """
+    Xóa thống kê đã cache của các đợt bị ảnh hưởng (kèm thống kê tổng).
+    Không truyền đợt nào thì xóa toàn bộ.
+    """
+    if not batch_ids:
+        _stats_cache.invalidate()
+        return
+    _stats_cache.invalidate(_ALL_BATCHES)
+    for batch_id in set(batch_ids):
+        if batch_id is not None:
+            _stats_cache.invalidate(batch_id)
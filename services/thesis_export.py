@@ -0,0 +1,113 @@
+import csv
+from io import StringIO
+import tempfile
+from typing import Iterator, List, Optional
+from uuid import UUID
+from openpyxl import Workbook
+from sqlalchemy.orm import Session
+from models.model import LecturerInfo, Thesis, ThesisLecturer
+from services.reference_data import get_batches, get_majors
+from services.thesis import filter_theses_query
+from services.thesis_import import IMPORT_COLUMN_MAPPING, IMPORT_HEADER_ROW
+
+EXPORT_MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Dùng đúng tiêu đề cột của file mẫu import để file xuất ra có thể import lại
+EXPORT_COLUMNS = list(IMPORT_COLUMN_MAPPING.keys())
+
+EXPORT_CHUNK_SIZE = 500
+_FILE_CHUNK_BYTES = 64 * 1024
+
+
+def _iter_export_rows(db: Session, batch_id: Optional[UUID], major_id: Optional[UUID], chunk_size: int) -> Iterator[list]:
+    """
+    Đọc đề tài bằng con trỏ phía server theo từng lô; mã GV hướng dẫn/phản biện của cả lô
+    được lấy bằng một câu truy vấn. Thứ tự giá trị khớp với EXPORT_COLUMNS.
+    """
+    major_map = get_majors(db)
+    query = filter_theses_query(
+        db.query(Thesis.id, Thesis.title, Thesis.description, Thesis.thesis_type, Thesis.department_id, Thesis.major_id, Thesis.notes),
+        batch_id=batch_id,
+        major_id=major_id
+    )
+    result = db.execute(
+        query.order_by(Thesis.create_datetime, Thesis.id).statement.execution_options(yield_per=chunk_size)
+    )
+
+    index = 0
+    for partition in result.partitions():
+        thesis_ids = [row.id for row in partition]
+        codes = {}
+        lecturer_rows = (
+            db.query(ThesisLecturer.thesis_id, ThesisLecturer.role, LecturerInfo.lecturer_code)
+            .join(LecturerInfo, LecturerInfo.user_id == ThesisLecturer.lecturer_id)
+            .filter(ThesisLecturer.thesis_id.in_(thesis_ids))
+            .order_by(LecturerInfo.lecturer_code)
+            .all()
+        )
+        for thesis_id, role, lecturer_code in lecturer_rows:
+            codes.setdefault((thesis_id, role), []).append(lecturer_code)
+
+        for row in partition:
+            index += 1
+            major = major_map.get(row.major_id)
+            yield [
+                index,
+                row.title,
+                row.description,
+                ", ".join(codes.get((row.id, 1), [])),
+                row.thesis_type,
+                ", ".join(codes.get((row.id, 2), [])) or None,
+                row.department_id,
+                major.name if major else None,
+                row.notes,
+            ]
+
+
+def iter_theses_xlsx(db: Session, batch_id: Optional[UUID] = None, major_id: Optional[UUID] = None, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Ghi file XLSX bằng workbook write-only (các dòng được ghi thẳng ra file tạm, không giữ trong bộ nhớ)
+    rồi trả về nội dung file theo từng khối. Bố cục giống file mẫu: tiêu đề ở các dòng đầu,
+    header ở dòng 5, dữ liệu từ dòng 6.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Danh sách đề tài")
+    batch = get_batches(db).get(batch_id) if batch_id else None
+    title_rows: List[list] = [
+        ["TRƯỜNG ĐẠI HỌC CÔNG THƯƠNG"],
+        ["THÀNH PHỐ HỒ CHÍ MINH"],
+        ["KHOA CÔNG NGHỆ THÔNG TIN"],
+        [f"DANH SÁCH ĐỀ TÀI - {batch.name}" if batch else "DANH SÁCH ĐỀ TÀI"],
+    ]
+    for title_row in title_rows[:IMPORT_HEADER_ROW]:
+        sheet.append(title_row)
+    sheet.append(EXPORT_COLUMNS)
+    for row in _iter_export_rows(db, batch_id, major_id, chunk_size):
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as tmp:
+        workbook.save(tmp)
+        tmp.seek(0)
+        while True:
+            data = tmp.read(_FILE_CHUNK_BYTES)
+            if not data:
+                break
+            yield data
+
+
+def iter_theses_csv(db: Session, batch_id: Optional[UUID] = None, major_id: Optional[UUID] = None, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Xuất CSV (UTF-8 có BOM để Excel đọc đúng tiếng Việt), mỗi lô dòng được ghi ra ngay."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(_iter_export_rows(db, batch_id, major_id, chunk_size), start=1):
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
@@ -0,0 +1,229 @@
+from io import BytesIO
+import logging
+from typing import Callable, Dict, Optional
+import uuid
+from fastapi import HTTPException, status
+import pandas as pd
+from sqlalchemy import insert, or_
+from sqlalchemy.orm import Session
+from models.model import Batch, LecturerInfo, Thesis, ThesisLecturer, User
+from services.reference_data import get_departments, get_majors
+from services.thesis import build_thesis_responses, invalidate_thesis_stats
+from utils.transactions import apply_in_savepoints
+
+logger = logging.getLogger(__name__)
+
+# Header nằm ở dòng 5 của file mẫu (0-based index = 4), dữ liệu bắt đầu từ dòng 6
+IMPORT_HEADER_ROW = 4
+IMPORT_FIRST_DATA_ROW = IMPORT_HEADER_ROW + 2
+
+# Số dòng hợp lệ được ghi trong mỗi lần INSERT hàng loạt (vẫn chung một transaction)
+IMPORT_INSERT_CHUNK_SIZE = 500
+
+# Chuẩn hóa tên cột để khớp với file có dấu *
+IMPORT_COLUMN_MAPPING = {
+    "STT": "STT",
+    "TÊN ĐỀ TÀI *": "TÊN ĐỀ TÀI",
+    "NỘI DUNG YÊU CẦU *": "NỘI DUNG YÊU CẦU",
+    "MÃ GV HƯỚNG DẪN *": "MÃ GV HƯỚNG DẪN",
+    "LOẠI ĐỀ TÀI *\n1: Khóa luận kỹ sư\n2: Đồ án tốt nghiệp": "LOẠI ĐỀ TÀI",
+    "MÃ GV PHẢN BIỆN\n(Nếu loại đề tài là 2 thì có thể nhập MÃ GV PHẢN BIỆN hoặc không)": "MÃ GV PHẢN BIỆN",
+    "BỘ MÔN *\n1: KTPM\n2: HTTT\n3: KHDL&TTNT\n4: MMT-ATTT": "BỘ MÔN",
+    "CHUYÊN NGÀNH *\n(Chọn chuyên ngành bằng dropdown)": "CHUYÊN NGÀNH",
+    "GHI CHÚ": "GHI CHÚ"
+}
+
+
+def read_thesis_import_file(source) -> pd.DataFrame:
+    """Đọc file import từ bytes hoặc đường dẫn file đã lưu."""
+    df = pd.read_excel(BytesIO(source) if isinstance(source, bytes) else source, header=IMPORT_HEADER_ROW)
+    df.columns = [str(col).strip() for col in df.columns]
+    df = df.rename(columns=IMPORT_COLUMN_MAPPING)
+    for column in set(IMPORT_COLUMN_MAPPING.values()):
+        if column not in df.columns:
+            df[column] = None
+    return df
+
+
+def _clean_text(series: pd.Series) -> pd.Series:
+    """Chuỗi đã strip, ô trống (NaN hoặc chỉ có khoảng trắng) thành None."""
+    text = series.where(series.notna(), "").astype(str).str.strip()
+    return text.where(text != "", None)
+
+
+def _split_codes(series: pd.Series) -> pd.Series:
+    text = _clean_text(series).fillna("")
+    return text.str.split(",").map(lambda codes: [c.strip() for c in codes if c.strip()])
+
+
+def _flag(errors: pd.Series, mask: pd.Series, message) -> None:
+    """Ghi lỗi cho các dòng thỏa mask và chưa có lỗi nào trước đó (giữ lỗi đầu tiên của mỗi dòng)."""
+    target = mask & errors.isna()
+    if not target.any():
+        return
+    errors[target] = message[target] if isinstance(message, pd.Series) else message
+
+
+def _missing_codes(codes: pd.Series, lookup: Dict[str, uuid.UUID]) -> pd.Series:
+    return codes.map(lambda row_codes: [c for c in row_codes if c not in lookup])
+
+
+def import_theses_from_dataframe(
+    db: Session,
+    df: pd.DataFrame,
+    creator_id: uuid.UUID,
+    thesis_status: int = 1,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    chunk_size: int = IMPORT_INSERT_CHUNK_SIZE
+) -> dict:
+    """
+    Import đề tài từ DataFrame đã đọc từ file Excel.
+    - Chuyên ngành, bộ môn, giảng viên được tra cứu một lần cho cả file.
+    - Dữ liệu được kiểm tra theo cột trên toàn bộ DataFrame thay vì từng dòng.
+    - Đề tài và phân công giảng viên được ghi hàng loạt trong một transaction;
+      nếu lô bị lỗi, từng dòng được ghi lại trong SAVEPOINT riêng để báo lỗi theo dòng.
+    - on_progress(số dòng đã xử lý, số dòng lỗi) được gọi sau bước kiểm tra và sau mỗi lô ghi.
+    """
+    # 1. Kiểm tra quyền người tạo (phải là Giảng viên hoặc Admin)
+    creator = db.query(User).filter(User.id == creator_id, or_(User.user_type == 3, User.user_type == 1)).first()
+    if not creator:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Chỉ giảng viên hoặc admin mới có quyền tạo đề tài."
+        )
+
+    # 2. Tìm đợt mới nhất
+    latest_batch = db.query(Batch).order_by(Batch.create_datetime.desc()).first()
+    if not latest_batch:
+        raise HTTPException(status_code=404, detail="Không tìm thấy đợt học nào trong hệ thống.")
+
+    df = df.reset_index(drop=True)
+    row_numbers = df.index + IMPORT_FIRST_DATA_ROW
+    titles = _clean_text(df["TÊN ĐỀ TÀI"])
+    errors = pd.Series([None] * len(df), index=df.index, dtype=object)
+
+    # 3. Bỏ qua dòng trống
+    _flag(errors, df["STT"].isna() | titles.isna(), "Thiếu STT hoặc TÊN ĐỀ TÀI")
+
+    # 4. Chuyên ngành: so khớp không phân biệt hoa thường với danh mục đã cache
+    major_lookup = {str(m.name).strip().lower(): m.id for m in get_majors(db).values()}
+    major_text = _clean_text(df["CHUYÊN NGÀNH"])
+    major_ids = major_text.str.lower().map(major_lookup)
+    _flag(errors, major_text.isna(), "Cột 'CHUYÊN NGÀNH' không được để trống.")
+    _flag(errors, major_ids.isna(), "Chuyên ngành '" + major_text.fillna("") + "' không tồn tại trong cơ sở dữ liệu.")
+
+    # 5. Loại đề tài
+    thesis_types = pd.to_numeric(df["LOẠI ĐỀ TÀI"], errors="coerce")
+    _flag(errors, df["LOẠI ĐỀ TÀI"].isna(), "Cột 'LOẠI ĐỀ TÀI' không được để trống.")
+    _flag(errors, thesis_types.isna(), "Giá trị '" + df["LOẠI ĐỀ TÀI"].astype(str) + "' không phải là số hợp lệ cho Loại đề tài.")
+    _flag(errors, ~thesis_types.isin([1, 2]), "Giá trị '" + df["LOẠI ĐỀ TÀI"].astype(str) + "' không hợp lệ cho Loại đề tài (chỉ 1 hoặc 2).")
+
+    # 6. Giảng viên hướng dẫn / phản biện: tra cứu mọi mã GV trong file bằng một câu truy vấn
+    instructor_codes = _split_codes(df["MÃ GV HƯỚNG DẪN"])
+    # Chỉ xét GV phản biện khi LOẠI ĐỀ TÀI là 2
+    reviewer_codes = pd.Series(
+        [codes if thesis_type == 2 else [] for codes, thesis_type in zip(_split_codes(df["MÃ GV PHẢN BIỆN"]), thesis_types)],
+        index=df.index,
+        dtype=object
+    )
+    all_codes = set(instructor_codes.explode().dropna()) | set(reviewer_codes.explode().dropna())
+    lecturer_lookup = {}
+    if all_codes:
+        rows = (
+            db.query(LecturerInfo.lecturer_code, LecturerInfo.user_id)
+            .join(User, User.id == LecturerInfo.user_id)
+            .filter(LecturerInfo.lecturer_code.in_(all_codes), User.user_type == 3)
+            .all()
+        )
+        lecturer_lookup = {code: user_id for code, user_id in rows}
+
+    missing_instructors = _missing_codes(instructor_codes, lecturer_lookup)
+    missing_reviewers = _missing_codes(reviewer_codes, lecturer_lookup)
+    _flag(errors, instructor_codes.str.len() == 0, "Cột 'MÃ GV HƯỚNG DẪN' không được để trống.")
+    _flag(errors, missing_instructors.str.len() > 0, "Một hoặc nhiều Mã GV Hướng Dẫn không tồn tại: " + missing_instructors.astype(str))
+    _flag(errors, missing_reviewers.str.len() > 0, "Một hoặc nhiều Mã GV Phản Biện không tồn tại: " + missing_reviewers.astype(str))
+    _flag(errors, (thesis_types == 2) & (reviewer_codes.str.len() == 0), "Với loại đề tài là Đồ án, phải có ít nhất một giảng viên phản biện.")
+
+    # 7. Bộ môn: chấp nhận ID hoặc tên bộ môn
+    departments = get_departments(db)
+    department_lookup = {str(d.name).strip().lower(): d.id for d in departments.values()}
+    department_lookup.update({str(d.id): d.id for d in departments.values()})
+    department_text = _clean_text(df["BỘ MÔN"])
+    department_numeric = pd.to_numeric(df["BỘ MÔN"], errors="coerce")
+    department_key = department_numeric.map(lambda v: str(int(v)) if pd.notna(v) and float(v).is_integer() else None)
+    department_key = department_key.fillna(department_text.str.lower())
+    department_ids = department_key.map(department_lookup)
+    _flag(errors, department_text.notna() & department_ids.isna(), "Bộ môn '" + department_text.fillna("") + "' không tồn tại.")
+
+    # 8. Chuẩn bị dữ liệu ghi cho các dòng hợp lệ
+    descriptions = _clean_text(df["NỘI DUNG YÊU CẦU"]).fillna("")
+    notes = _clean_text(df["GHI CHÚ"])
+    pending = []
+    for i in df.index[errors.isna()]:
+        thesis_id = uuid.uuid4()
+        department_id = department_ids[i]
+        pending.append({
+            "row": int(row_numbers[i]),
+            "thesis": {
+                "id": thesis_id,
+                "title": titles[i],
+                "description": descriptions[i],
+                "notes": notes[i] if pd.notna(notes[i]) else None,
+                "thesis_type": int(thesis_types[i]),
+                "status": thesis_status,
+                "create_by": creator_id,
+                "batch_id": latest_batch.id,
+                "major_id": major_ids[i],
+                "department_id": int(department_id) if pd.notna(department_id) else None,
+                "start_date": latest_batch.start_date,
+                "end_date": latest_batch.end_date,
+            },
+            "lecturers": (
+                [{"id": uuid.uuid4(), "thesis_id": thesis_id, "lecturer_id": lecturer_lookup[c], "role": 1} for c in instructor_codes[i]]
+                + [{"id": uuid.uuid4(), "thesis_id": thesis_id, "lecturer_id": lecturer_lookup[c], "role": 2} for c in reviewer_codes[i]]
+            ),
+        })
+
+    # 9. Ghi hàng loạt trong một transaction, lỗi theo dòng được tách bằng SAVEPOINT
+    def _insert(items):
+        db.execute(insert(Thesis), [item["thesis"] for item in items])
+        lecturer_rows = [row for item in items for row in item["lecturers"]]
+        if lecturer_rows:
+            db.execute(insert(ThesisLecturer), lecturer_rows)
+
+    invalid_count = int(errors.notna().sum())
+    if on_progress:
+        on_progress(invalid_count, invalid_count)
+
+    created, failed = [], []
+    for start in range(0, len(pending), chunk_size):
+        chunk_created, chunk_failed = apply_in_savepoints(db, pending[start:start + chunk_size], _insert)
+        created.extend(chunk_created)
+        failed.extend(chunk_failed)
+        if on_progress:
+            on_progress(invalid_count + len(created) + len(failed), invalid_count + len(failed))
+    db.commit()
+    if created:
+        invalidate_thesis_stats(latest_batch.id)
+
+    error_items = [
+        {"row": int(row_numbers[i]), "title": titles[i] if pd.notna(titles[i]) else "<trống>", "error": errors[i]}
+        for i in df.index[errors.notna()]
+    ]
+    error_items.extend(
+        {"row": item["row"], "title": item["thesis"]["title"], "error": f"Lỗi khi tạo đề tài: {getattr(e, 'orig', None) or e}"}
+        for item, e in failed
+    )
+    error_items.sort(key=lambda e: e["row"])
+    logger.info(f"Import đề tài: {len(created)} thành công, {len(error_items)} lỗi trên tổng {len(df)} dòng")
+
+    # 10. Chuẩn bị danh sách đề tài vừa import (giữ đúng thứ tự trong file)
+    created_ids = [item["thesis"]["id"] for item in created]
+    imported_theses = []
+    if created_ids:
+        theses = db.query(Thesis).filter(Thesis.id.in_(created_ids)).all()
+        position = {thesis_id: index for index, thesis_id in enumerate(created_ids)}
+        theses.sort(key=lambda t: position[t.id])
+        imported_theses = build_thesis_responses(db, theses)
+
+    return {"success": len(created), "errors": error_items, "imported_theses": imported_theses}
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+_MISSING = object()
+
+# Danh sách tất cả cache trong process, dùng để xuất số liệu hit/miss
+_registry: List["TTLCache"] = []
+_registry_lock = threading.Lock()
+
+
+class TTLCache:
+    """
+    Cache trong bộ nhớ của process, có thời gian sống (TTL) và giới hạn số phần tử (LRU).
+    An toàn khi dùng từ nhiều thread; có bộ đếm hit/miss để theo dõi.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, maxsize: Optional[int] = None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Tăng mỗi lần invalidate; get_or_load bỏ kết quả của lần nạp bắt đầu trước lần invalidate đó
+        self._generation = 0
+        self.discarded_loads = 0
+        with _registry_lock:
+            _registry.append(self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def contains(self, key: Hashable) -> bool:
+        """Kiểm tra khóa còn hiệu lực mà không tính vào hit/miss."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return entry is not _MISSING and entry[0] > time.monotonic()
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        with self._lock:
+            self._store(key, value, ttl_seconds)
+
+    def _store(self, key: Hashable, value: Any, ttl_seconds: Optional[float]) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Lấy giá trị từ cache, nếu chưa có (hoặc đã hết hạn) thì gọi loader và lưu lại."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            with self._lock:
+                generation = self._generation
+            # Gọi loader ngoài khóa để không chặn các thread khác trong lúc truy vấn DB
+            value = loader()
+            with self._lock:
+                # Có invalidate trong lúc đang nạp thì kết quả có thể đã cũ: vẫn trả về cho lần gọi này nhưng không lưu
+                if generation == self._generation:
+                    self._store(key, value, None)
+                else:
+                    self.discarded_loads += 1
+        return value
+
+    def invalidate(self, key: Hashable = _MISSING) -> None:
+        """Xóa một khóa, hoặc toàn bộ cache nếu không truyền khóa."""
+        with self._lock:
+            if key is _MISSING:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._data)
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "discarded_loads": self.discarded_loads,
+        }
+
+
+def get_cache_stats() -> List[Dict[str, Any]]:
+    """Số liệu của tất cả cache đã được tạo trong process."""
+    with _registry_lock:
+        caches = list(_registry)
+    return [cache.stats() for cache in caches]
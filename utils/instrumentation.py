@@ -0,0 +1,202 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from utils import metrics
+
+logger = logging.getLogger("request_metrics")
+
+# Đo theo từng request: thời gian tổng, thời gian DB, số truy vấn, số dòng đọc về
+# và các câu lệnh lặp lại (nghi N+1). Kết quả ghi log dạng JSON và trả về qua header Server-Timing.
+REQUEST_INSTRUMENTATION_ENABLED = os.getenv("REQUEST_INSTRUMENTATION_ENABLED", "true").lower() in ("1", "true", "yes")
+# Cùng một dạng câu lệnh chạy quá số lần này trong một request thì cảnh báo N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 10))
+# Chỉ ghi log INFO cho request chậm hơn ngưỡng này (0 = ghi mọi request); cảnh báo N+1 luôn được ghi
+REQUEST_LOG_MIN_MS = float(os.getenv("REQUEST_LOG_MIN_MS", 0))
+
+REQUESTS_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "Số request đang xử lý.", ("method",))
+REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "Thời gian xử lý request theo route.", ("method", "route", "status")
+)
+DB_QUERIES = metrics.counter("db_queries_total", "Số truy vấn SQL theo route.", ("method", "route"))
+DB_QUERY_SECONDS = metrics.counter("db_query_seconds_total", "Tổng thời gian chạy truy vấn SQL theo route.", ("method", "route"))
+DB_ROWS = metrics.counter("db_rows_fetched_total", "Số dòng đọc về từ DB theo route.", ("method", "route"))
+N_PLUS_ONE_WARNINGS = metrics.counter("db_n_plus_one_warnings_total", "Số lần phát hiện câu lệnh lặp (nghi N+1) theo route.", ("method", "route"))
+
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_fingerprint(statement: str) -> str:
+    """
+    Dạng chuẩn hóa của câu lệnh: giá trị đã là tham số bind nên chỉ cần gộp danh sách IN
+    (độ dài khác nhau sinh ra số tham số khác nhau) và khoảng trắng.
+    """
+    return _WHITESPACE.sub(" ", _IN_LIST.sub("IN (...)", statement)).strip()
+
+
+class RequestStats:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.statements: Dict[str, int] = {}
+
+    def record_query(self, statement: str, seconds: float, rows: int) -> None:
+        fingerprint = statement_fingerprint(statement)
+        with self._lock:
+            self.query_count += 1
+            self.db_seconds += seconds
+            if rows > 0:
+                self.rows += rows
+            self.statements[fingerprint] = self.statements.get(fingerprint, 0) + 1
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def repeated_statements(self, threshold: int) -> Dict[str, int]:
+        with self._lock:
+            return {fingerprint: count for fingerprint, count in self.statements.items() if count > threshold}
+
+    def server_timing(self) -> str:
+        with self._lock:
+            db_ms, query_count = self.db_seconds * 1000, self.query_count
+        return f'app;dur={self.elapsed_ms():.1f}, db;dur={db_ms:.1f};desc="{query_count} queries"'
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def get_request_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started_stack = conn.info.get("query_started")
+    if not started_stack:
+        return
+    seconds = time.perf_counter() - started_stack.pop()
+    # rowcount của SELECT là số dòng driver đã nhận về (cursor phía server/asyncpg trả về -1 thì bỏ qua)
+    rows = cursor.rowcount if context is not None and not context.isinsert and not context.isupdate and not context.isdelete else 0
+    stats.record_query(statement, seconds, rows or 0)
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_failed_query(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def _route_template(scope) -> str:
+    """Mẫu path của route (vd. /theses/{thesis_id}) để nhãn metric không tăng theo từng id; không khớp route thì gộp chung."""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        return getattr(endpoint, "__name__", "unknown")
+    return "unmatched"
+
+
+def _record_metrics(stats: RequestStats, route: str, status_code: Optional[int], elapsed_ms: float, repeated: Dict[str, int]) -> None:
+    REQUEST_DURATION.observe(elapsed_ms / 1000, stats.method, route, str(status_code or 500))
+    if stats.query_count:
+        DB_QUERIES.inc(stats.method, route, amount=stats.query_count)
+        DB_QUERY_SECONDS.inc(stats.method, route, amount=stats.db_seconds)
+    if stats.rows:
+        DB_ROWS.inc(stats.method, route, amount=stats.rows)
+    if repeated:
+        N_PLUS_ONE_WARNINGS.inc(stats.method, route, amount=len(repeated))
+
+
+def _finish_request(stats: RequestStats, route: str, status_code: Optional[int]) -> None:
+    elapsed_ms = stats.elapsed_ms()
+    repeated = stats.repeated_statements(N_PLUS_ONE_THRESHOLD)
+    _record_metrics(stats, route, status_code, elapsed_ms, repeated)
+    for fingerprint, count in repeated.items():
+        logger.warning(json.dumps({
+            "event": "n_plus_one",
+            "method": stats.method,
+            "route": route,
+            "path": stats.path,
+            "count": count,
+            "fingerprint": hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:12],
+            "statement": fingerprint[:300],
+        }, ensure_ascii=False))
+    if elapsed_ms < REQUEST_LOG_MIN_MS and not repeated:
+        return
+    logger.info(json.dumps({
+        "event": "request",
+        "method": stats.method,
+        "route": route,
+        "path": stats.path,
+        "status": status_code,
+        "duration_ms": round(elapsed_ms, 2),
+        "db_ms": round(stats.db_seconds * 1000, 2),
+        "queries": stats.query_count,
+        "rows": stats.rows,
+        "distinct_statements": len(stats.statements),
+        "max_statement_repeats": max(stats.statements.values(), default=0),
+    }, ensure_ascii=False))
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Middleware ASGI: gắn RequestStats vào context của request, thêm header Server-Timing
+    và X-DB-Query-Count khi bắt đầu trả response; khi request kết thúc (kể cả phần truy vấn
+    chạy trong lúc stream) thì ghi log và cập nhật metric cho /metrics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not REQUEST_INSTRUMENTATION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope["method"], scope["path"])
+        token = _current.set(stats)
+        status_code = None
+        REQUESTS_IN_FLIGHT.inc(stats.method)
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [
+                    *message.get("headers", []),
+                    (b"server-timing", stats.server_timing().encode("latin-1")),
+                    (b"x-db-query-count", str(stats.query_count).encode("latin-1")),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            REQUESTS_IN_FLIGHT.dec(stats.method)
+            _finish_request(stats, _route_template(scope), status_code)
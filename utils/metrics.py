@@ -0,0 +1,146 @@
+import bisect
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Bộ đếm in-process theo định dạng text của Prometheus (không phụ thuộc prometheus_client).
+# Mỗi worker giữ số liệu riêng, Prometheus phân biệt theo nhãn instance khi scrape.
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value) -> str:
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_family(name: str, metric_type: str, help_text: str, samples: Iterable[Tuple[Dict[str, object], object]]) -> List[str]:
+    """Dòng HELP/TYPE và các mẫu của một metric lấy từ số liệu có sẵn (stats() của pool, cache...)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+    return lines
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        for label_values, value in values:
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Mỗi bộ nhãn: [số lần rơi vào từng bucket (không cộng dồn, phần tử cuối là +Inf), tổng, số lần]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = [(label_values, list(series[0]), series[1], series[2]) for label_values, series in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        bucket_label_names = self.label_names + ("le",)
+        for label_values, bucket_counts, total, count in snapshot:
+            cumulative = 0
+            for upper, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                le = "+Inf" if math.isinf(upper) else repr(upper)
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_label_names, label_values + (le,))} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+_registry: List[_Metric] = []
+_registry_lock = threading.Lock()
+
+
+def _register(metric: _Metric) -> _Metric:
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def counter(name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+    return _register(Counter(name, help_text, label_names))
+
+
+def gauge(name: str, help_text: str, label_names: Sequence[str] = ()) -> Gauge:
+    return _register(Gauge(name, help_text, label_names))
+
+
+def histogram(name: str, help_text: str, label_names: Sequence[str] = (), buckets: Optional[Sequence[float]] = None) -> Histogram:
+    return _register(Histogram(name, help_text, label_names, buckets or DEFAULT_LATENCY_BUCKETS))
+
+
+def render_registered() -> List[str]:
+    with _registry_lock:
+        metrics = list(_registry)
+    lines: List[str] = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return lines
@@ -0,0 +1,40 @@
+from typing import Iterable, Iterator, TypeVar
+from pydantic import BaseModel
+
+# Các định dạng stream được hỗ trợ cho tham số ?stream=
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+T = TypeVar("T")
+
+def iter_closing(items: Iterable[T], resource) -> Iterator[T]:
+    """
+    Duyệt items rồi đóng resource (vd. session DB mở riêng cho stream), kể cả khi bị lỗi giữa chừng
+    hoặc client ngắt kết nối (generator bị đóng) - những trường hợp BackgroundTask không được chạy.
+    """
+    try:
+        yield from items
+    finally:
+        resource.close()
+
+def stream_models(items: Iterable[BaseModel], fmt: str) -> Iterator[str]:
+    """
+    Chuyển từng đối tượng Pydantic thành chuỗi JSON và trả về dần dần cho StreamingResponse.
+    - ndjson: mỗi đối tượng một dòng.
+    - json: một mảng JSON hợp lệ, được ghi từng phần tử một.
+    """
+    if fmt == "ndjson":
+        for item in items:
+            yield item.json() + "\n"
+        return
+
+    yield "["
+    first = True
+    for item in items:
+        if not first:
+            yield ","
+        yield item.json()
+        first = False
+    yield "]"
@@ -0,0 +1,35 @@
+from typing import Callable, List, Sequence, Tuple, TypeVar
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+T = TypeVar("T")
+
+
+def apply_in_savepoints(
+    db: Session,
+    items: Sequence[T],
+    apply: Callable[[Sequence[T]], None],
+) -> Tuple[List[T], List[Tuple[T, SQLAlchemyError]]]:
+    """
+    Ghi cả lô trong một SAVEPOINT; nếu lô bị lỗi thì thử lại từng phần tử trong SAVEPOINT riêng
+    để tách được các phần tử lỗi mà không làm hỏng transaction bên ngoài.
+    Trả về (danh sách ghi thành công, danh sách (phần tử, lỗi)). Việc commit do người gọi quyết định.
+    """
+    if not items:
+        return [], []
+    try:
+        with db.begin_nested():
+            apply(items)
+        return list(items), []
+    except SQLAlchemyError:
+        pass
+
+    succeeded, failed = [], []
+    for item in items:
+        try:
+            with db.begin_nested():
+                apply([item])
+            succeeded.append(item)
+        except SQLAlchemyError as e:
+            failed.append((item, e))
+    return succeeded, failed